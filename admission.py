@@ -0,0 +1,146 @@
+# admission.py - Rate limits, input caps and load shedding for /api/process
+#
+# Every NLP turn (welcome and ordering messages), and every turn that places
+# an order (a delivery address), spends a token from its session's bucket
+# and, if IP_RATE_LIMIT is set, from its client IP's bucket; an empty
+# bucket gets 429 with Retry-After instead of a parse.
+# Turns without a session the client already had (new sessions and legacy
+# context-only clients) have no session bucket, so they spend from a
+# separate per-IP bucket. That one is on by default only once
+# TRUSTED_PROXY_HEADER is set: without it, behind a router every visitor
+# has the router's address and would share a single bucket.
+# Messages longer than MAX_MESSAGE_LENGTH are turned away before any work.
+# When more than SHED_QUEUE_DEPTH NLP turns are already in flight, new ones
+# run on the cheap tier (trie tokenizer and match index only) rather than
+# queueing behind the spaCy and TextBlob work.
+#
+# Buckets and the in-flight count live in the process that serves the
+# request, so under gunicorn each worker enforces the limits on its own.
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import metrics
+
+# Sustained turns per second and burst size per session; 0 disables
+SESSION_RATE_LIMIT = float(os.environ.get("SESSION_RATE_LIMIT", 2))
+SESSION_BURST = float(os.environ.get("SESSION_BURST", 20))
+# Per client IP, for every NLP turn. Off by default: one address can be many users
+IP_RATE_LIMIT = float(os.environ.get("IP_RATE_LIMIT", 0))
+IP_BURST = float(os.environ.get("IP_BURST", 100))
+# Header the reverse proxy puts the client address in (X-Forwarded-For, X-Real-IP);
+# the last address in it is used. Only set this when every request comes through
+# a proxy that sets it, or clients can claim any address they like
+TRUSTED_PROXY_HEADER = os.environ.get("TRUSTED_PROXY_HEADER", "")
+# Per client IP, for turns without a known session (new sessions and legacy clients);
+# off unless TRUSTED_PROXY_HEADER is set, since the peer address may be a shared router
+ANONYMOUS_RATE_LIMIT = float(os.environ.get("ANONYMOUS_RATE_LIMIT", 1 if TRUSTED_PROXY_HEADER else 0))
+ANONYMOUS_BURST = float(os.environ.get("ANONYMOUS_BURST", 30))
+MAX_MESSAGE_LENGTH = int(os.environ.get("MAX_MESSAGE_LENGTH", 500))
+# NLP turns in flight before new ones take the cheap tier; 0 disables.
+# gunicorn.conf.py defaults it to half of each worker's threads
+SHED_QUEUE_DEPTH = int(os.environ.get("SHED_QUEUE_DEPTH", 16))
+
+ADMISSION_TOTAL = metrics.counter("foodbot_admission_total",
+                                  "NLP turns turned away or degraded, by reason", ["reason"])
+
+
+def client_ip(peer, forwarded=None):
+    """Address the IP limits are keyed on: the last hop of TRUSTED_PROXY_HEADER if set, else the peer"""
+    if TRUSTED_PROXY_HEADER and forwarded:
+        return forwarded.split(',')[-1].strip() or peer
+    return peer
+
+
+class TokenBucketLimiter:
+    """One token bucket per key, refilled at rate tokens per second up to burst.
+
+    Only the max_keys most recently seen keys are kept; a forgotten key
+    starts again with a full bucket.
+    """
+
+    def __init__(self, rate, burst, max_keys=100000):
+        self.rate = rate
+        self.burst = max(burst, 1.0)
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, cost=1.0):
+        """Spend cost tokens from key's bucket; returns 0.0, or the seconds until it could"""
+        if self.rate <= 0 or key is None:
+            return 0.0
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.pop(key, None)
+            if bucket is None:
+                tokens = self.burst
+            else:
+                tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+            if tokens >= cost:
+                tokens -= cost
+                wait = 0.0
+            else:
+                wait = (cost - tokens) / self.rate
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        return wait
+
+    def __len__(self):
+        return len(self._buckets)
+
+
+class AdmissionController:
+    """Decides which NLP turns run, and which of them run on the cheap tier"""
+
+    def __init__(self, session_rate=SESSION_RATE_LIMIT, session_burst=SESSION_BURST,
+                 ip_rate=IP_RATE_LIMIT, ip_burst=IP_BURST,
+                 anonymous_rate=ANONYMOUS_RATE_LIMIT, anonymous_burst=ANONYMOUS_BURST,
+                 max_length=MAX_MESSAGE_LENGTH, shed_depth=SHED_QUEUE_DEPTH):
+        self.sessions = TokenBucketLimiter(session_rate, session_burst)
+        self.ips = TokenBucketLimiter(ip_rate, ip_burst)
+        self.anonymous = TokenBucketLimiter(anonymous_rate, anonymous_burst)
+        self.max_length = max_length
+        self.shed_depth = shed_depth
+        self.in_flight = 0
+        self._lock = threading.Lock()
+
+    def check(self, session_id, ip, message):
+        """None if the turn may run, else (reason, seconds to wait before retrying).
+
+        session_id is None for a turn without a session the client already had.
+        """
+        if self.max_length and len(message) > self.max_length:
+            ADMISSION_TOTAL.inc("too_long")
+            return "too_long", 0.0
+        if session_id is None:
+            wait = self.anonymous.take(ip)
+            if wait:
+                ADMISSION_TOTAL.inc("anonymous_rate")
+                return "rate_limited", wait
+        wait = self.sessions.take(session_id)
+        if wait:
+            ADMISSION_TOTAL.inc("session_rate")
+            return "rate_limited", wait
+        wait = self.ips.take(ip)
+        if wait:
+            ADMISSION_TOTAL.inc("ip_rate")
+            return "rate_limited", wait
+        return None
+
+    @contextmanager
+    def expensive_turn(self):
+        """Count an NLP turn as in flight; yields True if it should take the cheap tier"""
+        with self._lock:
+            self.in_flight += 1
+            shed = 0 < self.shed_depth < self.in_flight
+        if shed:
+            ADMISSION_TOTAL.inc("shed")
+        try:
+            yield shed
+        finally:
+            with self._lock:
+                self.in_flight -= 1
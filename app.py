@@ -1,15 +1,32 @@
 # app.py - Enhanced Flask backend for the NLP Food Ordering System
-import re
-import nltk
 import difflib
 import json
+import math
 import os
+import queue
+import threading
 import logging
-from flask import Flask, request, jsonify, render_template, send_from_directory
-from nltk.corpus import wordnet as wn, stopwords
+from functools import lru_cache
+from flask import Flask, Response, request, jsonify, render_template, send_from_directory, stream_with_context
 from nltk.tokenize import word_tokenize
-from nltk.stem import WordNetLemmatizer
 from textblob import TextBlob
+import nlp_models
+from nlp_models import spacy_available
+from matcher import MenuMatchIndex, RESTAURANT_SCORE_CUTOFF, closest_choice
+from catalog import MenuCatalog
+from menu_binary import load_menus
+from tokenizer import number_words_to_digits, parse_modification
+from cart import Cart
+import semantic
+from sessions import create_session_store, new_session_id
+from orders import create_order_log
+from admission import AdmissionController, TRUSTED_PROXY_HEADER, client_ip
+from cache import LRUCache
+import metrics
+from metrics import STAGE_SECONDS, TURN_SECONDS
+from profiling import SamplingProfiler
+from nlp_server import NLPClient, NLPServerError
+import batch
 
 # Try to import enhanced modules
 try:
@@ -19,22 +36,8 @@ except ImportError:
     fuzzywuzzy_available = False
     print("fuzzywuzzy not available. Using basic string matching.")
 
-import spacy
-try:
-    nlp = spacy.load("en_core_web_sm")
-except OSError:
-    from spacy.cli import download
-    download("en_core_web_sm")
-    nlp = spacy.load("en_core_web_sm")
-
-try:
-    import spacy
-    spacy_available = True
-    nlp = spacy.load("en_core_web_sm")
-except ImportError:
-    spacy_available = False
-    nlp = None
-    print("spaCy not available. Using NLTK for NLP processing.")
+# Food-type detection only needs lemmas, POS tags and stop words
+TAGGER_ONLY_DISABLE = ["parser"]
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, 
@@ -43,22 +46,25 @@ logger = logging.getLogger(__name__)
 
 app = Flask(__name__, static_folder='static')
 
-# Download required NLTK data
-try:
-    nltk.data.find('corpora/wordnet')
-    nltk.data.find('tokenizers/punkt')
-    nltk.data.find('corpora/omw-1.4')
-    nltk.data.find('taggers/averaged_perceptron_tagger')
-    nltk.data.find('corpora/stopwords')
-except LookupError:
-    nltk.download('wordnet')
-    nltk.download('punkt')
-    nltk.download('omw-1.4')
-    nltk.download('averaged_perceptron_tagger')
-    nltk.download('stopwords')
-
-lemmatizer = WordNetLemmatizer()
-stop_words = set(stopwords.words('english'))
+# Startup phase: verify the models are installed (never download them here)
+# and load them now, so gunicorn --preload loads them once in the master and
+# the forked workers share the pages. LAZY_MODELS defers loading to first use
+# for dev servers and CLI tools.
+LAZY_MODELS = os.environ.get("LAZY_MODELS", "false").lower() == "true"
+
+# Optional shared NLP sidecar (nlp_server.py): with NLP_SOCKET set, spelling
+# correction, entity extraction and food-type detection are sent there and
+# the models are only loaded here if the sidecar cannot be reached
+NLP_SOCKET = os.environ.get("NLP_SOCKET", "")
+nlp_client = NLPClient(NLP_SOCKET) if NLP_SOCKET else None
+
+if nlp_client is None:
+    if LAZY_MODELS:
+        nlp_models.check_models()
+    else:
+        nlp_models.load_models()
+
+stop_words = nlp_models.get_stop_words()
 
 # Enhanced synonym map
 synonyms_map = {
@@ -82,38 +88,83 @@ synonyms_map = {
     "shake": "chocolate shake"
 }
 
-# Load menu data from file
-def load_menu_from_file(filename):
-    menus = {}
-    try:
-        with open(filename, 'r') as f:
-            content = f.read().strip().split('\n\n')
-            for block in content:
-                lines = block.strip().split('\n')
-                if not lines:
-                    continue
-                restaurant = lines[0].strip().lower()
-                menu_items = {}
-                for item in lines[1:]:
-                    if ' - ' in item:
-                        name, price = item.split(' - ')
-                        menu_items[name.lower().strip()] = int(price.strip())
-                menus[restaurant] = menu_items
-                
-        logger.info(f"Successfully loaded menus from {filename}")
-        return menus
-    except FileNotFoundError:
-        logger.warning(f"Menu file '{filename}' not found. Using sample menus.")
+# Words that close the ordering state
+DONE_WORDS = ['done', 'finished', 'complete', 'checkout']
+
+# Context keys that belong to one order and are dropped when the next one starts
+ORDER_DETAIL_KEYS = ('last_item', 'payment_method', 'address', 'order_id')
+
+# Keywords that classify a message, and each restaurant's menu, as fast food or meals
+FOOD_TYPE_KEYWORDS = {
+    "fast food": {"burger", "pizza", "fries", "wrap", "snack", "sandwich",
+                  "mojito", "fast", "quick", "shake", "coke", "cola"},
+    "meals": {"biryani", "roti", "paneer", "dal", "naan", "curry",
+              "rice", "dinner", "lunch", "meal", "platter", "thali"},
+}
+
+# Most restaurants offered for an opening message that names dishes
+RESTAURANT_SEARCH_LIMIT = int(os.environ.get("RESTAURANT_SEARCH_LIMIT", 10))
+
+# Most extracted items matched from one ordering message; the rest are ignored
+MAX_ORDER_ENTITIES = int(os.environ.get("MAX_ORDER_ENTITIES", 20))
+
+# Allow per-request sampling profiles (?profile=1 or an X-Profile: 1 header)
+PROFILE_REQUESTS = os.environ.get("PROFILE_REQUESTS", "false").lower() == "true"
+
+# Spelling correction backend: "menu" (menu vocabulary), "textblob" or "none"
+SPELL_CORRECTOR = os.environ.get("SPELL_CORRECTOR", "menu").lower()
+
+# Server-side conversation state; clients only send a session ID
+session_store = create_session_store()
+
+# Placed orders, appended durably when the delivery address is confirmed
+order_log = create_order_log()
+
+# Rate limits, message length cap and load shedding for NLP turns (see admission.py)
+admission = AdmissionController()
+
+# Parsed results for repeated utterances such as "done" or "1 chicken biryani"
+result_cache = LRUCache(max_size=int(os.environ.get("RESULT_CACHE_SIZE", 4096)),
+                        ttl=int(os.environ.get("RESULT_CACHE_TTL", 3600)) or None)
+
+# Menus and everything derived from them; the menu file is re-read in the
+# background when it changes (every MENU_RELOAD_INTERVAL seconds at most, 0 disables)
+MENU_FILE = os.environ.get("MENU_FILE", 'menus.txt')
+catalog = MenuCatalog(MENU_FILE, load_menus,
+                      check_interval=float(os.environ.get("MENU_RELOAD_INTERVAL", 5)),
+                      # Old results can no longer be hit once the version changes; free them now
+                      on_reload=result_cache.clear,
+                      synonyms=synonyms_map,
+                      scorer=fuzz.ratio if fuzzywuzzy_available else None,
+                      protected=stop_words,
+                      categories=FOOD_TYPE_KEYWORDS,
+                      # Optional last matcher stage for paraphrases (SEMANTIC_MATCHING=true)
+                      encoder=semantic.get_encoder())
+
+metrics.gauge("foodbot_result_cache_hits", "Result cache hits", lambda: result_cache.hits)
+metrics.gauge("foodbot_result_cache_misses", "Result cache misses", lambda: result_cache.misses)
+metrics.gauge("foodbot_menu_version", "Version of the menu catalog being served", lambda: catalog.version)
+
+def reload_menus():
+    """Reload the menu file now; returns False if it could not be loaded"""
+    return catalog.reload()
+
+def remote_nlp(op, texts):
+    """Results of op from the NLP sidecar, or None if there is none or it cannot be reached"""
+    if nlp_client is None:
         return None
-    except Exception as e:
-        logger.error(f"Error loading menu: {str(e)}")
+    try:
+        with STAGE_SECONDS.time("nlp_sidecar"):
+            return nlp_client.call(op, texts)
+    except NLPServerError as e:
+        logger.warning(f"NLP sidecar failed, running {op} locally: {str(e)}")
         return None
 
-# Try to load menus from file
-MENUS = load_menu_from_file('menus.txt') 
-
-def correct_spelling(text):
+def correct_spelling_textblob(text):
     """Correct spelling using TextBlob"""
+    remote = remote_nlp("correct_spelling", [text])
+    if remote is not None:
+        return remote[0]
     try:
         blob = TextBlob(text)
         return str(blob.correct())
@@ -121,13 +172,33 @@ def correct_spelling(text):
         logger.warning("TextBlob spelling correction failed, using original text")
         return text
 
-def normalize_tokens(text):
+def correct_spelling(text, snapshot=None, cheap=False):
+    """Correct spelling with the corrector selected by SPELL_CORRECTOR (menu corrector when cheap)"""
+    if SPELL_CORRECTOR == "none":
+        return text
+    if SPELL_CORRECTOR == "textblob" and not cheap:
+        return correct_spelling_textblob(text)
+    return (snapshot or catalog.snapshot()).corrector.correct(text)
+
+@lru_cache(maxsize=256)
+def parse_text(text, with_parser=True):
+    """Parse text with the shared spaCy pipeline, reusing the Doc for repeated text"""
+    return nlp_models.get_nlp()(text, disable=[] if with_parser else TAGGER_ONLY_DISABLE)
+
+def parse_texts(texts, with_parser=True, batch_size=64, n_process=1):
+    """Parse many texts with nlp.pipe for offline or bulk processing"""
+    disable = [] if with_parser else TAGGER_ONLY_DISABLE
+    return nlp_models.get_nlp().pipe(texts, disable=disable, batch_size=batch_size, n_process=n_process)
+
+def normalize_tokens(text, doc=None):
     """Normalize and clean text tokens"""
     if spacy_available:
-        doc = nlp(text.lower())
+        if doc is None:
+            doc = parse_text(text.lower(), with_parser=False)
         return [token.lemma_ for token in doc if not token.is_stop and token.is_alpha]
     else:
         tokens = word_tokenize(text.lower())
+        lemmatizer = nlp_models.get_lemmatizer()
         return [lemmatizer.lemmatize(word) for word in tokens 
                 if word.isalnum() and word not in stop_words]
 
@@ -182,80 +253,113 @@ def resolve_synonym(word):
     """Get synonym for word if exists"""
     return synonyms_map.get(word, word)
 
-def extract_food_entities(text):
-    """Extract food entities and quantities from text"""
-    quantities = {}
-    food_entities = []
-    
-    # Convert words to numbers
-    text = text.lower().replace('one', '1').replace('two', '2').replace('three', '3').replace('four', '4').replace('five', '5')
-    
-    # Handle patterns like "2 roti" and "1 mineral water" in same request
-    # Match patterns like "X item" where X is a number
-    quantity_item_pattern = re.compile(r'(\d+)\s+([a-zA-Z\s]+?)(?:,|\s+and|\s+&|\s*$)')
-    matches = quantity_item_pattern.findall(text.lower())
-    
-    for quantity, item in matches:
-        item = item.strip()
-        quantities[item] = int(quantity)
-        food_entities.append(item)
+def extract_from_doc(doc, food_entities, quantities):
+    """Extract food entities and quantities from a parsed spaCy Doc"""
+    # Extract quantities with associated entities
+    for i, token in enumerate(doc):
+        if token.like_num and i + 1 < len(doc):
+            # Find the noun phrase following the number
+            j = i + 1
+            while j < len(doc) and (doc[j].pos_ in ["NOUN", "ADJ"] or doc[j].text in ["of", "and"]):
+                j += 1
+            
+            if j > i + 1:
+                potential_food = " ".join([t.text.lower() for t in doc[i+1:j]])
+                quantities[potential_food] = int(token.text)
+                food_entities.append(potential_food)
     
-    # If no matches found with regex pattern, use NLP-based extraction
+    # Extract noun chunks as potential food items if no quantities found
     if not food_entities:
-        if spacy_available:
-            doc = nlp(text)
-            
-            # Extract quantities with associated entities
-            for i, token in enumerate(doc):
-                if token.like_num and i + 1 < len(doc):
-                    # Find the noun phrase following the number
-                    j = i + 1
-                    while j < len(doc) and (doc[j].pos_ in ["NOUN", "ADJ"] or doc[j].text in ["of", "and"]):
-                        j += 1
-                    
-                    if j > i + 1:
-                        potential_food = " ".join([t.text.lower() for t in doc[i+1:j]])
-                        quantities[potential_food] = int(token.text)
-                        food_entities.append(potential_food)
-            
-            # Extract noun chunks as potential food items if no quantities found
-            if not food_entities:
-                for chunk in doc.noun_chunks:
-                    chunk_text = chunk.text.lower()
-                    # Skip very short chunks or those containing stop words only
-                    if len(chunk_text) > 2 and not all(word in stop_words for word in chunk_text.split()):
-                        food_entities.append(chunk_text)
-                        # Default quantity is 1
-                        if chunk_text not in quantities:
-                            quantities[chunk_text] = 1
-        else:
-            # Fallback to basic tokenization
-            tokens = word_tokenize(text.lower())
+        for chunk in doc.noun_chunks:
+            chunk_text = chunk.text.lower()
+            # Skip very short chunks or those containing stop words only
+            if len(chunk_text) > 2 and not all(word in stop_words for word in chunk_text.split()):
+                food_entities.append(chunk_text)
+                # Default quantity is 1
+                if chunk_text not in quantities:
+                    quantities[chunk_text] = 1
+
+def extract_with_tokens(text, food_entities, quantities):
+    """Fallback extraction with basic NLTK tokenization"""
+    tokens = word_tokenize(text.lower())
+    
+    for i, token in enumerate(tokens):
+        if token.isdigit() and i + 1 < len(tokens):
+            # Try to find multi-word food items
+            j = i + 1
+            while j < len(tokens) and tokens[j] not in [',', 'and', '&'] and not tokens[j].isdigit():
+                j += 1
             
-            for i, token in enumerate(tokens):
-                if token.isdigit() and i + 1 < len(tokens):
-                    # Try to find multi-word food items
-                    j = i + 1
-                    while j < len(tokens) and tokens[j] not in [',', 'and', '&'] and not tokens[j].isdigit():
-                        j += 1
-                    
-                    if j > i + 1:
-                        potential_food = " ".join(tokens[i+1:j])
-                        quantities[potential_food] = int(token)
-                        food_entities.append(potential_food)
+            if j > i + 1:
+                potential_food = " ".join(tokens[i+1:j])
+                quantities[potential_food] = int(token)
+                food_entities.append(potential_food)
+
+def extract_food_entities(text, snapshot=None, cheap=False):
+    """Extract food entities and quantities from text; cheap skips the NLP fallback"""
+    tokenizer = (snapshot or catalog.snapshot()).tokenizer
+    food_entities, quantities = tokenizer.extract(text)
     
-    logger.info(f"Extracted food entities: {food_entities}")
-    logger.info(f"Extracted quantities: {quantities}")
+    # If the tokenizer found no known item or quantity, use NLP-based extraction
+    if not food_entities and not cheap:
+        remote = remote_nlp("extract_food_entities", [text])
+        if remote is not None:
+            return tuple(remote[0])
+        text = number_words_to_digits(text)
+        with STAGE_SECONDS.time("nlp_fallback"):
+            if spacy_available:
+                extract_from_doc(parse_text(text), food_entities, quantities)
+            else:
+                extract_with_tokens(text, food_entities, quantities)
+    
+    logger.debug("Extracted food entities: %s, quantities: %s", food_entities, quantities)
     
     return food_entities, quantities
 
-def process_order_request(menu, user_input):
-    """Process order request and extract items"""
-    corrected = correct_spelling(user_input)
-    food_entities, quantities = extract_food_entities(corrected)
+def extract_food_entities_batch(texts, batch_size=64, n_process=1, snapshot=None):
+    """Extract food entities for many texts, parsing the tokenizer misses with nlp.pipe"""
+    tokenizer = (snapshot or catalog.snapshot()).tokenizer
+    results = [tokenizer.extract(text) for text in texts]
+    
+    misses = [i for i, (food_entities, _) in enumerate(results) if not food_entities]
+    remote = remote_nlp("extract_food_entities", [texts[i] for i in misses]) if misses else None
+    if remote is not None:
+        for i, result in zip(misses, remote):
+            results[i] = tuple(result)
+        return results
+    converted = {i: number_words_to_digits(texts[i]) for i in misses}
+    if misses and spacy_available:
+        docs = parse_texts((converted[i] for i in misses), batch_size=batch_size, n_process=n_process)
+        for i, doc in zip(misses, docs):
+            extract_from_doc(doc, *results[i])
+    else:
+        for i in misses:
+            extract_with_tokens(converted[i], *results[i])
+    
+    return results
+
+def process_order_request(menu, user_input, match_index=None, snapshot=None, on_item=None, cheap=False):
+    """Process order request and extract items; cheap runs only the tokenizer and match index"""
+    with STAGE_SECONDS.time("spelling"):
+        corrected = correct_spelling(user_input, snapshot, cheap)
+    with STAGE_SECONDS.time("extraction"):
+        food_entities, quantities = extract_food_entities(corrected, snapshot, cheap)
+    if len(food_entities) > MAX_ORDER_ENTITIES:
+        logger.info(f"Matching the first {MAX_ORDER_ENTITIES} of {len(food_entities)} extracted items")
+        food_entities = food_entities[:MAX_ORDER_ENTITIES]
+    with STAGE_SECONDS.time("matching"):
+        return match_order_entities(menu, food_entities, quantities, match_index, on_item, cheap)
+
+def match_order_entities(menu, food_entities, quantities, match_index=None, on_item=None, cheap=False):
+    """Resolve extracted food entities to priced menu items; on_item sees each one as it resolves"""
+    if match_index is None:
+        match_index = MenuMatchIndex(menu, synonyms_map, fuzz.ratio if fuzzywuzzy_available else None)
     
     results = []
     processed_entities = set()
+
+    # Resolve every entity of the message in one pass over the index
+    matches = match_index.match_many((resolve_synonym(entity) for entity in food_entities), semantic=not cheap)
     
     # Process each extracted food entity
     for entity in food_entities:
@@ -266,8 +370,7 @@ def process_order_request(menu, user_input):
         quantity = quantities.get(entity, 1)
         
         # Try to find a match in menu
-        resolved_entity = resolve_synonym(entity)
-        match = find_best_match(resolved_entity, menu.keys())
+        match = matches[resolve_synonym(entity)]
         
         if match:
             results.append({
@@ -275,6 +378,8 @@ def process_order_request(menu, user_input):
                 "price": menu[match],
                 "quantity": quantity
             })
+            if on_item is not None:
+                on_item(dict(results[-1]))
             processed_entities.add(entity)
             continue
         
@@ -282,10 +387,11 @@ def process_order_request(menu, user_input):
         # This is useful for cases like "chicken biryani" where both words might be important
         words = entity.split()
         if len(words) > 1:
+            word_matches = match_index.match_many((resolve_synonym(word) for word in words if word not in stop_words),
+                                                  semantic=not cheap)
             for word in words:
                 if word not in stop_words and word not in processed_entities:
-                    resolved_word = resolve_synonym(word)
-                    word_match = find_best_match(resolved_word, menu.keys())
+                    word_match = word_matches[resolve_synonym(word)]
                     
                     if word_match:
                         results.append({
@@ -293,9 +399,11 @@ def process_order_request(menu, user_input):
                             "price": menu[word_match],
                             "quantity": quantity
                         })
+                        if on_item is not None:
+                            on_item(dict(results[-1]))
                         processed_entities.add(word)
     
-    logger.info(f"Processed order items: {results}")
+    logger.debug("Processed order items: %s", results)
     return results
 
 def find_best_match(user_word, menu_items):
@@ -345,18 +453,17 @@ def find_best_match(user_word, menu_items):
     
     return None
 
-def get_food_type(user_input):
-    """Determine food type based on input text"""
-    tokens = normalize_tokens(user_input)
+def get_food_type(user_input, doc=None, snapshot=None, cheap=False):
+    """Determine food type based on input text; cheap compares plain words, unlemmatized"""
+    if doc is None and not cheap:
+        remote = remote_nlp("get_food_type", [user_input])
+        if remote is not None:
+            return remote[0]
+    tokens = user_input.lower().split() if cheap else normalize_tokens(user_input, doc)
     text_set = set(tokens)
     
-    fast_keywords = {"burger", "pizza", "fries", "wrap", "snack", "sandwich", 
-                    "mojito", "fast", "quick", "shake", "coke", "cola"}
-    meal_keywords = {"biryani", "roti", "paneer", "dal", "naan", "curry", 
-                    "rice", "dinner", "lunch", "meal", "platter", "thali"}
-    
-    fast_match = len(fast_keywords & text_set)
-    meal_match = len(meal_keywords & text_set)
+    fast_match = len(FOOD_TYPE_KEYWORDS["fast food"] & text_set)
+    meal_match = len(FOOD_TYPE_KEYWORDS["meals"] & text_set)
     
     if fast_match > meal_match:
         return "fast food"
@@ -364,20 +471,70 @@ def get_food_type(user_input):
         return "meals"
     else:
         # Check for restaurant names as fallback
-        if any(rest in user_input.lower() for rest in ["tasty", "bites"]):
-            return "fast food"
-        elif any(rest in user_input.lower() for rest in ["desi", "delight"]):
-            return "meals"
+        snapshot = snapshot or catalog.snapshot()
+        named = set()
+        for word in user_input.lower().split():
+            named |= snapshot.name_categories.get(word, set())
+        if len(named) == 1:
+            return named.pop()
         return "general"
 
-def get_restaurant_by_food_type(food_type, menus):
+def get_restaurant_by_food_type(food_type, snapshot=None):
     """Get restaurants that match the food type"""
-    if food_type == "fast food":
-        return [r for r in menus if "tasty bites" in r or "fast" in r]
-    elif food_type == "meals":
-        return [r for r in menus if "desi delight" in r or "meal" in r]
-    else:
-        return list(menus.keys())
+    return (snapshot or catalog.snapshot()).restaurants_for(food_type)
+
+def search_restaurants(user_input, snapshot=None, limit=RESTAURANT_SEARCH_LIMIT, cheap=False):
+    """Restaurants ranked by how well their menus match the dishes named in user_input"""
+    snapshot = snapshot or catalog.snapshot()
+    return snapshot.search_index.search(correct_spelling(user_input, snapshot, cheap), limit)
+
+def normalize_message(text):
+    """Lowercase and collapse whitespace so trivially different messages share a cache entry"""
+    return " ".join(text.lower().split())
+
+def cached_order_request(snapshot, restaurant, user_message, on_item=None, cheap=False):
+    """process_order_request memoized on (menu version, restaurant, normalized message).
+
+    Cheap-tier results are served but never cached, so the full pipeline
+    gets to answer the message once the load has passed.
+    """
+    message = normalize_message(user_message)
+    key = ('order', snapshot.version, restaurant, message)
+    items = result_cache.get(key)
+    if items is None:
+        items = process_order_request(snapshot.menus[restaurant], message,
+                                      snapshot.match_index(restaurant), snapshot, on_item, cheap)
+        if not cheap:
+            result_cache.set(key, items)
+    elif on_item is not None:
+        for item in items:
+            on_item(dict(item))
+    # Callers add these lines to an order, so never hand out the cached dicts
+    return [dict(item) for item in items]
+
+def cached_food_type(snapshot, user_message, cheap=False):
+    """get_food_type memoized on (menu version, normalized message)"""
+    message = normalize_message(user_message)
+    key = ('food_type', snapshot.version, message)
+    food_type = result_cache.get(key)
+    if food_type is None:
+        with STAGE_SECONDS.time("food_type"):
+            food_type = get_food_type(message, snapshot=snapshot, cheap=cheap)
+        if not cheap:
+            result_cache.set(key, food_type)
+    return food_type
+
+def cached_restaurant_search(snapshot, user_message, cheap=False):
+    """search_restaurants memoized on (menu version, normalized message)"""
+    message = normalize_message(user_message)
+    key = ('search', snapshot.version, message)
+    restaurants = result_cache.get(key)
+    if restaurants is None:
+        with STAGE_SECONDS.time("search"):
+            restaurants = search_restaurants(message, snapshot, cheap=cheap)
+        if not cheap:
+            result_cache.set(key, restaurants)
+    return restaurants
 
 # API routes
 @app.route('/')
@@ -388,178 +545,486 @@ def home():
 def serve_static(path):
     return send_from_directory('static', path)
 
-@app.route('/api/process', methods=['POST'])
-def process_message():
-    try:
-        data = request.json
-        user_message = data.get('message', '')
-        context = data.get('context', {})
+def modify_order(cart, modification, last_item, match_index):
+    """Apply a parsed remove/set command to the cart; returns (item changed or None, reply)"""
+    action, phrase, quantity = modification
+    item = last_item if phrase is None else match_index.match(resolve_synonym(phrase))
+    if item is None or item not in cart.menu or (action == 'remove' and item not in cart):
+        return None, f"I couldn't find {phrase or 'that'} in your order. What would you like to change?"
+    
+    if action == 'remove':
+        left = cart.remove(item, quantity)
+    else:
+        left = cart.set(item, quantity)
+    
+    if left:
+        message = f"Updated your order to {left} x {item.title()}."
+    else:
+        message = f"Removed {item.title()} from your order."
+    return item, f"{message} Your total is ₹{cart.total}. Anything else or type 'done' to finish?"
+
+def clear_order_details(context):
+    """Forget what belonged to the previous order when a new one starts"""
+    for key in ORDER_DETAIL_KEYS:
+        context.pop(key, None)
+
+def conversation_turn(user_message, context, on_item=None, cheap=False):
+    """Advance the conversation state machine by one user message.
+
+    on_item, if given, is called with each order line as soon as it is matched.
+    cheap parses with the tokenizer and match index only, for shedding load.
+    """
+    logger.debug("Processing message: %r with context: %s", user_message, context)
+    
+    # Get current conversation state
+    state = context.get('state', 'welcome')
+    restaurant = context.get('restaurant', '')
+    # One snapshot for the whole turn, even if the menus are reloaded meanwhile
+    snapshot = catalog.snapshot()
+    menus = snapshot.menus
+    # Never trust stored or client-supplied prices; the cart prices against the menu
+    cart = Cart.load(context.get('order'), menus.get(restaurant, {}))
+    
+    response = {
+        'message': '',
+        # Keys a turn does not touch (payment_method, last_item, address) carry over
+        'context': dict(context, state=state, restaurant=restaurant, order=cart.dump()),
+        'options': [],
+        'menu': [],
+        'order_summary': None
+    }
+    
+    # State machine for conversation flow
+    if state == 'welcome':
+        # Restaurants whose menus have the dishes the user named, best match first
+        options = cached_restaurant_search(snapshot, user_message, cheap)
+        if options:
+            response['message'] = "These restaurants have what you're looking for. Which one would you like to order from?"
+        else:
+            food_type = cached_food_type(snapshot, user_message, cheap)
+            options = get_restaurant_by_food_type(food_type, snapshot)
+            response['message'] = f"I found these restaurants for {food_type} cuisine. Which one would you like to order from?"
         
-        logger.info(f"Processing message: '{user_message}' with context: {context}")
+        response['options'] = [r.title() for r in options]
+        response['context']['state'] = 'select_restaurant'
         
-        # Get current conversation state
-        state = context.get('state', 'welcome')
-        restaurant = context.get('restaurant', '')
-        order = context.get('order', [])
-        menus = MENUS
+    elif state == 'select_restaurant':
+        # Find best restaurant match
+        selected = user_message.lower().strip()
+        matched_restaurant = None
         
-        response = {
-            'message': '',
-            'context': {
-                'state': state,
-                'restaurant': restaurant,
-                'order': order
-            },
-            'options': [],
-            'menu': [],
-            'order_summary': None
-        }
+        # Try exact match
+        for rest in menus:
+            if selected in rest or rest in selected:
+                matched_restaurant = rest
+                break
         
-        # State machine for conversation flow
-        if state == 'welcome':
-            food_type = get_food_type(user_message)
-            options = get_restaurant_by_food_type(food_type, menus)
-            
-            response['message'] = f"I found these restaurants for {food_type} cuisine. Which one would you like to order from?"
-            response['options'] = [r.title() for r in options]
-            response['context']['state'] = 'select_restaurant'
-            
-        elif state == 'select_restaurant':
-            # Find best restaurant match
-            selected = user_message.lower().strip()
-            matched_restaurant = None
-            
-            # Try exact match
-            for rest in menus:
-                if selected in rest or rest in selected:
-                    matched_restaurant = rest
-                    break
-            
-            # Try fuzzy match
-            if not matched_restaurant and fuzzywuzzy_available:
-                for rest in menus:
-                    if fuzz.ratio(selected, rest) > 70:
-                        matched_restaurant = rest
-                        break
+        # Try fuzzy match, taking the closest restaurant rather than the first one over the cutoff
+        if not matched_restaurant and fuzzywuzzy_available:
+            matched_restaurant = closest_choice(selected, snapshot.restaurants,
+                                                RESTAURANT_SCORE_CUTOFF, fuzz.ratio)
+        
+        if matched_restaurant:
+            restaurant = matched_restaurant
+            response['context']['restaurant'] = restaurant
+            response['context']['state'] = 'ordering'
+            clear_order_details(response['context'])
+            response['message'] = f"Great choice! Here's the menu from {restaurant.title()}. What would you like to order?"
+            response['menu'] = snapshot.menu_payload(restaurant)
+            response['menu_ref'] = snapshot.menu_ref(restaurant)
+        else:
+            response['message'] = "I don't recognize that restaurant. Please select one from the list."
+            response['options'] = snapshot.options
+            response['options_ref'] = snapshot.options_ref()
             
-            if matched_restaurant:
-                restaurant = matched_restaurant
-                response['context']['restaurant'] = restaurant
-                response['context']['state'] = 'ordering'
-                response['message'] = f"Great choice! Here's the menu from {restaurant.title()}. What would you like to order?"
-                response['menu'] = [{"name": item.title(), "price": price} for item, price in menus[restaurant].items()]
+    elif state == 'ordering':
+        if any(word in user_message.lower() for word in DONE_WORDS):
+            if cart:
+                response['context']['state'] = 'checkout'
+                response['message'] = "Here's your order summary. Would you like to proceed to checkout?"
+                response['order_summary'] = cart.summary()
             else:
-                response['message'] = "I don't recognize that restaurant. Please select one from the list."
-                options = list(menus.keys())
-                response['options'] = [r.title() for r in options]
-                
-        elif state == 'ordering':
-            if any(word in user_message.lower() for word in ['done', 'finished', 'complete', 'checkout']):
-                if order:
-                    response['context']['state'] = 'checkout'
-                    response['message'] = "Here's your order summary. Would you like to proceed to checkout?"
-                    
-                    # Calculate totals
-                    total = sum(item['price'] * item['quantity'] for item in order)
-                    response['order_summary'] = {
-                        'items': order,
-                        'total': total
-                    }
-                else:
-                    response['message'] = "Your order is empty. What would you like to order?"
+                response['message'] = "Your order is empty. What would you like to order?"
+        else:
+            # "remove the fries", "make it 3"
+            modification = parse_modification(user_message)
+            if modification:
+                item, response['message'] = modify_order(cart, modification, context.get('last_item'),
+                                                         snapshot.match_index(restaurant))
+                if item:
+                    response['context']['order'] = cart.dump()
+                    response['order_summary'] = cart.summary()
+                    if item in cart:
+                        response['context']['last_item'] = item
+                    else:
+                        response['context'].pop('last_item', None)
             else:
-                new_items = process_order_request(menus[restaurant], user_message)
+                new_items = cached_order_request(snapshot, restaurant, user_message, on_item, cheap)
                 if new_items:
-                    order.extend(new_items)
-                    response['context']['order'] = order
+                    # Ordering an item again adds to its line rather than repeating it
+                    for item in new_items:
+                        cart.add(item['item'], item['quantity'])
+                    response['context']['order'] = cart.dump()
+                    response['context']['last_item'] = new_items[-1]['item']
                     item_names = [f"{item['quantity']} x {item['item'].title()}" for item in new_items]
                     response['message'] = f"Added {', '.join(item_names)} to your order. Anything else or type 'done' to finish?"
                 else:
                     response['message'] = "I didn't recognize any items from our menu. Could you try again or type 'done' to finish your order?"
-                
-        elif state == 'checkout':
-            if any(word in user_message.lower() for word in ['yes', 'proceed', 'ok', 'sure', 'confirm']):
-                response['context']['state'] = 'payment'
-                response['message'] = "Great! Please choose your payment method:"
-                response['options'] = ['Credit Card', 'Debit Card', 'UPI', 'Cash on Delivery']
-            elif any(word in user_message.lower() for word in ['no', 'cancel', 'back']):
-                response['context']['state'] = 'ordering'
-                response['message'] = "No problem. You can continue ordering or type 'done' when you're finished."
-            else:
-                response['message'] = "Would you like to proceed to checkout? Please respond with yes or no."
-                
-        elif state == 'payment':
-            payment_methods = ['credit card', 'debit card', 'upi', 'cash on delivery']
-            selected_method = None
             
-            for method in payment_methods:
-                if method in user_message.lower():
-                    selected_method = method
-                    break
+    elif state == 'checkout':
+        if any(word in user_message.lower() for word in ['yes', 'proceed', 'ok', 'sure', 'confirm']):
+            response['context']['state'] = 'payment'
+            response['message'] = "Great! Please choose your payment method:"
+            response['options'] = ['Credit Card', 'Debit Card', 'UPI', 'Cash on Delivery']
+        elif any(word in user_message.lower() for word in ['no', 'cancel', 'back']):
+            response['context']['state'] = 'ordering'
+            response['message'] = "No problem. You can continue ordering or type 'done' when you're finished."
+        else:
+            response['message'] = "Would you like to proceed to checkout? Please respond with yes or no."
             
-            if selected_method:
-                response['context']['state'] = 'delivery'
-                response['context']['payment_method'] = selected_method
-                response['message'] = "Please provide your delivery address."
-            else:
-                response['message'] = "Please select a valid payment method: Credit Card, Debit Card, UPI, or Cash on Delivery."
-                response['options'] = ['Credit Card', 'Debit Card', 'UPI', 'Cash on Delivery']
-                
-        elif state == 'delivery':
-            # Simple validation: Check if the message has enough words to be an address
-            if len(user_message.split()) >= 3:
-                response['context']['state'] = 'confirmation'
-                response['context']['address'] = user_message
-                
-                # Calculate order total
-                total = sum(item['price'] * item['quantity'] for item in order)
-                
-                # Generate order ID
-                import random
-                order_id = f"ORDER{random.randint(10000, 99999)}"
-                response['context']['order_id'] = order_id
-                
-                payment_method = response['context'].get('payment_method', 'selected payment method')
-                
-                response['message'] = f"Thank you! Your order (ID: {order_id}) has been placed successfully with {restaurant.title()}. Your total is ₹{total}. Payment will be made via {payment_method}. Your food will be delivered to your address within 30-45 minutes."
-                
-                # Reset order but keep restaurant and state for potential reordering
-                response['context']['state'] = 'new_order'
-            else:
-                response['message'] = "Please provide a valid delivery address with street name, area, and city."
-                
-        elif state == 'new_order':
-            if any(word in user_message.lower() for word in ['new', 'another', 'more', 'again']):
-                response['context']['state'] = 'ordering'
-                response['context']['order'] = []
-                response['message'] = f"Sure! Let's start a new order with {restaurant.title()}. What would you like to order?"
-                response['menu'] = [{"name": item.title(), "price": price} for item, price in menus[restaurant].items()]
-            elif any(word in user_message.lower() for word in ['bye', 'thank', 'thanks', 'quit', 'exit']):
-                response['context']['state'] = 'welcome'
-                response['context']['restaurant'] = ''
-                response['context']['order'] = []
-                response['message'] = "Thank you for ordering with us! Feel free to start a new order anytime. Just tell me what you're looking for."
-            else:
-                response['message'] = "Would you like to place another order or are you done for now?"
-                response['options'] = ['New Order', 'Exit']
+    elif state == 'payment':
+        payment_methods = ['credit card', 'debit card', 'upi', 'cash on delivery']
+        selected_method = None
         
-        # Default welcome message for new sessions
+        for method in payment_methods:
+            if method in user_message.lower():
+                selected_method = method
+                break
+        
+        if selected_method:
+            response['context']['state'] = 'delivery'
+            response['context']['payment_method'] = selected_method
+            response['message'] = "Please provide your delivery address."
         else:
+            response['message'] = "Please select a valid payment method: Credit Card, Debit Card, UPI, or Cash on Delivery."
+            response['options'] = ['Credit Card', 'Debit Card', 'UPI', 'Cash on Delivery']
+            
+    elif state == 'delivery':
+        # A client-supplied context can claim any state; only a real, non-empty cart is placed
+        if restaurant not in menus:
             response['context']['state'] = 'welcome'
-            response['message'] = "Welcome to NLP Food Ordering System! What would you like to eat today?"
+            response['context']['restaurant'] = ''
+            response['context']['order'] = []
+            response['message'] = "Please choose a restaurant first. What would you like to eat today?"
+        elif not cart:
+            response['context']['state'] = 'ordering'
+            response['message'] = "Your order is empty. What would you like to order?"
+        # Simple validation: Check if the message has enough words to be an address
+        elif places_order(state, user_message):
+            response['context']['state'] = 'confirmation'
+            response['context']['address'] = user_message
             
-        return jsonify(response)
+            total = cart.total
+            
+            payment_method = context.get('payment_method', 'selected payment method')
+            
+            # Record the order; the log assigns a unique, time-ordered ID
+            order_id = order_log.append(restaurant, cart.lines(), total,
+                                        payment_method=payment_method, address=user_message)
+            response['context']['order_id'] = order_id
+            # Only this session may look its orders up (GET /api/orders/<order_id>)
+            response['context']['placed_orders'] = context.get('placed_orders', []) + [order_id]
+            
+            response['message'] = f"Thank you! Your order (ID: {order_id}) has been placed successfully with {restaurant.title()}. Your total is ₹{total}. Payment will be made via {payment_method}. Your food will be delivered to your address within 30-45 minutes."
+            
+            # Reset order but keep restaurant and state for potential reordering
+            response['context']['state'] = 'new_order'
+        else:
+            response['message'] = "Please provide a valid delivery address with street name, area, and city."
+            
+    elif state == 'new_order':
+        if any(word in user_message.lower() for word in ['new', 'another', 'more', 'again']):
+            response['context']['state'] = 'ordering'
+            response['context']['order'] = []
+            clear_order_details(response['context'])
+            response['message'] = f"Sure! Let's start a new order with {restaurant.title()}. What would you like to order?"
+            response['menu'] = snapshot.menu_payload(restaurant)
+            response['menu_ref'] = snapshot.menu_ref(restaurant)
+        elif any(word in user_message.lower() for word in ['bye', 'thank', 'thanks', 'quit', 'exit']):
+            response['context']['state'] = 'welcome'
+            response['context']['restaurant'] = ''
+            response['context']['order'] = []
+            clear_order_details(response['context'])
+            response['message'] = "Thank you for ordering with us! Feel free to start a new order anytime. Just tell me what you're looking for."
+        else:
+            response['message'] = "Would you like to place another order or are you done for now?"
+            response['options'] = ['New Order', 'Exit']
+    
+    # Default welcome message for new sessions
+    else:
+        response['context']['state'] = 'welcome'
+        response['message'] = "Welcome to NLP Food Ordering System! What would you like to eat today?"
+    
+    return response
+
+def run_turn(user_message, context, profile=False, on_item=None, cheap=False):
+    """conversation_turn, timed per state and optionally under the sampling profiler"""
+    with TURN_SECONDS.time(context.get('state', 'welcome')):
+        if not profile:
+            return conversation_turn(user_message, context, on_item, cheap)
+        with SamplingProfiler() as profiler:
+            response = conversation_turn(user_message, context, on_item, cheap)
+    response['profile'] = profiler.report()
+    logger.info("Profile for %r:\n%s", user_message, "\n".join(profiler.collapsed()))
+    return response
+
+def pooled_turn(user_message, context, profile=False):
+    """run_turn for a worker process; also hands back the worker's metric updates"""
+    response = run_turn(user_message, context, profile)
+    return response, metrics.drain()
+
+def wants_profile(flag):
+    """Whether a request that asked for a profile (?profile=1 or X-Profile: 1) gets one"""
+    return PROFILE_REQUESTS and flag in ('1', 'true')
+
+def needs_nlp(state, user_message):
+    """Whether this turn runs the expensive NLP pipeline (welcome and ordering)"""
+    if state == 'welcome':
+        return True
+    if state == 'ordering':
+        return not any(word in user_message.lower() for word in DONE_WORDS)
+    return False
+
+def places_order(state, user_message):
+    """Whether this turn gives a delivery address and so writes an order"""
+    return state == 'delivery' and len(user_message.split()) >= 3
+
+def open_session(data):
+    """Return (session_id, context) for a request; session_id is None for legacy clients"""
+    # Legacy clients still send the whole context with every message
+    if 'context' in data and not data.get('session_id'):
+        return None, data.get('context') or {}
+    
+    session_id = data.get('session_id')
+    context = session_store.get(session_id) if session_id else None
+    if context is None:
+        return new_session_id(), {}
+    return session_id, context
+
+def close_session(session_id, response, by_ref=False):
+    """Persist the new context and trim the response down to what the client needs.
+
+    Clients that sent "by_ref": true fetch (and cache) menus and the full
+    restaurant list from menu_ref / options_ref instead of receiving them inline.
+    """
+    if by_ref:
+        if 'menu_ref' in response:
+            response['menu'] = []
+        if 'options_ref' in response:
+            response['options'] = []
+    if session_id is None:
+        return response
+    session_store.save(session_id, response['context'])
+    
+    # The client only needs the state; everything else stays on the server
+    response['session_id'] = session_id
+    response['context'] = {'state': response['context']['state']}
+    return response
+
+def busy_response(session_id, context, message=None):
+    """Ask the user to retry without advancing the conversation"""
+    response = {
+        'message': message or "We're handling a lot of orders right now. Please send that again in a moment.",
+        'context': context,
+        'options': [],
+        'menu': [],
+        'order_summary': None
+    }
+    if session_id is not None:
+        response['session_id'] = session_id
+        response['context'] = {'state': context.get('state', 'welcome')}
+    return response
+
+def admission_error(data, session_id, context, ip):
+    """(status, response, headers) for an NLP or order-placing turn admission control turns away, else None"""
+    user_message = data.get('message', '')
+    state = context.get('state', 'welcome')
+    if not (needs_nlp(state, user_message) or places_order(state, user_message)):
+        return None
+    # Only a session the client already had counts; a made-up or missing ID gets a new one every time
+    known_session = session_id if session_id and data.get('session_id') == session_id else None
+    rejected = admission.check(known_session, ip, user_message)
+    if rejected is None:
+        return None
+    reason, wait = rejected
+    if reason == 'too_long':
+        message = f"That message is too long for me. Please keep it under {admission.max_length} characters."
+        return 413, busy_response(session_id, context, message), {}
+    message = "You're sending messages faster than I can keep up. Please wait a moment and try again."
+    return 429, busy_response(session_id, context, message), {'Retry-After': str(max(1, math.ceil(wait)))}
+
+def request_ip():
+    """The client address admission control keys IP limits on"""
+    forwarded = request.headers.get(TRUSTED_PROXY_HEADER) if TRUSTED_PROXY_HEADER else None
+    return client_ip(request.remote_addr, forwarded)
+
+def admitted_turn(user_message, context, profile=False, on_item=None):
+    """run_turn, on the cheap tier when too many NLP turns are already in flight"""
+    if not needs_nlp(context.get('state', 'welcome'), user_message):
+        return run_turn(user_message, context, profile, on_item)
+    with admission.expensive_turn() as shed:
+        return run_turn(user_message, context, profile, on_item, cheap=shed)
+
+def error_response(session_id):
+    """Reset the conversation after an unexpected error"""
+    context = {
+        'state': 'welcome',
+        'restaurant': '',
+        'order': []
+    }
+    response = {
+        'message': "Sorry, there was an error processing your request. Please try again.",
+        'context': context
+    }
+    return close_session(session_id, response)
+
+@app.route('/api/process', methods=['POST'])
+def process_message():
+    session_id = None
+    try:
+        data = request.json
+        session_id, context = open_session(data)
+        rejected = admission_error(data, session_id, context, request_ip())
+        if rejected is not None:
+            status, response, headers = rejected
+            return jsonify(response), status, headers
+        profile = wants_profile(request.args.get('profile') or request.headers.get('X-Profile'))
+        response = admitted_turn(data.get('message', ''), context, profile)
+        return jsonify(close_session(session_id, response, data.get('by_ref', False)))
             
     except Exception as e:
         logger.error(f"Error processing message: {str(e)}")
-        return jsonify({
-            'message': "Sorry, there was an error processing your request. Please try again.",
-            'context': {
-                'state': 'welcome',
-                'restaurant': '',
-                'order': []
-            }
-        })
+        return jsonify(error_response(session_id))
+
+def stream_turn(session_id, user_message, context, profile=False, by_ref=False):
+    """NDJSON events for one turn: an ack, one event per matched item, then the full response.
+
+    The turn runs on its own thread so the ack and items can be sent while
+    spelling correction, extraction and the rest of the turn still run.
+    """
+    events = queue.Queue()
+    
+    def on_item(item):
+        events.put(dict(item, event='item'))
+    
+    def run():
+        try:
+            response = admitted_turn(user_message, context, profile, on_item)
+            events.put(dict(close_session(session_id, response, by_ref), event='final'))
+        except Exception as e:
+            logger.error(f"Error processing message: {str(e)}")
+            events.put(dict(error_response(session_id), event='final'))
+    
+    threading.Thread(target=run, name="stream-turn", daemon=True).start()
+    ack = {'event': 'ack', 'state': context.get('state', 'welcome')}
+    if session_id is not None:
+        ack['session_id'] = session_id
+    yield json.dumps(ack) + "\n"
+    while True:
+        event = events.get()
+        yield json.dumps(event) + "\n"
+        if event['event'] == 'final':
+            return
+
+@app.route('/api/process/stream', methods=['POST'])
+def process_message_stream():
+    """Streaming /api/process: newline-delimited JSON events instead of one response"""
+    session_id = None
+    try:
+        data = request.json
+        session_id, context = open_session(data)
+        rejected = admission_error(data, session_id, context, request_ip())
+    except Exception as e:
+        logger.error(f"Error processing message: {str(e)}")
+        return jsonify(dict(error_response(session_id), event='final'))
+    if rejected is not None:
+        status, response, headers = rejected
+        return jsonify(dict(response, event='final')), status, headers
+    profile = wants_profile(request.args.get('profile') or request.headers.get('X-Profile'))
+    events = stream_turn(session_id, data.get('message', ''), context, profile, data.get('by_ref', False))
+    # Tell nginx-style proxies not to buffer the stream
+    return Response(events, mimetype='application/x-ndjson', headers={'X-Accel-Buffering': 'no'})
+
+def payload_response(body, etag):
+    """Pre-serialized JSON with an ETag; 304 when the client already has it.
+
+    A request for the version it was pointed at (?v=<etag>) can be cached
+    for good, since that URL never changes content.
+    """
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    if request.args.get('v') == etag:
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    else:
+        response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+@app.route('/api/menus/<path:restaurant>')
+def get_menu(restaurant):
+    """A restaurant's menu, as referenced by menu_ref"""
+    snapshot = catalog.snapshot()
+    restaurant = restaurant.lower()
+    if restaurant not in snapshot.menus:
+        return jsonify({'error': 'Restaurant not found'}), 404
+    return payload_response(*snapshot.menu_bytes(restaurant))
+
+@app.route('/api/restaurants')
+def get_restaurants():
+    """Every restaurant's display name, as referenced by options_ref"""
+    return payload_response(*catalog.snapshot().options_bytes())
+
+@app.route('/api/orders/<order_id>')
+def get_order(order_id):
+    """Look up an order placed by the session named in the X-Session-Id header"""
+    order_id = order_id.upper()
+    session_id = request.headers.get('X-Session-Id')
+    context = session_store.get(session_id) if session_id else None
+    # Someone else's order looks exactly like a missing one, so IDs cannot be probed
+    order = None
+    if context is not None and order_id in context.get('placed_orders', []):
+        order = order_log.get(order_id)
+    if order is None:
+        return jsonify({'error': 'Order not found'}), 404
+    return jsonify(order)
+
+@app.route('/api/cache/stats')
+def cache_stats():
+    """Hit/miss counters for sizing the result cache"""
+    stats = result_cache.stats()
+    stats['menu_version'] = catalog.version
+    return jsonify(stats)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Stage and turn latency histograms and matcher counters in Prometheus text format"""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+@app.route('/api/process/batch', methods=['POST'])
+def process_batch():
+    """Parse a JSONL body of {message, restaurant} records and stream JSONL results.
+
+    ?workers=1 parses in this thread; otherwise chunks go to the web worker's shared pool.
+    """
+    if batch.job_slots is None:
+        return jsonify({'error': 'Batch parsing is disabled'}), 404
+    workers = min(request.args.get('workers', batch.BATCH_WORKERS, type=int), batch.BATCH_WORKERS)
+    chunk_size = request.args.get('chunk_size', batch.BATCH_CHUNK_SIZE, type=int)
+    if chunk_size <= 0:
+        return jsonify({'error': 'chunk_size must be positive'}), 400
+    if not batch.job_slots.acquire(blocking=False):
+        return jsonify({'error': 'Too many batch jobs are running; try again later'}), 503, {'Retry-After': '5'}
+    try:
+        pool = batch.shared_pool() if workers > 1 else None
+        lines = batch.stream_jsonl(request.stream, workers=workers, chunk_size=chunk_size, pool=pool)
+        response = Response(stream_with_context(lines), mimetype='application/x-ndjson')
+    except Exception:
+        batch.job_slots.release()
+        raise
+    # Held until the response has finished streaming, or the client went away
+    response.call_on_close(batch.job_slots.release)
+    return response
 
 if __name__ == '__main__':
     port=int(os.environ.get("PORT", 5000))
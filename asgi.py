@@ -0,0 +1,183 @@
+# asgi.py - Async serving mode for the NLP Food Ordering System
+#
+# Run with:  uvicorn asgi:application --port 5000
+#
+# /api/process is handled natively: the cheap state-machine branches
+# (checkout, payment, new_order, and "done" while ordering) are answered
+# straight from the event loop, delivery (which waits for the order log's
+# commit) from a thread, and the NLP-heavy 'welcome' and 'ordering' turns
+# go to a bounded process pool. Once more than
+# SHED_QUEUE_DEPTH of those are in flight, new ones are answered on the
+# cheap tier in the event loop instead (see admission.py). Every other
+# route is served by the existing Flask app through asgiref's WSGI adapter.
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+import app as food_app
+import metrics
+from admission import TRUSTED_PROXY_HEADER, client_ip
+from nlp_models import worker_context
+
+logger = logging.getLogger(__name__)
+
+NLP_WORKERS = int(os.environ.get("ASGI_NLP_WORKERS", multiprocessing.cpu_count()))
+# Turns allowed to wait for or run on the pool before new ones are shed
+MAX_PENDING = int(os.environ.get("ASGI_MAX_PENDING", NLP_WORKERS * 8))
+
+
+class PoolSaturated(Exception):
+    """Raised when the NLP pool already has MAX_PENDING turns queued, or keeps losing workers"""
+
+
+class NLPWorkerPool:
+    """Process pool for NLP-heavy conversation turns with a queue-depth limit"""
+
+    def __init__(self, workers=NLP_WORKERS, max_pending=MAX_PENDING):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.pending = 0
+        self.executor = None
+
+    def start(self):
+        self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=worker_context())
+
+    def shutdown(self):
+        if self.executor is not None:
+            self.executor.shutdown(wait=True, cancel_futures=True)
+            self.executor = None
+
+    def restart(self, broken):
+        """Replace the executor after one of its workers died, unless another turn already did"""
+        if self.executor is broken:
+            logger.error("NLP worker process died; starting a new pool")
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.start()
+
+    async def run(self, func, *args):
+        if self.pending >= self.max_pending:
+            raise PoolSaturated()
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self.executor
+            try:
+                return await loop.run_in_executor(executor, func, *args)
+            except BrokenProcessPool:
+                # A dead worker breaks the whole pool for good; retry once on a fresh one
+                self.restart(executor)
+                executor = self.executor
+                try:
+                    return await loop.run_in_executor(executor, func, *args)
+                except BrokenProcessPool:
+                    self.restart(executor)
+                    raise PoolSaturated()
+        finally:
+            self.pending -= 1
+
+
+nlp_pool = NLPWorkerPool()
+flask_app = WsgiToAsgi(food_app.app)
+
+
+async def process_message(body, profile=False, ip=None):
+    """Async counterpart of app.process_message; returns (status, response, headers)"""
+    session_id = None
+    try:
+        data = json.loads(body or b'{}')
+        user_message = data.get('message', '')
+        session_id, context = food_app.open_session(data)
+        rejected = food_app.admission_error(data, session_id, context, ip)
+        if rejected is not None:
+            return rejected
+
+        if food_app.needs_nlp(context.get('state', 'welcome'), user_message):
+            with food_app.admission.expensive_turn() as shed:
+                if shed:
+                    # The cheap tier is fast enough to answer here instead of queueing for the pool
+                    response = food_app.run_turn(user_message, context, profile, cheap=True)
+                else:
+                    try:
+                        response, worker_metrics = await nlp_pool.run(
+                            food_app.pooled_turn, user_message, context, profile)
+                    except PoolSaturated:
+                        return 503, food_app.busy_response(session_id, context), {'Retry-After': '1'}
+                    metrics.merge(worker_metrics)
+        elif context.get('state') == 'delivery':
+            # Placing an order waits for the order log's group commit; wait on a
+            # thread so the loop keeps taking turns whose orders can share that commit
+            loop = asyncio.get_running_loop()
+            response = await loop.run_in_executor(None, food_app.run_turn, user_message, context, profile)
+        else:
+            response = food_app.run_turn(user_message, context, profile)
+
+        return 200, food_app.close_session(session_id, response, data.get('by_ref', False)), {}
+
+    except Exception as e:
+        logger.error(f"Error processing message: {str(e)}")
+        return 200, food_app.error_response(session_id), {}
+
+
+def wants_profile(scope):
+    """Whether the request asked for a sampling profile (?profile=1 or X-Profile: 1)"""
+    flag = parse_qs(scope.get('query_string', b'').decode()).get('profile', [None])[0]
+    flag = flag or dict(scope.get('headers', [])).get(b'x-profile', b'').decode()
+    return food_app.wants_profile(flag)
+
+
+async def read_body(receive):
+    chunks = []
+    while True:
+        event = await receive()
+        chunks.append(event.get('body', b''))
+        if not event.get('more_body'):
+            return b''.join(chunks)
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode('utf-8')
+    await send({
+        'type': 'http.response.start',
+        'status': status,
+        'headers': [(b'content-type', b'application/json'),
+                    (b'content-length', str(len(body)).encode())] + list(headers),
+    })
+    await send({'type': 'http.response.body', 'body': body})
+
+
+async def lifespan(receive, send):
+    while True:
+        event = await receive()
+        if event['type'] == 'lifespan.startup':
+            nlp_pool.start()
+            await send({'type': 'lifespan.startup.complete'})
+        elif event['type'] == 'lifespan.shutdown':
+            nlp_pool.shutdown()
+            await send({'type': 'lifespan.shutdown.complete'})
+            return
+
+
+async def application(scope, receive, send):
+    if scope['type'] == 'lifespan':
+        return await lifespan(receive, send)
+
+    if scope['type'] == 'http' and scope['path'] == '/api/process' and scope['method'] == 'POST':
+        if nlp_pool.executor is None:
+            nlp_pool.start()
+        client = scope.get('client') or (None,)
+        forwarded = None
+        if TRUSTED_PROXY_HEADER:
+            forwarded = dict(scope.get('headers', [])).get(TRUSTED_PROXY_HEADER.lower().encode(), b'').decode()
+        status, response, headers = await process_message(await read_body(receive), wants_profile(scope),
+                                                          client_ip(client[0], forwarded))
+        headers = [(name.lower().encode(), value.encode()) for name, value in headers.items()]
+        return await send_json(send, status, response, headers)
+
+    return await flask_app(scope, receive, send)
@@ -0,0 +1,158 @@
+# batch.py - Bulk order parsing for logged or sample messages
+#
+# Usage: python batch.py messages.jsonl -o parsed.jsonl [--workers 4] [--chunk-size 64]
+#
+# Each input line is a JSON object with "message" and "restaurant" (any other
+# keys, such as an "id", are copied to the output). Each output line adds the
+# corrected text, the extracted entities and quantities, and the matched
+# "items" exactly as /api/process would add them to an order.
+import argparse
+import itertools
+import json
+import os
+import sys
+import threading
+
+from nlp_models import worker_context
+
+BATCH_WORKERS = int(os.environ.get("BATCH_WORKERS", os.cpu_count() or 1))
+BATCH_CHUNK_SIZE = int(os.environ.get("BATCH_CHUNK_SIZE", 64))
+# /api/process/batch jobs a web worker runs at once; more are turned away, 0 disables the route
+BATCH_MAX_JOBS = int(os.environ.get("BATCH_MAX_JOBS", 2))
+
+# Taken by each /api/process/batch job for as long as its response streams
+job_slots = threading.BoundedSemaphore(BATCH_MAX_JOBS) if BATCH_MAX_JOBS > 0 else None
+
+_pool_lock = threading.Lock()
+_pool = None
+_pool_pid = None
+
+
+def shared_pool():
+    """This process's BATCH_WORKERS-process pool for /api/process/batch, started on first use"""
+    global _pool, _pool_pid
+    with _pool_lock:
+        # A forked web worker cannot use its parent's pool
+        if _pool is None or _pool_pid != os.getpid():
+            _pool = worker_context().Pool(BATCH_WORKERS)
+            _pool_pid = os.getpid()
+    return _pool
+
+
+def parse_chunk(records):
+    """Parse a list of {"message", "restaurant"} records, keeping their order"""
+    # Imported here rather than at module level because app.py imports this
+    # module for its /api/process/batch route
+    import app as food_app
+
+    # Every record in a chunk is parsed against the same menu version
+    snapshot = food_app.catalog.snapshot()
+    results = []
+    pending = []
+    for record in records:
+        result = dict(record)
+        if not isinstance(record.get('message'), str):
+            result['error'] = "missing 'message'"
+        elif not isinstance(record.get('restaurant'), str):
+            result['error'] = "missing 'restaurant'"
+        elif record['restaurant'].lower() not in snapshot.menus:
+            result['error'] = f"unknown restaurant '{record.get('restaurant', '')}'"
+        else:
+            result['corrected'] = food_app.correct_spelling(record['message'], snapshot)
+            pending.append(result)
+        results.append(result)
+
+    # One nlp.pipe pass over every message in the chunk
+    extracted = food_app.extract_food_entities_batch([r['corrected'] for r in pending], snapshot=snapshot)
+    for result, (food_entities, quantities) in zip(pending, extracted):
+        restaurant = result['restaurant'].lower()
+        result['entities'] = food_entities
+        result['quantities'] = quantities
+        result['items'] = food_app.match_order_entities(
+            snapshot.menus[restaurant], food_entities, quantities, snapshot.match_index(restaurant))
+    return results
+
+
+def read_records(lines):
+    """Decode JSONL lines, turning malformed ones into error records"""
+    for number, line in enumerate(lines, 1):
+        if isinstance(line, bytes):
+            line = line.decode('utf-8')
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError as e:
+            record = {'line': number, 'error': f"invalid JSON: {e}"}
+        if not isinstance(record, dict):
+            record = {'line': number, 'error': "expected a JSON object"}
+        yield record
+
+
+def chunked(records, size):
+    iterator = iter(records)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def parse_records(records, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE, pool=None):
+    """Yield parsed records in input order, spreading chunks across worker processes.
+
+    With pool, chunks go to that (long-lived) pool instead of a new one of workers processes.
+    """
+    if workers <= 1:
+        for chunk in chunked(records, chunk_size):
+            yield from run_chunk(chunk)
+        return
+
+    if pool is not None:
+        for results in pool.imap(run_chunk, chunked(records, chunk_size)):
+            yield from results
+        return
+
+    with worker_context().Pool(workers) as pool:
+        for results in pool.imap(run_chunk, chunked(records, chunk_size)):
+            yield from results
+
+
+def run_chunk(chunk):
+    """parse_chunk for the records of a chunk that decoded cleanly"""
+    good = [r for r in chunk if 'error' not in r]
+    parsed = iter(parse_chunk(good)) if good else iter(())
+    return [r if 'error' in r else next(parsed) for r in chunk]
+
+
+def stream_jsonl(lines, workers=BATCH_WORKERS, chunk_size=BATCH_CHUNK_SIZE, pool=None):
+    """Parse a JSONL stream and yield JSONL output lines"""
+    for result in parse_records(read_records(lines), workers, chunk_size, pool):
+        yield json.dumps(result) + "\n"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Parse a JSONL file of order messages")
+    parser.add_argument("input", help="JSONL file of {message, restaurant} records, or - for stdin")
+    parser.add_argument("-o", "--output", default="-", help="output JSONL file (default stdout)")
+    parser.add_argument("--workers", type=int, default=BATCH_WORKERS)
+    parser.add_argument("--chunk-size", type=int, default=BATCH_CHUNK_SIZE)
+    args = parser.parse_args()
+    if args.chunk_size <= 0:
+        parser.error("--chunk-size must be positive")
+
+    source = sys.stdin if args.input == "-" else open(args.input)
+    target = sys.stdout if args.output == "-" else open(args.output, "w")
+    try:
+        for line in stream_jsonl(source, args.workers, args.chunk_size):
+            target.write(line)
+    finally:
+        if source is not sys.stdin:
+            source.close()
+        if target is not sys.stdout:
+            target.close()
+
+
+if __name__ == "__main__":
+    main()
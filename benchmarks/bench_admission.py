@@ -0,0 +1,164 @@
+# bench_admission.py - Normal conversations next to clients flooding the ordering path
+#
+# Usage: python benchmarks/bench_admission.py [--workers 2] [--threads 8] [--conversations 100] [--flooders 8]
+#
+# Starts gunicorn (gthread workers) twice, once with admission control
+# switched off and once with the defaults from admission.py and
+# gunicorn.conf.py (SHED_QUEUE_DEPTH can be set with --shed-depth). Each time,
+# --flooders clients hammer the ordering path with long messages (some over
+# MAX_MESSAGE_LENGTH) as fast as they can, half of them in one session each
+# and half as legacy clients that send the context instead, while the synthetic
+# conversations from bench_conversations.py run alongside them. Reports
+# what each kind of client got back and how long normal turns took.
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import common
+from common import ADMISSION_OFF, free_port, percentile, print_table, wait_for_http
+from bench_conversations import HTTPDriver, drive, make_conversation
+
+
+def client_headers(address):
+    """Headers that make the server (with TRUSTED_PROXY_HEADER set) see a distinct client address"""
+    return {"X-Forwarded-For": address}
+
+
+def flood_message(rng, words, length):
+    """An ordering message of about length characters, mostly misspelled dish names"""
+    parts = []
+    while sum(len(part) + 2 for part in parts) < length:
+        word = rng.choice(words)
+        parts.append(f"{rng.randint(1, 9)} {word[::-1] if rng.random() < 0.5 else word}")
+    return ", ".join(parts)
+
+
+def flooder(port, restaurant, words, seed, legacy, stop, results):
+    rng = random.Random(seed)
+    driver = HTTPDriver("127.0.0.1", port, client_headers(f"10.1.0.{seed}"))
+    if legacy:
+        # Sends the whole context every time and never gets a session
+        payload = {'context': {'state': 'ordering', 'restaurant': restaurant, 'order': []}}
+    else:
+        _, body = driver.post({'message': 'hi'})
+        payload = {'session_id': body['session_id']}
+        driver.post({'message': restaurant, 'session_id': body['session_id']})
+    while not stop.is_set():
+        length = 2000 if rng.random() < 0.25 else 450
+        start = time.perf_counter()
+        status, body = driver.post(dict(payload, message=flood_message(rng, words, length)))
+        results.append((status, time.perf_counter() - start))
+    driver.close()
+
+
+def run(args, conversations, menus, admission):
+    port = free_port()
+    # Every client is on 127.0.0.1; each gets its own address through the proxy header
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+               GUNICORN_THREADS=str(args.threads), SESSION_STORE="sqlite", LAZY_MODELS="false",
+               TRUSTED_PROXY_HEADER="X-Forwarded-For")
+    if admission:
+        if args.shed_depth is not None:
+            env["SHED_QUEUE_DEPTH"] = str(args.shed_depth)
+    else:
+        env.update(ADMISSION_OFF)
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+                              cwd=common.REPO_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    stop = threading.Event()
+    flood_results = []
+    try:
+        wait_for_http(f"http://127.0.0.1:{port}/", server)
+        restaurants = sorted(menus)
+        words = sorted({word for menu in menus.values() for item in menu for word in item.split()})
+        flooders = [threading.Thread(target=flooder, args=(port, restaurants[i % len(restaurants)], words,
+                                                           i, i % 2 == 1, stop, flood_results))
+                    for i in range(args.flooders)]
+        for thread in flooders:
+            thread.start()
+        addresses = iter(range(1, args.concurrency + 1))
+        timings, completed, seconds = drive(
+            lambda: HTTPDriver("127.0.0.1", port, client_headers(f"10.0.0.{next(addresses)}")),
+            conversations, args.concurrency)
+        stop.set()
+        for thread in flooders:
+            thread.join()
+        metrics_text = fetch_metrics(port)
+    finally:
+        stop.set()
+        server.terminate()
+        server.wait()
+
+    label = "on" if admission else "off"
+    ok = [t for _, status, t in timings if status == 200]
+    rows = [{
+        "admission": label, "client": "normal", "requests": len(timings), "ok": len(ok),
+        "rejected": len(timings) - len(ok), "completed": f"{completed}/{len(conversations)}",
+        "p50_ms": 1000 * percentile(ok, 50), "p99_ms": 1000 * percentile(ok, 99),
+    }]
+    flood_ok = [t for status, t in flood_results if status == 200]
+    rows.append({
+        "admission": label, "client": "flooder", "requests": len(flood_results), "ok": len(flood_ok),
+        "rejected": len(flood_results) - len(flood_ok), "completed": "-",
+        "p50_ms": 1000 * percentile([t for _, t in flood_results], 50),
+        "p99_ms": 1000 * percentile([t for _, t in flood_results], 99),
+    })
+    statuses = {}
+    for status, _ in flood_results:
+        statuses[status] = statuses.get(status, 0) + 1
+    shed = sum(float(line.split()[-1]) for line in metrics_text.splitlines()
+               if line.startswith('foodbot_admission_total{reason="shed"}'))
+    return rows, statuses, shed, seconds
+
+
+def fetch_metrics(port):
+    # One worker's counters only; gunicorn workers each keep their own
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=30)
+    conn.request("GET", "/metrics")
+    text = conn.getresponse().read().decode()
+    conn.close()
+    return text
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark admission control under a flood of ordering turns")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--threads", type=int, default=8, help="gunicorn threads per worker")
+    parser.add_argument("--conversations", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent normal conversations")
+    parser.add_argument("--flooders", type=int, default=8)
+    parser.add_argument("--shed-depth", type=int, default=None,
+                        help="SHED_QUEUE_DEPTH with admission on (default: gunicorn.conf.py's, half of --threads)")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    # This process only needs the menus and synonyms to generate conversations
+    os.environ.setdefault("LAZY_MODELS", "true")
+    os.environ.setdefault("SESSION_STORE", "memory")
+    import app as food_app
+
+    rng = random.Random(args.seed)
+    menus = food_app.catalog.snapshot().menus
+    conversations = [make_conversation(menus, food_app.synonyms_map, rng, 0.15, 0.2, 3)
+                     for _ in range(args.conversations)]
+
+    rows = []
+    for admission in (False, True):
+        result_rows, statuses, shed, seconds = run(args, conversations, menus, admission)
+        rows += result_rows
+        print(f"admission {'on' if admission else 'off'}: {seconds:.1f}s, flooder statuses "
+              f"{json.dumps(statuses, sort_keys=True)}, shed to cheap tier (one worker) {shed:.0f}")
+
+    print(f"\n{args.workers} workers x {args.threads} threads, {args.flooders} flooders, "
+          f"{args.concurrency} concurrent normal conversations\n")
+    print_table(rows, ["admission", "client", "requests", "ok", "rejected", "completed", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+# bench_catalog.py - Menu catalog reload time and reader latency during a reload
+#
+# Usage: python benchmarks/bench_catalog.py [--restaurants 10000] [--items 20]
+#
+# Writes a synthetic menu file, then times parsing it, building a catalog
+# snapshot (with payloads precomputed and without), and a full reload. While
+# a background reload runs, a reader thread keeps taking snapshots and
+# formatting menus the way a request does; its latency shows whether the
+# reload ever blocks requests.
+import argparse
+import os
+import random
+import tempfile
+import threading
+import time
+
+import common
+from common import print_table, summarize, write_menu_file
+
+import app
+from catalog import CatalogSnapshot, MenuCatalog, load_menu_from_file
+
+def timed(func, *args, **kwargs):
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def reader_latency(catalog, restaurants, stop):
+    """Time snapshot() + menu_payload() calls until stop is set"""
+    timings = []
+    i = 0
+    while not stop.is_set():
+        start = time.perf_counter()
+        snapshot = catalog.snapshot()
+        snapshot.menu_payload(restaurants[i % len(restaurants)])
+        timings.append(time.perf_counter() - start)
+        i += 1
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark menu catalog reloads")
+    parser.add_argument("--restaurants", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    options = dict(synonyms=app.synonyms_map,
+                   scorer=app.fuzz.ratio if app.fuzzywuzzy_available else None,
+                   protected=app.stop_words, categories=app.FOOD_TYPE_KEYWORDS)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "menus.txt")
+        write_menu_file(path, args.restaurants, args.items, random.Random(args.seed))
+        print(f"{args.restaurants} restaurants x {args.items} items, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB menu file")
+
+        menus, parse_s = timed(load_menu_from_file, path)
+        _, warm_s = timed(CatalogSnapshot, menus, 1, warm=True, **options)
+        cold, cold_s = timed(CatalogSnapshot, menus, 1, warm=False, **options)
+        restaurants = cold.restaurants
+        _, index_s = timed(cold.match_index, restaurants[0])
+
+        catalog = MenuCatalog(path, load_menu_from_file, check_interval=0, **options)
+        _, reload_s = timed(catalog.reload)
+
+        rows = [
+            {"step": "parse menu file", "seconds": parse_s},
+            {"step": "snapshot, payloads precomputed", "seconds": warm_s},
+            {"step": "snapshot, payloads lazy", "seconds": cold_s},
+            {"step": "first match index (one restaurant)", "seconds": index_s},
+            {"step": "full reload (parse + snapshot)", "seconds": reload_s},
+        ]
+        print_table(rows, ["step", "seconds"])
+
+        # Reader latency while idle, then while a reload runs on another thread
+        results = {}
+        for phase in ("idle", "during reload"):
+            stop = threading.Event()
+            out = []
+            reader = threading.Thread(target=lambda: out.extend(reader_latency(catalog, restaurants, stop)))
+            reader.start()
+            if phase == "idle":
+                time.sleep(reload_s)
+            else:
+                before = catalog.version
+                reloader = threading.Thread(target=catalog.reload)
+                reloader.start()
+                reloader.join()
+                assert catalog.version == before + 1, "reload did not publish a new snapshot"
+            stop.set()
+            reader.join()
+            row = {"phase": phase}
+            row.update(summarize(out))
+            row["max_ms"] = max(out) * 1000
+            results[phase] = row
+        print()
+        print_table(list(results.values()),
+                    ["phase", "calls", "mean_ms", "p50_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
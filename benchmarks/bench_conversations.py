@@ -0,0 +1,313 @@
+# bench_conversations.py - Replayable end-to-end benchmark of whole conversations
+#
+# Usage:
+#   python benchmarks/bench_conversations.py                       # Flask test client
+#   python benchmarks/bench_conversations.py --mode gunicorn --workers 4 --concurrency 8
+#   python benchmarks/bench_conversations.py --save main           # record a baseline
+#   python benchmarks/bench_conversations.py --compare main        # compare against it
+#
+# Generates synthetic conversations from menus.txt (same seed, same
+# conversations): a welcome message, a restaurant choice, several ordering
+# turns with controlled misspelling and synonym rates, then done, checkout,
+# payment, delivery and new_order. They are driven through /api/process
+# either in-process with Flask's test client or over HTTP against a local
+# gunicorn. The report gives throughput, per-state p50/p95/p99 latency
+# (keyed by the state the turn started in), how many conversations got all
+# the way to new_order, and memory.
+#
+# Baselines are JSON files in benchmarks/baselines/. --compare exits 1 when
+# throughput or any state's p50 is worse than the baseline by more than
+# --tolerance, so it can gate a change against the previous commit.
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+
+import common
+from common import ADMISSION_OFF, free_port, misspell, print_table, summarize, wait_for_http
+
+import psutil
+
+BASELINE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines")
+
+STATES = ["welcome", "select_restaurant", "ordering", "checkout", "payment", "delivery", "new_order"]
+WELCOME_TEMPLATES = ["I want {food}", "something with {food} please", "hungry for some {food}",
+                     "hi", "what can i eat today", "take me to {restaurant}"]
+QUANTITIES = ["1", "2", "3", "one", "two", "three", "a", "a couple of"]
+SEPARATORS = [" and ", ", ", " & ", " with "]
+PAYMENTS = ["credit card", "debit card", "upi", "cash on delivery"]
+ADDRESSES = ["12 park street kolkata", "221 mg road bangalore", "4 marine drive mumbai"]
+
+
+def noisy(text, rate, rng):
+    """Misspell each word of text with probability rate"""
+    return " ".join(misspell(w, rng) if rng.random() < rate else w for w in text.split())
+
+
+def make_conversation(menus, synonyms, rng, misspell_rate, synonym_rate, max_order_turns):
+    """A list of user messages that walks the whole state machine once"""
+    restaurant = rng.choice(list(menus))
+    items = list(menus[restaurant])
+    aliases = {}
+    for alias, target in synonyms.items():
+        if target in menus[restaurant]:
+            aliases.setdefault(target, []).append(alias)
+
+    food = rng.choice(items).split()[-1]
+    turns = [rng.choice(WELCOME_TEMPLATES).format(food=food, restaurant=restaurant), restaurant]
+    for _ in range(rng.randint(1, max_order_turns)):
+        parts = []
+        for item in rng.sample(items, min(len(items), rng.randint(1, 3))):
+            if item in aliases and rng.random() < synonym_rate:
+                item = rng.choice(aliases[item])
+            parts.append(f"{rng.choice(QUANTITIES)} {noisy(item, misspell_rate, rng)}")
+        turns.append(rng.choice(SEPARATORS).join(parts))
+    turns += ["done", "yes", rng.choice(PAYMENTS), rng.choice(ADDRESSES), rng.choice(["new", "bye"])]
+    return turns
+
+
+class TestClientDriver:
+    """Posts turns through Flask's test client, in this process"""
+
+    def __init__(self, app_module):
+        self.client = app_module.app.test_client()
+
+    def post(self, payload):
+        response = self.client.post('/api/process', json=payload)
+        return response.status_code, response.get_json()
+
+    def close(self):
+        pass
+
+
+class HTTPDriver:
+    """Posts turns to a running server over one keep-alive connection"""
+
+    def __init__(self, host, port, headers=None):
+        self.host, self.port = host, port
+        self.headers = dict(headers or {}, **{"Content-Type": "application/json"})
+        self.conn = http.client.HTTPConnection(host, port, timeout=120)
+
+    def post(self, payload):
+        try:
+            self.conn.request("POST", "/api/process", json.dumps(payload), self.headers)
+            response = self.conn.getresponse()
+            return response.status, json.loads(response.read() or b'null')
+        except (OSError, http.client.HTTPException, ValueError):
+            self.conn.close()
+            self.conn = http.client.HTTPConnection(self.host, self.port, timeout=120)
+            return "error", None
+
+    def close(self):
+        self.conn.close()
+
+
+def run_conversation(driver, turns, timings):
+    """Play one conversation; returns whether it reached new_order"""
+    session_id = None
+    state = "welcome"
+    completed = False
+    for message in turns:
+        payload = {'message': message}
+        if session_id:
+            payload['session_id'] = session_id
+        start = time.perf_counter()
+        status, body = driver.post(payload)
+        timings.append((state, status, time.perf_counter() - start))
+        if status != 200 or not body:
+            return False
+        session_id = body.get('session_id', session_id)
+        previous, state = state, body['context']['state']
+        completed = completed or (previous == 'delivery' and state == 'new_order')
+    return completed
+
+
+def drive(make_driver, conversations, concurrency):
+    """Run conversations on concurrency threads; returns (timings, completed, seconds)"""
+    timings = []
+    completed = []
+    queue = list(reversed(conversations))
+    lock = threading.Lock()
+
+    def worker():
+        driver = make_driver()
+        local_timings = []
+        done = 0
+        while True:
+            with lock:
+                if not queue:
+                    break
+                turns = queue.pop()
+            done += run_conversation(driver, turns, local_timings)
+        driver.close()
+        with lock:
+            timings.extend(local_timings)
+            completed.append(done)
+
+    threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return timings, sum(completed), time.perf_counter() - start
+
+
+def process_memory(pid):
+    """(rss, pss) in MB of a process and all its children"""
+    processes = [psutil.Process(pid)]
+    processes += processes[0].children(recursive=True)
+    rss = pss = 0
+    for process in processes:
+        info = process.memory_full_info()
+        rss += info.rss
+        pss += getattr(info, "pss", info.rss)
+    return rss / 2**20, pss / 2**20
+
+
+def report(timings, completed, seconds, conversations):
+    ok = [(state, t) for state, status, t in timings if status == 200]
+    states = {}
+    for state in STATES:
+        values = [t for s, t in ok if s == state]
+        if values:
+            summary = summarize(values)
+            states[state] = {key: summary[key] for key in ("calls", "p50_ms", "p95_ms", "p99_ms")}
+    return {
+        "turns": len(timings),
+        "errors": len(timings) - len(ok),
+        "conversations": conversations,
+        "completed": completed,
+        "seconds": seconds,
+        "turns_per_s": len(timings) / seconds if seconds else 0.0,
+        "states": states,
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=common.REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(result, baseline, tolerance):
+    """Print result against baseline; returns the list of regressions"""
+    rows = []
+    regressions = []
+    for state in STATES:
+        now, then = result["states"].get(state), baseline["states"].get(state)
+        if not now or not then:
+            continue
+        row = {"state": state}
+        for key in ("p50_ms", "p99_ms"):
+            change = (now[key] - then[key]) / then[key] if then[key] else 0.0
+            row[f"base_{key}"], row[key], row[f"{key[:3]}_change"] = then[key], now[key], f"{change:+.0%}"
+            if key == "p50_ms" and change > tolerance:
+                regressions.append(f"{state} p50 {change:+.0%}")
+        rows.append(row)
+    print(f"\nAgainst baseline {baseline.get('name')} (commit {baseline.get('commit')}):")
+    print_table(rows, ["state", "base_p50_ms", "p50_ms", "p50_change", "base_p99_ms", "p99_ms", "p99_change"])
+
+    change = (result["turns_per_s"] - baseline["turns_per_s"]) / baseline["turns_per_s"]
+    print(f"throughput {baseline['turns_per_s']:.1f} -> {result['turns_per_s']:.1f} turns/s ({change:+.0%})")
+    if -change > tolerance:
+        regressions.append(f"throughput {change:+.0%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end conversation benchmark")
+    parser.add_argument("--mode", choices=["client", "gunicorn"], default="client")
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=1,
+                        help="concurrent conversations (gunicorn mode)")
+    parser.add_argument("--workers", type=int, default=2, help="gunicorn workers")
+    parser.add_argument("--misspell-rate", type=float, default=0.15)
+    parser.add_argument("--synonym-rate", type=float, default=0.2)
+    parser.add_argument("--max-order-turns", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=13)
+    parser.add_argument("--save", metavar="NAME", help="save the result as a baseline")
+    parser.add_argument("--compare", metavar="NAME", help="compare with a saved baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2,
+                        help="allowed slowdown before --compare reports a regression")
+    args = parser.parse_args()
+
+    if args.mode == "gunicorn":
+        # The server loads the models; this process only needs the menus and synonyms
+        os.environ.setdefault("LAZY_MODELS", "true")
+    else:
+        # Measures the pipeline, not admission control (see bench_admission.py)
+        os.environ.update(ADMISSION_OFF)
+    import app as food_app
+
+    rng = random.Random(args.seed)
+    menus = food_app.catalog.snapshot().menus
+    conversations = [make_conversation(menus, food_app.synonyms_map, rng, args.misspell_rate,
+                                       args.synonym_rate, args.max_order_turns)
+                     for _ in range(args.conversations)]
+
+    server = None
+    if args.mode == "client":
+        # Warm the caches and lazy structures the first real turn would otherwise pay for
+        run_conversation(TestClientDriver(food_app), conversations[0], [])
+        make_driver = lambda: TestClientDriver(food_app)
+        concurrency = 1
+        memory_pid = os.getpid()
+    else:
+        port = free_port()
+        env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(args.workers),
+                   LAZY_MODELS="false", SESSION_STORE="sqlite", **ADMISSION_OFF)
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+                                  cwd=common.REPO_ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        make_driver = lambda: HTTPDriver("127.0.0.1", port)
+        concurrency = args.concurrency
+        memory_pid = server.pid
+
+    try:
+        if server is not None:
+            wait_for_http(f"http://127.0.0.1:{port}/", server)
+        timings, completed, seconds = drive(make_driver, conversations, concurrency)
+        rss_mb, pss_mb = process_memory(memory_pid)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    result = report(timings, completed, seconds, len(conversations))
+    result.update({"mode": args.mode, "concurrency": concurrency, "rss_mb": rss_mb, "pss_mb": pss_mb,
+                   "commit": git_commit(), "args": vars(args)})
+
+    print(f"{args.mode}: {result['conversations']} conversations ({result['completed']} completed), "
+          f"{result['turns']} turns, {result['errors']} errors, {result['turns_per_s']:.1f} turns/s, "
+          f"RSS {rss_mb:.0f} MB, PSS {pss_mb:.0f} MB")
+    print_table([dict(state=state, **values) for state, values in result["states"].items()],
+                ["state", "calls", "p50_ms", "p95_ms", "p99_ms"])
+
+    if args.save:
+        os.makedirs(BASELINE_DIR, exist_ok=True)
+        path = os.path.join(BASELINE_DIR, f"{args.save}.json")
+        with open(path, "w") as f:
+            json.dump(dict(result, name=args.save), f, indent=2)
+        print(f"\nSaved baseline {path}")
+
+    if args.compare:
+        with open(os.path.join(BASELINE_DIR, f"{args.compare}.json")) as f:
+            baseline = json.load(f)
+        if baseline.get("mode") != args.mode:
+            print(f"\nWarning: baseline was recorded in {baseline.get('mode')} mode")
+        regressions = compare(result, baseline, args.tolerance)
+        if regressions:
+            print("Regressions: " + ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
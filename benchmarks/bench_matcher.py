@@ -0,0 +1,126 @@
+# bench_matcher.py - Parity and latency of MenuMatchIndex against find_best_match
+#
+# Usage: python benchmarks/bench_matcher.py [--items 5000] [--queries 2000]
+#
+# Every query is resolved by the linear find_best_match in app.py and by the
+# precompiled index, with RapidFuzz cdist scoring and with the per-candidate
+# loop; the script exits non-zero if any answer differs.
+import argparse
+import random
+import sys
+import time
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+from common import print_table, summarize, time_calls
+
+import app
+import matcher
+from matcher import MenuMatchIndex
+
+ADJECTIVES = ["spicy", "crispy", "grilled", "butter", "masala", "classic", "double", "mini",
+              "cheesy", "smoked", "tandoori", "garlic", "mango", "paneer", "chicken", "veg"]
+DISHES = ["burger", "pizza", "wrap", "biryani", "naan", "tikka", "shake", "fries", "rice",
+          "salad", "sandwich", "roll", "curry", "momos", "noodles", "soup", "toast", "bowl"]
+
+
+def synthetic_menu(size, rng):
+    """A menu of size unique multi-word items built from common dish words"""
+    menu = {}
+    while len(menu) < size:
+        words = rng.sample(ADJECTIVES, rng.choice([1, 1, 2])) + [rng.choice(DISHES)]
+        if rng.random() < 0.2:
+            words.append(f"{rng.randint(2, 99)}")
+        menu[" ".join(words)] = rng.randint(20, 400)
+    return menu
+
+
+def typo(text, rng):
+    if len(text) < 3:
+        return text
+    i = rng.randrange(len(text))
+    return rng.choice([text[:i] + text[i + 1:], text[:i] + rng.choice("aeiourst") + text[i:],
+                       text[:i] + rng.choice("aeiourst") + text[i + 1:]])
+
+
+def queries_for(menu, count, rng):
+    items = list(menu)
+    synonyms = list(app.synonyms_map)
+    queries = []
+    while len(queries) < count:
+        item = rng.choice(items)
+        words = item.split()
+        queries.append(rng.choice([
+            item,
+            typo(item, rng),
+            typo(typo(item, rng), rng),
+            rng.choice(words),
+            typo(rng.choice(words), rng),
+            " ".join(words[:2]),
+            rng.choice(synonyms),
+            rng.choice(DISHES + ADJECTIVES),
+            item[1:-1],
+            "something else entirely",
+        ]))
+    return queries
+
+
+def run(name, menu, queries):
+    keys = menu.keys()
+    start = time.perf_counter()
+    index = MenuMatchIndex(menu, app.synonyms_map, app.fuzz.ratio if app.fuzzywuzzy_available else None)
+    build_seconds = time.perf_counter() - start
+
+    expected, linear = time_calls(lambda q: app.find_best_match(q, keys), queries)
+    results = [("linear", linear, None)]
+    engines = [("index+cdist", True), ("index+loop", False)] if matcher.rapidfuzz_available \
+        else [("index+loop", False)]
+    available = matcher.rapidfuzz_available
+    mismatches = []
+    try:
+        for label, vectorized in engines:
+            matcher.rapidfuzz_available = vectorized
+            actual, timings = time_calls(index.match, queries)
+            results.append((label, timings, build_seconds))
+            mismatches.extend((label, q, e, a) for q, e, a in zip(queries, expected, actual) if e != a)
+    finally:
+        matcher.rapidfuzz_available = available
+
+    rows = []
+    for label, timings, build in results:
+        row = {"menu": name, "items": len(menu), "matcher": label}
+        row.update(summarize(timings))
+        if build is not None:
+            row["build_ms"] = 1000 * build
+        rows.append(row)
+    return rows, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare MenuMatchIndex with find_best_match")
+    parser.add_argument("--items", type=int, default=5000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+    rng = random.Random(args.seed)
+
+    menus = dict(app.catalog.snapshot().menus)
+    menus["synthetic"] = synthetic_menu(args.items, rng)
+
+    rows = []
+    failures = []
+    for name, menu in menus.items():
+        result_rows, mismatches = run(name, menu, queries_for(menu, args.queries, rng))
+        rows.extend(result_rows)
+        failures.extend((name,) + m for m in mismatches)
+
+    print_table(rows, ["menu", "items", "matcher", "mean_ms", "p50_ms", "p95_ms", "p99_ms", "build_ms"])
+    if failures:
+        print(f"\n{len(failures)} parity mismatches:")
+        for name, label, query, expected, actual in failures[:20]:
+            print(f"  [{name}] {query!r}: find_best_match={expected!r} {label}={actual!r}")
+        sys.exit(1)
+    print("\nparity: all queries matched find_best_match")
+
+
+if __name__ == "__main__":
+    main()
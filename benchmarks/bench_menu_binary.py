@@ -0,0 +1,110 @@
+# bench_menu_binary.py - Text vs compiled (memory-mapped) menu loading
+#
+# Usage: python benchmarks/bench_menu_binary.py [--restaurants 10000] [--items 20]
+#
+# Writes a synthetic menus.txt, compiles it, checks that the compiled file
+# decodes to exactly the same menus, then measures each format in a fresh
+# interpreter: time to load, time to read every restaurant once, time to
+# build the MenuCatalog the way app.py does, time to serve a couple of
+# thousand restaurants' menus and match indexes, and the process's RSS and
+# USS after each step (app.py itself is imported before the baseline).
+# USS counts only private pages; the mapped file's pages live in the page
+# cache and are shared by every worker, so they show up in RSS but not USS.
+import argparse
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+from common import print_table, write_menu_file
+
+from catalog import load_menu_from_file
+from menu_binary import compile_menus, load_menus
+
+CHILD_SNIPPET = """
+import json, os, sys, time
+import psutil
+os.environ["LAZY_MODELS"] = "true"
+os.environ["MENU_RELOAD_INTERVAL"] = "0"
+import app, catalog, menu_binary
+process = psutil.Process()
+def memory():
+    info = process.memory_full_info()
+    return info.rss, info.uss
+rows = []
+def step(name, func):
+    start = time.perf_counter()
+    result = func()
+    rss, uss = memory()
+    rows.append({"step": name, "seconds": time.perf_counter() - start, "rss": rss, "uss": uss})
+    return result
+rss, uss = memory()
+rows.append({"step": "baseline", "seconds": 0.0, "rss": rss, "uss": uss})
+menus = step("load", lambda: menu_binary.load_menus(sys.argv[1]))
+step("read every menu", lambda: sum(len(menus[r]) for r in menus))
+# The catalog exactly as app.py builds it: same loader, synonyms, stop words, categories
+live = step("menu catalog", lambda: catalog.MenuCatalog(sys.argv[1], menu_binary.load_menus, check_interval=0,
+                                                         **app.catalog.snapshot_options))
+snapshot = live.snapshot()
+names = list(snapshot.menus)[:2000]
+step("2000 menu payloads", lambda: [snapshot.menu_bytes(r) for r in names])
+step("2000 match indexes", lambda: [snapshot.match_index(r) for r in names])
+print(json.dumps(rows))
+"""
+
+
+def measure(path):
+    output = subprocess.run([sys.executable, "-c", CHILD_SNIPPET, path], cwd=common.REPO_ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def check_parity(text_menus, mapped):
+    """Names of restaurants whose compiled menu differs from the text one"""
+    if list(mapped) != list(text_menus):
+        return ["<restaurant order>"]
+    return [r for r in text_menus if dict(mapped[r]) != text_menus[r]]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare text and compiled menu loading")
+    parser.add_argument("--restaurants", type=int, default=10000)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=3)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "menus.txt")
+        binary_path = os.path.join(tmp, "menus.bin")
+        write_menu_file(text_path, args.restaurants, args.items, random.Random(args.seed))
+        text_menus = load_menu_from_file(text_path)
+        start = time.perf_counter()
+        compile_menus(text_menus, binary_path)
+        compile_s = time.perf_counter() - start
+        print(f"{args.restaurants} restaurants x {args.items} items: text "
+              f"{os.path.getsize(text_path) / 1e6:.1f} MB, compiled "
+              f"{os.path.getsize(binary_path) / 1e6:.1f} MB in {compile_s:.2f}s")
+
+        mismatches = check_parity(text_menus, load_menus(binary_path))
+        if mismatches:
+            print(f"Compiled menus differ for {len(mismatches)} restaurants, e.g. {mismatches[:5]}")
+            sys.exit(1)
+        print("Parity OK: compiled menus decode to the text menus\n")
+
+        rows = []
+        for fmt, path in (("text", text_path), ("compiled", binary_path)):
+            steps = measure(path)
+            base = steps[0]
+            for step in steps[1:]:
+                rows.append({"format": fmt, "step": step["step"], "seconds": step["seconds"],
+                             "rss_mb": (step["rss"] - base["rss"]) / 1e6,
+                             "uss_mb": (step["uss"] - base["uss"]) / 1e6})
+        print_table(rows, ["format", "step", "seconds", "rss_mb", "uss_mb"])
+
+
+if __name__ == "__main__":
+    main()
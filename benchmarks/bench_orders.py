@@ -0,0 +1,117 @@
+# bench_orders.py - Sustained order-log throughput with concurrent checkouts
+#
+# Usage: python benchmarks/bench_orders.py [--threads 1,8,32] [--seconds 3] [--dir /var/tmp]
+#
+# Appends orders from several threads at once for a fixed time and reports
+# orders per second, append latency and how many orders each group commit
+# carried, next to a baseline that commits every order in its own
+# transaction. Also checks that every ID is unique and that IDs from one
+# thread sort in the order they were issued, and times lookups by ID.
+import argparse
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+
+import common
+from common import print_table, summarize, time_calls
+
+from orders import OrderLog, new_order_id
+
+ITEMS = [{"item": "chicken biryani", "price": 180, "quantity": 2},
+         {"item": "butter naan", "price": 40, "quantity": 1}]
+
+
+class CommitPerOrder:
+    """One transaction (and fsync) per order, for comparison"""
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        with self._connection() as conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS orders (id TEXT PRIMARY KEY, record TEXT NOT NULL)")
+
+    def _connection(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=FULL")
+        return conn
+
+    def append(self, restaurant, items, total, **details):
+        order_id = new_order_id()
+        with self._connection() as conn:
+            conn.execute("INSERT INTO orders (id, record) VALUES (?, ?)", (order_id, restaurant))
+        return order_id
+
+
+def hammer(log, threads, seconds):
+    """Append from threads for seconds; returns (ids per thread, append latencies, elapsed)"""
+    stop = time.perf_counter() + seconds
+    ids = [[] for _ in range(threads)]
+    latencies = [[] for _ in range(threads)]
+
+    def worker(n):
+        while time.perf_counter() < stop:
+            start = time.perf_counter()
+            ids[n].append(log.append("desi delight", ITEMS, 400, address="12 park street"))
+            latencies[n].append(time.perf_counter() - start)
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    start = time.perf_counter()
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    return ids, [t for values in latencies for t in values], time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the order log")
+    parser.add_argument("--threads", default="1,8,32")
+    parser.add_argument("--seconds", type=float, default=3.0)
+    parser.add_argument("--lookups", type=int, default=2000)
+    parser.add_argument("--dir", help="where to put the databases (default: a temporary directory); "
+                                      "fsync cost depends heavily on the filesystem")
+    args = parser.parse_args()
+
+    rows = []
+    failures = []
+    with tempfile.TemporaryDirectory(dir=args.dir) as tmp:
+        for threads in (int(n) for n in args.threads.split(",")):
+            for name, make_log in (("group commit", OrderLog), ("commit per order", CommitPerOrder)):
+                log = make_log(os.path.join(tmp, f"{name.replace(' ', '-')}-{threads}.db"))
+                ids, latencies, elapsed = hammer(log, threads, args.seconds)
+                all_ids = [order_id for thread_ids in ids for order_id in thread_ids]
+                if len(set(all_ids)) != len(all_ids):
+                    failures.append(f"{name}, {threads} threads: duplicate IDs")
+                if any(thread_ids != sorted(thread_ids) for thread_ids in ids):
+                    failures.append(f"{name}, {threads} threads: IDs out of order")
+
+                row = {"log": name, "threads": threads, "orders": len(all_ids),
+                       "orders_per_s": len(all_ids) / elapsed,
+                       "per_commit": len(all_ids) / log.commits if getattr(log, "commits", 0) else 1.0}
+                summary = summarize(latencies)
+                row["p50_ms"], row["p99_ms"] = summary["p50_ms"], summary["p99_ms"]
+                rows.append(row)
+
+                if isinstance(log, OrderLog):
+                    sample = random.Random(threads).choices(all_ids, k=args.lookups)
+                    found, timings = time_calls(log.get, sample)
+                    if not all(order and order["id"] == order_id for order, order_id in zip(found, sample)):
+                        failures.append(f"{name}, {threads} threads: lookup returned the wrong order")
+                    row["lookup_p50_ms"] = summarize(timings)["p50_ms"]
+
+    print_table(rows, ["log", "threads", "orders", "orders_per_s", "per_commit", "p50_ms", "p99_ms",
+                       "lookup_p50_ms"])
+    if failures:
+        print("\n" + "\n".join(failures))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
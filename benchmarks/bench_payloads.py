@@ -0,0 +1,67 @@
+# bench_payloads.py - Response size and latency with menus inline vs by reference
+#
+# Usage: python benchmarks/bench_payloads.py [--restaurants 2000] [--items 200] [--turns 300]
+#
+# Serves a synthetic catalog and repeatedly moves a session from
+# select_restaurant into ordering, once with the menu inline in the turn
+# response and once with "by_ref": true, where the client fetches the
+# menu from menu_ref (first time) or revalidates it (304) afterwards.
+# Reports bytes on the wire and latency for each.
+import argparse
+import os
+import random
+import tempfile
+import time
+
+import common
+from common import print_table, summarize, write_menu_file
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark menu payloads inline vs by reference")
+    parser.add_argument("--restaurants", type=int, default=2000)
+    parser.add_argument("--items", type=int, default=200)
+    parser.add_argument("--turns", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=19)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp()
+    os.environ["MENU_FILE"] = os.path.join(tmp, "menus.txt")
+    os.environ["SESSION_STORE"] = "memory"
+    os.environ["ORDER_DB"] = os.path.join(tmp, "orders.db")
+    write_menu_file(os.environ["MENU_FILE"], args.restaurants, args.items, random.Random(args.seed))
+    import app
+
+    client = app.app.test_client()
+    rng = random.Random(args.seed)
+    restaurants = app.catalog.snapshot().restaurants
+
+    rows = []
+    for by_ref in (False, True):
+        known = {}
+        timings, sizes = [], []
+        for _ in range(args.turns):
+            restaurant = rng.choice(restaurants)
+            session_id = client.post('/api/process', json={'message': 'hi', 'by_ref': by_ref}).get_json()['session_id']
+            start = time.perf_counter()
+            response = client.post('/api/process', json={'message': restaurant, 'session_id': session_id,
+                                                         'by_ref': by_ref})
+            size = len(response.data)
+            ref = response.get_json().get('menu_ref')
+            if by_ref and ref:
+                headers = {'If-None-Match': f'"{known[ref["url"]]}"'} if ref["url"] in known else {}
+                menu = client.get(ref["url"], headers=headers)
+                size += len(menu.data)
+                known[ref["url"]] = ref["etag"]
+            timings.append(time.perf_counter() - start)
+            sizes.append(size)
+        row = {"menus": "by reference" if by_ref else "inline", "mean_bytes": sum(sizes) / len(sizes)}
+        row.update(summarize(timings))
+        rows.append(row)
+
+    print(f"{args.restaurants} restaurants x {args.items} items, {args.turns} restaurant selections\n")
+    print_table(rows, ["menus", "mean_bytes", "mean_ms", "p50_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+# bench_search.py - Restaurant search latency as the catalog grows
+#
+# Usage: python benchmarks/bench_search.py [--sizes 100,1000,10000] [--items 20]
+#
+# Builds a RestaurantSearchIndex over synthetic catalogs of increasing size
+# and times welcome-style queries against it, next to a brute-force BM25
+# scan that scores every restaurant. Each query's top scores must equal the
+# scan's (restaurants with exactly equal scores may come in another order);
+# the script exits 1 otherwise.
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+
+import common
+from common import FOODS, STYLES, print_table, summarize, time_calls, write_menu_file
+
+import app
+from catalog import load_menu_from_file
+from search import RestaurantSearchIndex
+
+TEMPLATES = ["I want {a}", "{a} and a {b}", "something with {a} and {b} please",
+             "hungry for {s} {a}", "{a}, {b} and {c}", "hi there"]
+
+
+def brute_force(index, text, limit):
+    """(score, restaurant) for every restaurant, best first, without the threshold walk"""
+    terms = index.query_words(text)
+    scores = {}
+    for term in terms:
+        for doc in index.weights[term]:
+            scores[doc] = sum(index.weights[t].get(doc, 0.0) for t in terms)
+    ranked = sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))[:limit]
+    return [score for _, score in ranked]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the restaurant search index")
+    parser.add_argument("--sizes", default="100,1000,10000")
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--queries", type=int, default=500)
+    parser.add_argument("--limit", type=int, default=10)
+    parser.add_argument("--seed", type=int, default=11)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    queries = [rng.choice(TEMPLATES).format(a=rng.choice(FOODS), b=rng.choice(FOODS),
+                                            c=rng.choice(FOODS), s=rng.choice(STYLES))
+               for _ in range(args.queries)]
+
+    rows = []
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for size in (int(s) for s in args.sizes.split(",")):
+            path = os.path.join(tmp, f"menus-{size}.txt")
+            write_menu_file(path, size, args.items, rng)
+            menus = load_menu_from_file(path)
+
+            start = time.perf_counter()
+            index = RestaurantSearchIndex(menus, app.synonyms_map, app.stop_words)
+            build_ms = 1000 * (time.perf_counter() - start)
+
+            results, timings = time_calls(lambda q: index.search(q, args.limit), queries)
+            expected, scan_timings = time_calls(lambda q: brute_force(index, q, args.limit), queries)
+            positions = {restaurant: doc for doc, restaurant in enumerate(index.restaurants)}
+            for query, ranked, scores in zip(queries, results, expected):
+                got = [sum(index.weights[t].get(positions[r], 0.0)
+                           for t in index.query_words(query)) for r in ranked]
+                if got != scores:
+                    failures.append((size, query, got, scores))
+
+            for name, values in (("index", timings), ("scan", scan_timings)):
+                row = {"restaurants": size, "search": name, "build_ms": build_ms if name == "index" else None}
+                row.update(summarize(values))
+                rows.append(row)
+
+    print_table(rows, ["restaurants", "search", "build_ms", "mean_ms", "p50_ms", "p99_ms"])
+    if failures:
+        print(f"\n{len(failures)} queries ranked differently from the scan:")
+        for size, query, got, scores in failures[:10]:
+            print(f"  [{size}] {query!r}: {got} != {scores}")
+        sys.exit(1)
+    print("\nTop results match the brute-force scan")
+
+
+if __name__ == "__main__":
+    main()
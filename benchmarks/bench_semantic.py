@@ -0,0 +1,99 @@
+# bench_semantic.py - Recall and cost of the semantic matcher stage
+#
+# Usage: SEMANTIC_MODEL=en_core_web_md python benchmarks/bench_semantic.py
+#
+# Resolves a set of paraphrases that the synonym map does not cover with
+# the cheap stages alone and with the semantic stage added, and reports how
+# many each gets right. It also times queries the cheap stages already
+# answer (which must not get slower), the semantic lookups themselves, and
+# the cost of embedding the menus cold and after a one-item change.
+import argparse
+import os
+import sys
+import time
+
+import common
+from common import print_table, summarize, time_calls
+
+# (restaurant, what the user typed, the item they meant)
+PARAPHRASES = [
+    ("tasty bites", "fizzy drink", "coke"),
+    ("tasty bites", "soft drink", "coke"),
+    ("tasty bites", "milkshake", "chocolate shake"),
+    ("tasty bites", "hamburger", "burger"),
+    ("tasty bites", "potato chips", "french fries"),
+    ("tasty bites", "sub", "sandwich"),
+    ("tasty bites", "toast with garlic", "garlic bread"),
+    ("tasty bites", "mango cocktail", "mango mojito"),
+    ("desi delight", "indian tea", "masala chai"),
+    ("desi delight", "bottled water", "mineral water"),
+    ("desi delight", "flatbread", "roti"),
+    ("desi delight", "cottage cheese curry", "paneer butter masala"),
+    ("desi delight", "lentil curry", "dal makhani"),
+    ("desi delight", "sweet dessert", "gulab jamun"),
+    ("desi delight", "cumin rice", "jeera rice"),
+    ("healthy bites", "yoghurt", "greek yogurt"),
+    ("healthy bites", "veggie wrap", "vegetable wrap"),
+    ("healthy bites", "smoothie with fruit", "fruit smoothie"),
+    ("healthy bites", "chicken salad", "grilled chicken salad"),
+    ("healthy bites", "avocado on bread", "avocado toast"),
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the semantic matcher stage")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ["SEMANTIC_MATCHING"] = "true"
+    os.environ.setdefault("LAZY_MODELS", "true")
+    import app
+    import semantic
+    from matcher import MenuMatchIndex
+
+    encoder = semantic.get_encoder()
+    if encoder is None:
+        print(f"No word vectors available from {semantic.SEMANTIC_MODEL}; "
+              f"install it with: python -m spacy download {semantic.SEMANTIC_MODEL}")
+        sys.exit(1)
+
+    snapshot = app.catalog.snapshot()
+    scorer = app.fuzz.ratio if app.fuzzywuzzy_available else None
+    cheap = {r: MenuMatchIndex(items, app.synonyms_map, scorer) for r, items in snapshot.menus.items()}
+
+    rows = []
+    for name, indexes in (("cheap stages", cheap), ("with semantic", snapshot.match_index)):
+        lookup = indexes.get if isinstance(indexes, dict) else indexes
+        correct = sum(lookup(r).match(phrase) == expected for r, phrase, expected in PARAPHRASES)
+        _, paraphrase_timings = time_calls(lambda case: lookup(case[0]).match(case[1]),
+                                           PARAPHRASES, repeat=args.repeat)
+        exact = [(r, item) for r, items in snapshot.menus.items() for item in items]
+        _, exact_timings = time_calls(lambda case: lookup(case[0]).match(case[1]), exact, repeat=args.repeat)
+        rows.append({"matcher": name, "recall": correct / len(PARAPHRASES),
+                     "paraphrase_p50_ms": summarize(paraphrase_timings)["p50_ms"],
+                     "exact_p50_ms": summarize(exact_timings)["p50_ms"],
+                     "exact_p99_ms": summarize(exact_timings)["p99_ms"]})
+    print_table(rows, ["matcher", "recall", "paraphrase_p50_ms", "exact_p50_ms", "exact_p99_ms"])
+
+    print("\nNearest items:")
+    for restaurant, phrase, expected in PARAPHRASES:
+        top = snapshot.semantic_indexes[restaurant].top_k(phrase, k=3)
+        marker = "ok " if top and top[0][0] == expected else "-- "
+        print(f"  {marker}{phrase!r}: " + ", ".join(f"{item} {score:.2f}" for item, score in top))
+
+    # Embedding cost: every item from scratch, then a reload that changes one item
+    fresh = semantic.ItemEncoder(encoder.nlp)
+    start = time.perf_counter()
+    semantic.build_semantic_indexes(fresh, snapshot.menus)
+    cold = time.perf_counter() - start
+    changed = {r: dict(items) for r, items in snapshot.menus.items()}
+    changed[snapshot.restaurants[0]]["spicy paneer roll"] = 140
+    start = time.perf_counter()
+    semantic.build_semantic_indexes(fresh, changed)
+    incremental = time.perf_counter() - start
+    print(f"\nEmbedding {len(fresh.rows)} items: cold {1000 * cold:.2f} ms, "
+          f"after a one-item change {1000 * incremental:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# bench_sidecar.py - Memory and throughput of N web workers with and without the NLP sidecar
+#
+# Usage: python benchmarks/bench_sidecar.py [--workers 2 4 8] [--conversations 200] [--concurrency 8]
+#
+# For each worker count, starts gunicorn twice: once with every worker doing
+# its own NLP (models loaded before forking, or per worker with
+# --no-preload), and once with NLP_SOCKET pointing at a single nlp_server.py
+# sidecar. The same synthetic conversations as bench_conversations.py are
+# driven over HTTP. Memory is the total RSS and PSS of the gunicorn process
+# tree plus the sidecar.
+import argparse
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+
+import common
+from common import ADMISSION_OFF, free_port, print_table, wait_for_http
+from bench_conversations import HTTPDriver, drive, make_conversation, process_memory
+
+
+def wait_for_sidecar(path, process, timeout=300):
+    from nlp_server import NLPClient, NLPServerError
+    client = NLPClient(path)
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f"NLP sidecar exited with code {process.returncode}")
+        try:
+            client.call("get_food_type", ["warmup"])
+            return
+        except NLPServerError:
+            time.sleep(0.2)
+    raise RuntimeError(f"NLP sidecar at {path} did not start in {timeout}s")
+
+
+def run(workers, use_sidecar, conversations, args):
+    port = free_port()
+    socket_path = os.path.join(tempfile.mkdtemp(), "nlp.sock")
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY=str(workers), LAZY_MODELS="false",
+               SESSION_STORE="sqlite", GUNICORN_PRELOAD="false" if args.no_preload else "true",
+               **ADMISSION_OFF)
+    env.pop("NLP_SOCKET", None)
+    processes = []
+    try:
+        if use_sidecar:
+            sidecar = subprocess.Popen([sys.executable, "nlp_server.py", "--socket", socket_path,
+                                        "--processes", str(args.sidecar_processes)],
+                                       cwd=common.REPO_ROOT, env=env,
+                                       stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            processes.append(sidecar)
+            wait_for_sidecar(socket_path, sidecar)
+            env["NLP_SOCKET"] = socket_path
+        server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+                                  cwd=common.REPO_ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(server)
+        wait_for_http(f"http://127.0.0.1:{port}/", server)
+
+        timings, completed, seconds = drive(lambda: HTTPDriver("127.0.0.1", port), conversations,
+                                            args.concurrency)
+        rss_mb = pss_mb = 0.0
+        for process in processes:
+            rss, pss = process_memory(process.pid)
+            rss_mb += rss
+            pss_mb += pss
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+            process.wait()
+
+    errors = sum(1 for _, status, _ in timings if status != 200)
+    return {"workers": workers, "nlp": "sidecar" if use_sidecar else "in workers",
+            "turns_per_s": len(timings) / seconds, "errors": errors, "completed": completed,
+            "rss_mb": rss_mb, "pss_mb": pss_mb}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark web workers with and without the NLP sidecar")
+    parser.add_argument("--workers", type=int, nargs="+", default=[2, 4])
+    parser.add_argument("--conversations", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--sidecar-processes", type=int, default=1)
+    parser.add_argument("--no-preload", action="store_true",
+                        help="load the models in every worker instead of once before forking")
+    parser.add_argument("--seed", type=int, default=13)
+    args = parser.parse_args()
+
+    # This process only needs the menus and synonyms to generate conversations
+    os.environ.setdefault("LAZY_MODELS", "true")
+    os.environ.setdefault("SESSION_STORE", "memory")
+    import app as food_app
+
+    rng = random.Random(args.seed)
+    menus = food_app.catalog.snapshot().menus
+    conversations = [make_conversation(menus, food_app.synonyms_map, rng, 0.15, 0.2, 3)
+                     for _ in range(args.conversations)]
+
+    rows = []
+    for workers in args.workers:
+        for use_sidecar in (False, True):
+            rows.append(run(workers, use_sidecar, conversations, args))
+
+    print(f"{args.conversations} conversations, concurrency {args.concurrency}, "
+          f"models {'per worker' if args.no_preload else 'preloaded before fork'}\n")
+    print_table(rows, ["workers", "nlp", "turns_per_s", "errors", "completed", "rss_mb", "pss_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+# bench_spelling.py - Latency and accuracy of the spelling correction backends
+#
+# Usage: python benchmarks/bench_spelling.py [--orders 500] [--seed 7]
+#
+# Builds a corpus of order messages from menus.txt, misspells the menu words
+# with random single and double edits, and checks how often each backend
+# restores the original message.
+import argparse
+import random
+import re
+
+import common  # noqa: F401  (puts the repo root on sys.path)
+from common import misspell, print_table, summarize, time_calls
+
+import app
+
+TEMPLATES = [
+    "{q1} {a}",
+    "{q1} {a} and {q2} {b}",
+    "i want {q1} {a}, {q2} {b} and {q3} {c}",
+    "can i get {q1} {a} with {q2} {b}",
+    "{q1} {a} & {q2} {b}",
+    # Ordinary words near menu or quantity words must come back unchanged
+    "give me {q1} {a}",
+    "give me the {a}",
+    "can i have a cake",
+    "{q1} {a} and some tea",
+    "a quick {a} and a cold {b}",
+    "one thali please",
+]
+QUANTITIES = ["1", "2", "3", "one", "two", "three", "a"]
+
+# Hand-written misspellings seen in real orders
+HANDWRITTEN = [
+    ("2 chiken biryani and 1 butter nan", "2 chicken biryani and 1 butter naan"),
+    ("one panner tikka", "one paneer tikka"),
+    ("3 chese burger and a coke", "3 cheese burger and a coke"),
+    ("two frech fries", "two french fries"),
+    ("1 chocolat shake and 2 mango mojto", "1 chocolate shake and 2 mango mojito"),
+    ("i want dal makhni and jeera rce", "i want dal makhani and jeera rice"),
+    ("2 gulab jamn", "2 gulab jamun"),
+    ("a quinoa bwl", "a quinoa bowl"),
+    ("give me chicken biryani", "give me chicken biryani"),
+    ("give me the chiken wrap", "give me the chicken wrap"),
+    ("can i have a cake", "can i have a cake"),
+    ("tow cheese burger", "two cheese burger"),
+]
+
+
+def build_corpus(menus, count, seed):
+    """Return (misspelled, expected) message pairs"""
+    rng = random.Random(seed)
+    pairs = list(HANDWRITTEN)
+    restaurants = list(menus)
+    while len(pairs) < count:
+        items = list(menus[rng.choice(restaurants)])
+        picks = rng.sample(items, 3) if len(items) >= 3 else items * 3
+        clean = rng.choice(TEMPLATES).format(
+            a=picks[0], b=picks[1], c=picks[2],
+            q1=rng.choice(QUANTITIES), q2=rng.choice(QUANTITIES), q3=rng.choice(QUANTITIES))
+        noisy = " ".join(misspell(w, rng) if w in " ".join(picks).split() and rng.random() < 0.5 else w
+                         for w in clean.split())
+        pairs.append((noisy, clean))
+    return pairs
+
+
+def words(text):
+    return re.findall(r"[a-z0-9]+", text.lower())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare spelling correction backends")
+    parser.add_argument("--orders", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    snapshot = app.catalog.snapshot()
+    corpus = build_corpus(snapshot.menus, args.orders, args.seed)
+    noisy = [n for n, _ in corpus]
+
+    backends = {
+        "none": lambda text: text,
+        "textblob": app.correct_spelling_textblob,
+        "menu": snapshot.corrector.correct,
+    }
+
+    rows = []
+    for name, func in backends.items():
+        if name == "menu":
+            snapshot.corrector.correct_word.cache_clear()
+        results, timings = time_calls(func, noisy, repeat=args.repeat)
+        exact = sum(words(r) == words(e) for r, (_, e) in zip(results, corpus))
+        row = {"backend": name, "accuracy": exact / len(corpus)}
+        row.update(summarize(timings))
+        rows.append(row)
+
+    print(f"{len(corpus)} misspelled orders from menus.txt")
+    print_table(rows, ["backend", "accuracy", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+# bench_startup.py - Cold-start time and per-worker memory of the web server
+#
+# Usage: python benchmarks/bench_startup.py [--workers 4] [--runs 3]
+#
+# Measures how long a fresh interpreter takes to import app.py with eager and
+# lazy model loading, then boots gunicorn with and without --preload and
+# reports time-to-first-response plus RSS/PSS of the master and workers.
+# PSS splits shared pages between the processes sharing them, so it shows
+# the copy-on-write savings that RSS hides.
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import common
+from common import free_port, print_table, wait_for_http
+
+import psutil
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import app; "
+    "print(time.perf_counter() - start)"
+)
+
+
+def import_time(lazy, runs):
+    env = dict(os.environ, LAZY_MODELS="true" if lazy else "false")
+    timings = []
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-c", IMPORT_SNIPPET], cwd=common.REPO_ROOT,
+                                env=env, capture_output=True, text=True, check=True).stdout
+        timings.append(float(output.strip().splitlines()[-1]))
+    return min(timings)
+
+
+def memory(process):
+    """(rss, pss) in bytes; PSS needs /proc/<pid>/smaps_rollup"""
+    info = process.memory_full_info()
+    return info.rss, getattr(info, "pss", info.rss)
+
+
+def boot_gunicorn(preload, workers, timeout=300):
+    port = free_port()
+    env = dict(os.environ, GUNICORN_PRELOAD="true" if preload else "false",
+               WEB_CONCURRENCY=str(workers), PORT=str(port))
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+                              cwd=common.REPO_ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_http(f"http://127.0.0.1:{port}/", server, timeout)
+        first_response = time.perf_counter() - start
+
+        # Wait for every worker to finish booting and memory to settle
+        master = psutil.Process(server.pid)
+        previous = None
+        while time.perf_counter() - start < timeout:
+            children = master.children()
+            total = sum(memory(p)[0] for p in [master] + children)
+            if len(children) == workers and previous is not None and abs(total - previous) < 1 << 20:
+                break
+            previous = total
+            time.sleep(1)
+        all_ready = time.perf_counter() - start
+
+        master_rss, master_pss = memory(master)
+        worker_memory = [memory(p) for p in master.children()]
+        return {
+            "mode": "preload" if preload else "per-worker",
+            "workers": len(worker_memory),
+            "first_response_s": first_response,
+            "all_ready_s": all_ready,
+            "master_rss_mb": master_rss / 2**20,
+            "worker_rss_mb": sum(r for r, _ in worker_memory) / len(worker_memory) / 2**20,
+            "worker_pss_mb": sum(p for _, p in worker_memory) / len(worker_memory) / 2**20,
+            "total_pss_mb": (master_pss + sum(p for _, p in worker_memory)) / 2**20,
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure cold start and worker memory")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args()
+
+    rows = [{"import": "eager", "seconds": import_time(False, args.runs)},
+            {"import": "lazy", "seconds": import_time(True, args.runs)}]
+    print("Cold import of app.py (best of %d)" % args.runs)
+    print_table(rows, ["import", "seconds"])
+
+    rows = [boot_gunicorn(False, args.workers), boot_gunicorn(True, args.workers)]
+    print("\ngunicorn with %d workers" % args.workers)
+    print_table(rows, ["mode", "workers", "first_response_s", "all_ready_s", "master_rss_mb",
+                       "worker_rss_mb", "worker_pss_mb", "total_pss_mb"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+# bench_stream.py - Time to first event on the streaming /api/process endpoint
+#
+# Usage: python benchmarks/bench_stream.py [--orders 200] [--misspell-rate 0.3]
+#
+# Sends the same ordering messages to /api/process and /api/process/stream
+# (each to a fresh session, so the result cache is not hit) through Flask's
+# test client without buffering, and reports when the client gets the ack,
+# the first matched item and the final response, next to the latency of the
+# plain endpoint.
+import argparse
+import json
+import os
+import random
+import time
+
+import common
+from common import ADMISSION_OFF, misspell, print_table, summarize
+
+# Every order starts a fresh session from 127.0.0.1; measure the endpoints, not the limits
+os.environ.update(ADMISSION_OFF)
+import app
+
+QUANTITIES = ["1", "2", "3", "one", "two", "a"]
+
+
+def start_ordering(client, restaurant):
+    """A session id already in the ordering state at restaurant"""
+    session_id = client.post('/api/process', json={'message': 'hi'}).get_json()['session_id']
+    client.post('/api/process', json={'message': restaurant, 'session_id': session_id})
+    return session_id
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the streaming turn endpoint")
+    parser.add_argument("--orders", type=int, default=200)
+    parser.add_argument("--misspell-rate", type=float, default=0.3)
+    parser.add_argument("--seed", type=int, default=17)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    menus = app.catalog.snapshot().menus
+    orders = []
+    for _ in range(args.orders):
+        restaurant = rng.choice(list(menus))
+        items = rng.sample(list(menus[restaurant]), min(3, len(menus[restaurant])))
+        words = " and ".join(f"{rng.choice(QUANTITIES)} {item}" for item in items).split()
+        message = " ".join(misspell(w, rng) if rng.random() < args.misspell_rate else w for w in words)
+        orders.append((restaurant, f"{message} #{len(orders)}"))
+
+    client = app.app.test_client()
+    plain, ack, first_item, final = [], [], [], []
+    for restaurant, message in orders:
+        session_id = start_ordering(client, restaurant)
+        start = time.perf_counter()
+        client.post('/api/process', json={'message': message, 'session_id': session_id})
+        plain.append(time.perf_counter() - start)
+
+        session_id = start_ordering(client, restaurant)
+        start = time.perf_counter()
+        response = client.post('/api/process/stream', json={'message': message, 'session_id': session_id},
+                               buffered=False)
+        seen_item = False
+        for line in response.response:
+            event = json.loads(line)
+            elapsed = time.perf_counter() - start
+            if event['event'] == 'ack':
+                ack.append(elapsed)
+            elif event['event'] == 'item' and not seen_item:
+                first_item.append(elapsed)
+                seen_item = True
+            elif event['event'] == 'final':
+                final.append(elapsed)
+        response.close()
+
+    rows = []
+    for name, values in (("/api/process", plain), ("stream: ack", ack),
+                         ("stream: first item", first_item), ("stream: final", final)):
+        row = {"measure": name}
+        row.update(summarize(values))
+        rows.append(row)
+    print_table(rows, ["measure", "calls", "mean_ms", "p50_ms", "p95_ms", "p99_ms"])
+
+
+if __name__ == "__main__":
+    main()
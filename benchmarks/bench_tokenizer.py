@@ -0,0 +1,119 @@
+# bench_tokenizer.py - Golden cases and microbenchmark for the order tokenizer
+#
+# Usage: python benchmarks/bench_tokenizer.py [--orders 2000] [--long-words 300]
+#
+# First checks every case in data/tokenizer_golden.jsonl against the
+# tokenizer built for the loaded menus, and every remove/set command in
+# data/modification_golden.jsonl against parse_modification, and exits 1
+# on any difference. Then
+# times the tokenizer against the previous extraction front end (chained
+# number-word replaces plus the lazy "X item" regex) on synthetic orders and
+# on one long message, and reports how often each would fall back to spaCy.
+import argparse
+import json
+import os
+import random
+import re
+import sys
+
+import common
+from common import print_table, summarize, time_calls
+
+import app
+from tokenizer import parse_modification
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "data")
+GOLDEN_FILE = os.path.join(DATA_DIR, "tokenizer_golden.jsonl")
+MODIFICATION_FILE = os.path.join(DATA_DIR, "modification_golden.jsonl")
+
+NUMBER_WORDS = ["one", "two", "three", "four", "five", "six", "ten", "twelve", "twenty", "a", "a couple of"]
+FILLERS = ["i want", "can i get", "please add", "give me", "also", "and then", "someone said"]
+
+
+def legacy_extract(text):
+    """The extraction front end this tokenizer replaced, kept for comparison"""
+    text = text.lower().replace('one', '1').replace('two', '2').replace('three', '3') \
+        .replace('four', '4').replace('five', '5')
+    quantities = {}
+    food_entities = []
+    for quantity, item in re.findall(r'(\d+)\s+([a-zA-Z\s]+?)(?:,|\s+and|\s+&|\s*$)', text):
+        item = item.strip()
+        quantities[item] = int(quantity)
+        food_entities.append(item)
+    return food_entities, quantities
+
+
+def check_golden(tokenizer):
+    failures = []
+    with open(GOLDEN_FILE) as f:
+        for line in f:
+            case = json.loads(line)
+            entities, quantities = tokenizer.extract(case["text"])
+            if entities != case["entities"] or quantities != case["quantities"]:
+                failures.append((case["text"], case["entities"], case["quantities"], entities, quantities))
+    return failures
+
+
+def check_modifications():
+    failures = []
+    with open(MODIFICATION_FILE) as f:
+        for line in f:
+            case = json.loads(line)
+            parsed = parse_modification(case["text"])
+            expected = tuple(case["expected"]) if case["expected"] is not None else None
+            if parsed != expected:
+                failures.append((case["text"], expected, parsed))
+    return failures
+
+
+def synthetic_orders(menus, count, rng):
+    items = sorted({item for menu in menus.values() for item in menu})
+    orders = []
+    for _ in range(count):
+        parts = []
+        for _ in range(rng.randint(1, 4)):
+            parts.append(f"{rng.choice(NUMBER_WORDS + [str(rng.randint(1, 9))])} {rng.choice(items)}")
+        separator = rng.choice([", ", " and ", " & ", " with "])
+        orders.append(f"{rng.choice(FILLERS)} {separator.join(parts)}")
+    return orders
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Check and benchmark the order tokenizer")
+    parser.add_argument("--orders", type=int, default=2000)
+    parser.add_argument("--long-words", type=int, default=300)
+    parser.add_argument("--seed", type=int, default=5)
+    args = parser.parse_args()
+
+    snapshot = app.catalog.snapshot()
+    tokenizer = snapshot.tokenizer
+
+    failures = check_golden(tokenizer)
+    modification_failures = check_modifications()
+    if failures or modification_failures:
+        for text, entities, quantities, got_entities, got_quantities in failures:
+            print(f"{text!r}: expected {entities} {quantities}, got {got_entities} {got_quantities}")
+        for text, expected, parsed in modification_failures:
+            print(f"{text!r}: expected {expected}, got {parsed}")
+        sys.exit(1)
+    print("Golden cases OK\n")
+
+    rng = random.Random(args.seed)
+    orders = synthetic_orders(snapshot.menus, args.orders, rng)
+    # No separator or trailing anchor for the lazy regex to stop at until the very end
+    long_message = "2 " + " ".join(rng.choice(["spicy", "extra", "cheese", "large", "hot"])
+                                   for _ in range(args.long_words)) + " 1"
+
+    rows = []
+    for name, func in (("legacy regex", legacy_extract), ("tokenizer", tokenizer.extract)):
+        results, timings = time_calls(func, orders)
+        row = {"extractor": name, "spacy_fallback": sum(not e for e, _ in results) / len(results)}
+        row.update(summarize(timings))
+        _, long_timings = time_calls(func, [long_message], repeat=20)
+        row["long_ms"] = summarize(long_timings)["p50_ms"]
+        rows.append(row)
+    print_table(rows, ["extractor", "spacy_fallback", "mean_ms", "p50_ms", "p99_ms", "long_ms"])
+
+
+if __name__ == "__main__":
+    main()
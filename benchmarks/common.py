@@ -0,0 +1,132 @@
+# common.py - Shared helpers for the benchmark scripts
+import math
+import os
+import socket
+import sys
+import time
+import urllib.request
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Benchmarks import the app modules directly, so make the repo root importable
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
+
+# admission.py's rate limits switched off. Every simulated client connects
+# from 127.0.0.1, so per-IP limits would treat them all as a single visitor
+RATE_LIMITS_OFF = {"SESSION_RATE_LIMIT": "0", "IP_RATE_LIMIT": "0", "ANONYMOUS_RATE_LIMIT": "0"}
+# Every admission knob at its "off" value, for benchmarks that measure the pipeline itself
+ADMISSION_OFF = dict(RATE_LIMITS_OFF, MAX_MESSAGE_LENGTH="0", SHED_QUEUE_DEPTH="0",
+                     MAX_ORDER_ENTITIES="1000000")
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def time_calls(func, inputs, repeat=1):
+    """Call func on every input repeat times, returning (results, per-call seconds)"""
+    results = []
+    timings = []
+    for _ in range(repeat):
+        results = []
+        for value in inputs:
+            start = time.perf_counter()
+            results.append(func(value))
+            timings.append(time.perf_counter() - start)
+    return results, timings
+
+
+def summarize(timings):
+    """Latency summary in milliseconds"""
+    total = sum(timings)
+    return {
+        'calls': len(timings),
+        'mean_ms': 1000 * total / len(timings) if timings else 0.0,
+        'p50_ms': 1000 * percentile(timings, 50),
+        'p95_ms': 1000 * percentile(timings, 95),
+        'p99_ms': 1000 * percentile(timings, 99),
+    }
+
+
+def print_table(rows, columns):
+    """Print a list of dicts as an aligned text table"""
+    widths = {c: max(len(c), *(len(format_cell(r.get(c))) for r in rows)) for c in columns}
+    print("  ".join(c.ljust(widths[c]) for c in columns))
+    for row in rows:
+        print("  ".join(format_cell(row.get(c)).ljust(widths[c]) for c in columns))
+
+
+def format_cell(value):
+    if isinstance(value, float):
+        return f"{value:.3f}"
+    return str(value)
+
+
+def free_port():
+    """An unused local TCP port"""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def wait_for_http(url, process=None, timeout=300):
+    """Poll url until it answers; returns seconds waited"""
+    start = time.perf_counter()
+    while time.perf_counter() - start < timeout:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError("server exited during startup")
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return time.perf_counter() - start
+        except OSError:
+            time.sleep(0.05)
+    raise RuntimeError(f"{url} did not answer within {timeout}s")
+
+
+FOODS = ["burger", "pizza", "fries", "wrap", "sandwich", "shake", "biryani", "roti",
+         "paneer", "dal", "naan", "curry", "rice", "thali", "salad", "bowl", "toast",
+         "smoothie", "noodles", "momo", "dosa", "idli", "kebab", "tikka", "soup"]
+STYLES = ["classic", "spicy", "cheese", "chicken", "veg", "masala", "butter", "garlic",
+          "grilled", "crispy", "tandoori", "mango", "chocolate", "jeera", "paneer"]
+
+
+def write_menu_file(path, restaurants, items, rng):
+    """Write a synthetic catalog in the menus.txt format"""
+    with open(path, "w") as f:
+        for r in range(restaurants):
+            f.write(f"{rng.choice(STYLES)} kitchen {r}\n")
+            names = set()
+            while len(names) < min(items, len(STYLES) * len(FOODS)):
+                names.add(f"{rng.choice(STYLES)} {rng.choice(FOODS)}")
+            # Every style and food combination is taken; number the rest
+            for number in range(2, items - len(names) + 2):
+                names.add(f"{rng.choice(STYLES)} {rng.choice(FOODS)} {number}")
+            for name in names:
+                f.write(f"{name} - {rng.randrange(20, 500)}\n")
+            f.write("\n")
+
+
+def misspell(word, rng):
+    """Apply one or two random edits to a word"""
+    letters = "abcdefghijklmnopqrstuvwxyz"
+    edits = 1 if len(word) <= 5 else rng.choice([1, 2])
+    for _ in range(edits):
+        if len(word) < 4:
+            break
+        i = rng.randrange(1, len(word) - 1)
+        op = rng.choice(["delete", "insert", "replace", "transpose"])
+        if op == "delete":
+            word = word[:i] + word[i + 1:]
+        elif op == "insert":
+            word = word[:i] + rng.choice(letters) + word[i:]
+        elif op == "replace":
+            word = word[:i] + rng.choice(letters) + word[i + 1:]
+        else:
+            word = word[:i - 1] + word[i] + word[i - 1] + word[i + 1:]
+    return word
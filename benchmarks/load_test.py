@@ -0,0 +1,135 @@
+# load_test.py - Concurrent mixed-traffic load test for /api/process
+#
+# Usage:
+#   python benchmarks/load_test.py --serve wsgi    # gunicorn app:app
+#   python benchmarks/load_test.py --serve asgi    # uvicorn asgi:application
+#   python benchmarks/load_test.py --url http://127.0.0.1:5000
+#
+# Sends a mix of NLP-heavy turns (welcome and ordering messages) and cheap
+# turns (checkout, payment, delivery, new_order) from many concurrent
+# clients and reports p50/p99 latency for each kind separately, so a burst
+# of ordering messages starving the simple confirmations shows up directly.
+import argparse
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from urllib.parse import urlparse
+
+import common
+from common import RATE_LIMITS_OFF, free_port, percentile, print_table, wait_for_http
+
+HEAVY_TURNS = [
+    {'message': "2 chiken biryani and 1 butter naan", 'context': {'state': 'ordering', 'restaurant': 'desi delight'}},
+    {'message': "i want a cheese burgr, french fries and 2 cokes", 'context': {'state': 'ordering', 'restaurant': 'tasty bites'}},
+    {'message': "one quinoa bowl and a frut smoothie", 'context': {'state': 'ordering', 'restaurant': 'healthy bites'}},
+    {'message': "I'd like some biryani and paneer tonight", 'context': {'state': 'welcome'}},
+]
+CHEAP_TURNS = [
+    {'message': "yes", 'context': {'state': 'checkout', 'restaurant': 'desi delight',
+                                   'order': [{'item': 'roti', 'price': 20, 'quantity': 2}]}},
+    {'message': "upi", 'context': {'state': 'payment', 'restaurant': 'tasty bites'}},
+    {'message': "12 park street kolkata", 'context': {'state': 'delivery', 'restaurant': 'tasty bites',
+                                                      'order': [{'item': 'coke', 'price': 50, 'quantity': 1}]}},
+    {'message': "done", 'context': {'state': 'ordering', 'restaurant': 'desi delight',
+                                    'order': [{'item': 'roti', 'price': 20, 'quantity': 2}]}},
+    {'message': "bye", 'context': {'state': 'new_order', 'restaurant': 'tasty bites'}},
+]
+
+SERVERS = {
+    "wsgi": [sys.executable, "-m", "gunicorn", "--config", "gunicorn.conf.py", "app:app"],
+    "asgi": [sys.executable, "-m", "uvicorn", "asgi:application", "--host", "127.0.0.1", "--no-access-log"],
+}
+
+
+def client(url, requests, heavy_share, seed, results):
+    parsed = urlparse(url)
+    rng = random.Random(seed)
+    conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+    for _ in range(requests):
+        heavy = rng.random() < heavy_share
+        body = json.dumps(rng.choice(HEAVY_TURNS if heavy else CHEAP_TURNS))
+        start = time.perf_counter()
+        try:
+            conn.request("POST", "/api/process", body, {"Content-Type": "application/json"})
+            response = conn.getresponse()
+            response.read()
+            status = response.status
+        except (OSError, http.client.HTTPException):
+            conn.close()
+            conn = http.client.HTTPConnection(parsed.hostname, parsed.port, timeout=120)
+            status = "error"
+        results.append(("heavy" if heavy else "cheap", status, time.perf_counter() - start))
+    conn.close()
+
+
+def run_load(url, concurrency, requests, heavy_share):
+    results = []
+    threads = [threading.Thread(target=client, args=(url, requests, heavy_share, i, results))
+               for i in range(concurrency)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    rows = []
+    for kind in ("cheap", "heavy"):
+        timings = [t for k, status, t in results if k == kind and status == 200]
+        shed = sum(1 for k, status, _ in results if k == kind and status == 503)
+        # Turned away by admission control's rate limits, not a failure to serve
+        limited = sum(1 for k, status, _ in results if k == kind and status == 429)
+        errors = sum(1 for k, status, _ in results if k == kind and status not in (200, 429, 503))
+        rows.append({
+            "kind": kind,
+            "ok": len(timings),
+            "shed_503": shed,
+            "limited_429": limited,
+            "errors": errors,
+            "p50_ms": 1000 * percentile(timings, 50),
+            "p99_ms": 1000 * percentile(timings, 99),
+            "max_ms": 1000 * max(timings, default=0.0),
+        })
+    return rows, len(results) / elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Mixed-traffic load test for /api/process")
+    parser.add_argument("--url", help="test an already running server")
+    parser.add_argument("--serve", choices=sorted(SERVERS), help="start a local server to test")
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=50, help="requests per client")
+    parser.add_argument("--heavy-share", type=float, default=0.5)
+    args = parser.parse_args()
+    if not args.url and not args.serve:
+        parser.error("pass --url or --serve")
+
+    server = None
+    url = args.url
+    if args.serve:
+        port = free_port()
+        url = f"http://127.0.0.1:{port}"
+        # Every client connects from 127.0.0.1; only the pool and shedding are under test here
+        env = dict(os.environ, PORT=str(port), SESSION_STORE="memory", **RATE_LIMITS_OFF)
+        server = subprocess.Popen(SERVERS[args.serve] + (["--port", str(port)] if args.serve == "asgi" else []),
+                                  cwd=common.REPO_ROOT, env=env,
+                                  stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for_http(url + "/", server)
+        rows, throughput = run_load(url, args.concurrency, args.requests, args.heavy_share)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    print(f"{url}: {args.concurrency} clients, {args.heavy_share:.0%} heavy, {throughput:.1f} req/s")
+    print_table(rows, ["kind", "ok", "shed_503", "limited_429", "errors", "p50_ms", "p99_ms", "max_ms"])
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+# cart.py - The order being built during a conversation, keyed by menu item
+#
+# A Cart holds one line per menu item, so ordering the same item twice
+# merges the quantities, and keeps its total up to date as add/remove/set
+# deltas are applied instead of re-summing the lines. Between turns it is
+# stored in the conversation context as [[item, quantity], ...]; prices are
+# never stored and always come from the current menu.
+
+
+class Cart:
+    """Menu item -> quantity, with prices from one menu and a running total"""
+
+    def __init__(self, menu):
+        self.menu = menu
+        self.quantities = {}
+        self.total = 0
+
+    @classmethod
+    def load(cls, lines, menu):
+        """Rebuild a cart from its stored form, dropping items no longer on the menu.
+
+        Also accepts the older list of {"item", "price", "quantity"} dicts.
+        """
+        cart = cls(menu)
+        for line in lines or ():
+            if isinstance(line, dict):
+                item, quantity = line.get('item'), line.get('quantity', 1)
+            else:
+                item, quantity = line
+            if item in menu:
+                cart.add(item, int(quantity))
+        return cart
+
+    def dump(self):
+        """Compact stored form: [[item, quantity], ...] in the order items were first added"""
+        return [[item, quantity] for item, quantity in self.quantities.items()]
+
+    def __len__(self):
+        return len(self.quantities)
+
+    def __contains__(self, item):
+        return item in self.quantities
+
+    def quantity(self, item):
+        return self.quantities.get(item, 0)
+
+    def add(self, item, quantity=1):
+        """Add quantity of item (merging with an existing line); returns the new quantity"""
+        return self.set(item, self.quantities.get(item, 0) + quantity)
+
+    def remove(self, item, quantity=None):
+        """Take quantity of item off the order, or the whole line; returns what is left"""
+        if quantity is None:
+            return self.set(item, 0)
+        return self.set(item, self.quantities.get(item, 0) - quantity)
+
+    def set(self, item, quantity):
+        """Set item's quantity; zero or less removes the line. Returns the new quantity."""
+        quantity = max(0, quantity)
+        previous = self.quantities.get(item, 0)
+        if quantity:
+            self.quantities[item] = quantity
+        else:
+            self.quantities.pop(item, None)
+        self.total += (quantity - previous) * self.menu[item]
+        return quantity
+
+    def lines(self):
+        """Priced order lines, as sent in order_summary and recorded in the order log"""
+        return [{'item': item, 'price': self.menu[item], 'quantity': quantity}
+                for item, quantity in self.quantities.items()]
+
+    def summary(self):
+        return {'items': self.lines(), 'total': self.total}
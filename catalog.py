@@ -0,0 +1,235 @@
+# catalog.py - Hot-reloadable menu catalog with immutable, versioned snapshots
+import hashlib
+import json
+import os
+import threading
+import time
+import logging
+from urllib.parse import quote
+
+from matcher import MenuMatchIndex
+from search import RestaurantSearchIndex
+from semantic import build_semantic_indexes
+from spelling import build_menu_corrector
+from tokenizer import build_order_tokenizer
+
+logger = logging.getLogger(__name__)
+
+
+# Load menu data from file
+def load_menu_from_file(filename):
+    menus = {}
+    try:
+        with open(filename, 'r') as f:
+            content = f.read().strip().split('\n\n')
+            for block in content:
+                lines = block.strip().split('\n')
+                if not lines or not lines[0].strip():
+                    continue
+                restaurant = lines[0].strip().lower()
+                menu_items = {}
+                for item in lines[1:]:
+                    if ' - ' in item:
+                        name, price = item.split(' - ')
+                        menu_items[name.lower().strip()] = int(price.strip())
+                menus[restaurant] = menu_items
+                
+        logger.info(f"Successfully loaded menus from {filename}")
+        return menus
+    except FileNotFoundError:
+        logger.warning(f"Menu file '{filename}' not found. Using sample menus.")
+        return None
+    except Exception as e:
+        logger.error(f"Error loading menu: {str(e)}")
+        return None
+
+
+def serialize(payload):
+    """Compact JSON bytes and a content-derived ETag for them.
+
+    The ETag only changes when the content does, so a client keeps its
+    cached copy of a menu across reloads that did not touch it.
+    """
+    body = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+    return body, hashlib.blake2b(body, digest_size=8).hexdigest()
+
+
+class CatalogSnapshot:
+    """One consistent version of the menus and everything derived from them.
+
+    A request grabs a snapshot once and uses it throughout, so a reload
+    that lands mid-request can never mix two versions of the menus.
+    """
+
+    def __init__(self, menus, version, synonyms=None, scorer=None, protected=(),
+                 categories=None, encoder=None, warm=None):
+        self.menus = menus
+        self.version = version
+        self.synonyms = synonyms or {}
+        self.scorer = scorer
+        self.restaurants = list(menus)
+        # Ready-made response['options'] for the full restaurant list
+        self.options = [r.title() for r in self.restaurants]
+        # Category keywords ("thali") are matched as typed, so never correct them away
+        keywords = set(protected).union(*(categories or {}).values())
+        self.corrector = build_menu_corrector(menus, self.synonyms, protected=keywords)
+        self.tokenizer = build_order_tokenizer(menus, self.synonyms)
+        self.search_index = RestaurantSearchIndex(menus, self.synonyms, stop_words=protected)
+        # Item embeddings are computed here, on the reload thread, never on a request
+        self.semantic_indexes = build_semantic_indexes(encoder, menus) if encoder is not None else {}
+
+        self._menu_payloads = {}
+        self._menu_bytes = {}
+        self._options_bytes = None
+        self._match_indexes = {}
+        self._lock = threading.Lock()
+
+        self.categories = {}
+        self.category_index = {name: [] for name in (categories or {})}
+        self.name_categories = {}
+        for restaurant, items in menus.items():
+            category = self._categorize(restaurant, items, categories or {})
+            if category is None:
+                continue
+            self.categories[restaurant] = category
+            self.category_index[category].append(restaurant)
+            for word in restaurant.split():
+                self.name_categories.setdefault(word, set()).add(category)
+
+        # Compiled menus (menu_binary.MappedMenus) are decoded on demand; formatting
+        # every payload up front would decode and keep all of them in each worker
+        if warm is None:
+            warm = isinstance(menus, dict)
+        if warm:
+            for restaurant in self.restaurants:
+                self.menu_payload(restaurant)
+
+    def _categorize(self, restaurant, items, categories):
+        """Pick the category whose keywords overlap most with the restaurant's words"""
+        words = set(restaurant.split())
+        for item in items:
+            words.update(item.split())
+        best, best_score = None, 0
+        for name, keywords in categories.items():
+            score = len(words & keywords)
+            if score > best_score:
+                best, best_score = name, score
+        return best
+
+    def restaurants_for(self, food_type):
+        """Restaurants in a category; 'general' (or any unknown type) means all of them"""
+        if food_type in self.category_index:
+            return self.category_index[food_type]
+        return self.restaurants
+
+    def menu_payload(self, restaurant):
+        """response['menu'] for a restaurant, formatted once per snapshot"""
+        payload = self._menu_payloads.get(restaurant)
+        if payload is None:
+            payload = [{"name": item.title(), "price": price}
+                       for item, price in self.menus[restaurant].items()]
+            self._menu_payloads[restaurant] = payload
+        return payload
+
+    def menu_bytes(self, restaurant):
+        """(compact JSON bytes, ETag) of menu_payload(restaurant), serialized once per snapshot"""
+        entry = self._menu_bytes.get(restaurant)
+        if entry is None:
+            entry = self._menu_bytes[restaurant] = serialize(self.menu_payload(restaurant))
+        return entry
+
+    def options_bytes(self):
+        """(compact JSON bytes, ETag) of options"""
+        if self._options_bytes is None:
+            self._options_bytes = serialize(self.options)
+        return self._options_bytes
+
+    def menu_ref(self, restaurant):
+        """Where a client can fetch a restaurant's menu instead of receiving it inline"""
+        etag = self.menu_bytes(restaurant)[1]
+        return {'restaurant': restaurant, 'etag': etag, 'url': f"/api/menus/{quote(restaurant)}?v={etag}"}
+
+    def options_ref(self):
+        """Where a client can fetch the full restaurant list instead of receiving it inline"""
+        etag = self.options_bytes()[1]
+        return {'etag': etag, 'url': f"/api/restaurants?v={etag}"}
+
+    def match_index(self, restaurant):
+        """MenuMatchIndex for a restaurant, built on first use"""
+        index = self._match_indexes.get(restaurant)
+        if index is None:
+            with self._lock:
+                index = self._match_indexes.get(restaurant)
+                if index is None:
+                    index = MenuMatchIndex(self.menus[restaurant], self.synonyms, self.scorer,
+                                           self.semantic_indexes.get(restaurant))
+                    self._match_indexes[restaurant] = index
+        return index
+
+
+class MenuCatalog:
+    """Holds the current CatalogSnapshot and swaps in a new one when the menu file changes.
+
+    The file is checked at most every check_interval seconds, from whichever
+    request asks for a snapshot, and the new snapshot is built on a
+    background thread; requests keep using the old one until the swap.
+    Checking from requests rather than a polling thread keeps this working
+    in gunicorn workers forked after the catalog was created.
+    """
+
+    def __init__(self, path, loader, check_interval=5.0, on_reload=None, **snapshot_options):
+        self.path = path
+        self.loader = loader
+        self.check_interval = check_interval
+        self.on_reload = on_reload
+        self.snapshot_options = snapshot_options
+        self._snapshot = None
+        self._version = 0
+        self._mtime = None
+        self._next_check = 0.0
+        self._reloading = threading.Lock()
+        self.reload()
+
+    def snapshot(self):
+        """The current snapshot; may kick off a background reload"""
+        if self.check_interval and time.monotonic() >= self._next_check:
+            self._next_check = time.monotonic() + self.check_interval
+            if self._file_mtime() != self._mtime and not self._reloading.locked():
+                threading.Thread(target=self.reload, name="menu-reload", daemon=True).start()
+        return self._snapshot
+
+    def _file_mtime(self):
+        try:
+            return os.stat(self.path).st_mtime_ns
+        except OSError:
+            return None
+
+    def reload(self):
+        """Load the menu file and atomically publish a new snapshot; returns True on success"""
+        if not self._reloading.acquire(blocking=False):
+            return False
+        try:
+            mtime = self._file_mtime()
+            start = time.perf_counter()
+            menus = self.loader(self.path)
+            if not menus and self._snapshot is not None:
+                # A missing, broken or half-written file: keep serving the last good
+                # version, and do not retry until the file changes again
+                self._mtime = mtime
+                return False
+            snapshot = CatalogSnapshot(menus or {}, self._version + 1, **self.snapshot_options)
+            self._version += 1
+            self._mtime = mtime
+            # A single reference assignment is atomic; in-flight requests keep their old snapshot
+            self._snapshot = snapshot
+            if self.on_reload is not None:
+                self.on_reload()
+            logger.info(f"Menu catalog v{snapshot.version}: {len(snapshot.menus)} restaurants "
+                        f"loaded in {time.perf_counter() - start:.3f}s")
+            return bool(menus)
+        finally:
+            self._reloading.release()
+
+    @property
+    def version(self):
+        return self._snapshot.version
@@ -0,0 +1,28 @@
+# gunicorn.conf.py - Worker settings for serving app.py
+import gc
+import os
+import multiprocessing
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+workers = int(os.environ.get("WEB_CONCURRENCY", min(4, multiprocessing.cpu_count())))
+# Threads per worker. NLP turns queue up inside a worker (on the GIL), and
+# once more than SHED_QUEUE_DEPTH of them are in flight admission.py sheds
+# new ones to the cheap parsing tier. That needs more than one thread: a
+# sync worker only ever has one turn in flight, so it never sheds.
+threads = int(os.environ.get("GUNICORN_THREADS", 8))
+# Unless set, shed once more than half of a worker's threads are on NLP turns
+# (the app reads this when it is imported, after this file)
+os.environ.setdefault("SHED_QUEUE_DEPTH", str(max(1, threads // 2)))
+
+# Import app.py (and so load the NLP models) once in the master before
+# forking; workers then share the model pages copy-on-write instead of each
+# loading their own copy. Set GUNICORN_PRELOAD=false to compare.
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() == "true"
+
+
+def when_ready(server):
+    # Move everything allocated so far into the permanent generation so the
+    # workers' garbage collector never writes to (and un-shares) those pages
+    if preload_app:
+        gc.freeze()
+        server.log.info(f"Froze {gc.get_freeze_count()} objects before forking workers")
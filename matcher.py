@@ -0,0 +1,274 @@
+# matcher.py - Precompiled per-restaurant index for matching user words to menu items
+import difflib
+
+from metrics import MATCH_STAGE_TOTAL
+
+try:
+    import numpy as np
+    from rapidfuzz import fuzz as rapid_fuzz, process as rapid_process
+    rapidfuzz_available = True
+except ImportError:
+    rapidfuzz_available = False
+
+# Thresholds used by find_best_match in app.py
+FUZZY_THRESHOLD = 75
+DIFFLIB_CUTOFF = 0.75
+# Raw ratio below which a score cannot round up to FUZZY_THRESHOLD
+FUZZY_SCORE_CUTOFF = FUZZY_THRESHOLD - 0.5
+# Score find_best_match gives an item that contains the user's word
+SUBSTRING_SCORE = 85
+# select_restaurant accepts a restaurant whose rounded ratio is over 70
+RESTAURANT_SCORE_CUTOFF = 70.5
+
+
+def bigrams(text):
+    """Multiset of character bigrams as a dict of gram -> count"""
+    grams = {}
+    for i in range(len(text) - 1):
+        gram = text[i:i + 2]
+        grams[gram] = grams.get(gram, 0) + 1
+    return grams
+
+
+def may_reach_ratio(query_length, item_length, shared_bigrams):
+    """Whether an item could score a rounded fuzz.ratio >= FUZZY_THRESHOLD.
+
+    ratio = 2M / T where M is the number of matched characters and T the
+    total length. Rounding means we need 2M / T >= 0.745, which bounds both
+    the length difference and the number of bigrams the strings must share:
+    of the M - 1 gaps between matched characters at most T - 2M can be
+    broken by an unmatched character, so at least 3M - T - 1 matched
+    bigrams are common to both strings.
+    """
+    total = query_length + item_length
+    if 4000 * min(query_length, item_length) < 745 * total:
+        return False
+    min_matches = (745 * total + 1999) // 2000
+    return shared_bigrams >= 3 * min_matches - total - 1
+
+
+class MenuMatchIndex:
+    """Lookup structures for one restaurant's menu, built once when menus load.
+
+    Holds an exact/synonym hash, a token -> items inverted index and a
+    character bigram index. With RapidFuzz installed, fuzzy scoring is one
+    cdist call over all of a message's words and this menu's items;
+    without it, only the short list of items that can possibly pass the
+    threshold is scored. match() returns exactly what
+    find_best_match(user_word, menu.keys()) would, except that words
+    find_best_match has no answer for go to the optional SemanticIndex.
+    """
+
+    def __init__(self, menu_items, synonyms=None, scorer=None, semantic=None):
+        self.items = list(menu_items)
+        self.positions = {item: pos for pos, item in enumerate(self.items)}
+        self.synonyms = {}
+        self.scorer = scorer
+        self.semantic = semantic
+        self.token_index = {}
+        self.bigram_index = {}
+        self.lengths = [len(item) for item in self.items]
+        self.by_length = {}
+
+        # Only keep synonyms that actually resolve on this menu
+        for word, target in (synonyms or {}).items():
+            if target in self.positions:
+                self.synonyms[word] = target
+
+        for pos, item in enumerate(self.items):
+            self.by_length.setdefault(len(item), []).append(pos)
+            for token in set(item.split()):
+                self.token_index.setdefault(token, []).append(pos)
+            for gram, count in bigrams(item).items():
+                self.bigram_index.setdefault(gram, []).append((pos, count))
+
+    def __len__(self):
+        return len(self.items)
+
+    def _substring_positions(self, user_word):
+        """Positions of items containing user_word, in menu order"""
+        if len(user_word) < 2:
+            return [pos for pos, item in enumerate(self.items) if user_word in item]
+
+        # Every bigram of user_word must occur in the item; start from the rarest
+        postings = sorted((self.bigram_index.get(gram, ()) for gram in bigrams(user_word)), key=len)
+        candidates = {pos for pos, _ in postings[0]}
+        for posting in postings[1:]:
+            if not candidates:
+                break
+            candidates &= {pos for pos, _ in posting}
+        return sorted(pos for pos in candidates if user_word in self.items[pos])
+
+    def _fuzzy_positions(self, user_word):
+        """Positions of items that may reach the fuzzy threshold, in menu order"""
+        shared = {}
+        for gram, count in bigrams(user_word).items():
+            for pos, item_count in self.bigram_index.get(gram, ()):
+                shared[pos] = shared.get(pos, 0) + min(count, item_count)
+
+        query_length = len(user_word)
+        candidates = [pos for pos, count in shared.items()
+                      if may_reach_ratio(query_length, self.lengths[pos], count)]
+
+        # Very short strings can pass without sharing any bigram at all
+        for length in range(1, 9 - query_length):
+            if may_reach_ratio(query_length, length, 0):
+                candidates.extend(pos for pos in self.by_length.get(length, ()) if pos not in shared)
+        return sorted(candidates)
+
+    def match(self, user_word):
+        """Find best match for user word in the menu"""
+        return self.match_many((user_word,))[user_word]
+
+    def match_many(self, user_words, semantic=True):
+        """Resolve all entities of one message together, returning {word: match}.
+
+        Exact and synonym hits are dictionary lookups; the words left over are
+        fuzzy-scored against the menu together, and only the ones that still
+        have no match go on to the difflib and word-part stages, and then to
+        the semantic index (skipped when semantic is False).
+        """
+        matches = {}
+        pending = []
+        for user_word in user_words:
+            if user_word in matches:
+                continue
+            # 1. Exact match
+            if user_word in self.positions:
+                matches[user_word] = user_word
+                MATCH_STAGE_TOTAL.inc("exact")
+            # 2. Check synonyms
+            elif user_word in self.synonyms:
+                matches[user_word] = self.synonyms[user_word]
+                MATCH_STAGE_TOTAL.inc("synonym")
+            else:
+                matches[user_word] = None
+                pending.append(user_word)
+
+        if pending:
+            # 3. Fuzzy matching
+            fuzzy_matches = self._fuzzy_matches(pending)
+            missed = []
+            for user_word in pending:
+                match, stage = fuzzy_matches.get(user_word), "fuzzy"
+                if match is None:
+                    match, stage = self._fallback_match(user_word)
+                if match is None:
+                    missed.append(user_word)
+                    continue
+                matches[user_word] = match
+                MATCH_STAGE_TOTAL.inc(stage)
+
+            # 6. Nearest item by meaning, one matrix product for all the misses
+            semantic_matches = self.semantic.best_many(missed) if missed and semantic and self.semantic else {}
+            for user_word in missed:
+                matches[user_word] = semantic_matches.get(user_word)
+                MATCH_STAGE_TOTAL.inc("semantic" if user_word in semantic_matches else "none")
+        return matches
+
+    def _fuzzy_matches(self, user_words):
+        """{word: item} for the words whose best fuzzy score reaches FUZZY_THRESHOLD"""
+        if self.scorer is None or not self.items:
+            return {}
+        if rapidfuzz_available:
+            return self._fuzzy_matches_cdist(user_words)
+        matches = {}
+        for user_word in user_words:
+            match = self._fuzzy_match_candidates(user_word)
+            if match:
+                matches[user_word] = match
+        return matches
+
+    def _fuzzy_matches_cdist(self, user_words):
+        """Score every word against every item in one native RapidFuzz call.
+
+        RapidFuzz's ratio is the InDel similarity fuzzywuzzy's ratio rounds,
+        so rounding half-to-even, overriding substrings with SUBSTRING_SCORE
+        and taking the first maximum gives exactly the item the one-at-a-time
+        loop in find_best_match picks.
+        """
+        scores = rapid_process.cdist(user_words, self.items, scorer=rapid_fuzz.ratio,
+                                     score_cutoff=FUZZY_SCORE_CUTOFF, dtype=np.float64)
+        scores = np.rint(scores)
+        for row, user_word in enumerate(user_words):
+            substring_positions = self._substring_positions(user_word)
+            if substring_positions:
+                scores[row, substring_positions] = SUBSTRING_SCORE
+        best = scores.argmax(axis=1)
+
+        matches = {}
+        for row, user_word in enumerate(user_words):
+            if scores[row, best[row]] >= FUZZY_THRESHOLD:
+                matches[user_word] = self.items[best[row]]
+        return matches
+
+    def _fuzzy_match_candidates(self, user_word):
+        """Best fuzzy match scored one candidate at a time (without RapidFuzz)"""
+        substrings = set(self._substring_positions(user_word))
+        best_match = None
+        best_score = 0
+
+        for pos in sorted(substrings.union(self._fuzzy_positions(user_word))):
+            item = self.items[pos]
+            if pos in substrings:
+                score = SUBSTRING_SCORE
+            else:
+                score = self.scorer(user_word, item)
+
+            if score > best_score and score >= FUZZY_THRESHOLD:
+                best_score = score
+                best_match = item
+        return best_match
+
+    def _fallback_match(self, user_word):
+        """(match, stage) from the difflib and word-part stages"""
+        # 4. Difflib fallback; items outside the candidate list cannot reach the cutoff
+        fuzzy_positions = self._fuzzy_positions(user_word)
+        close_matches = difflib.get_close_matches(
+            user_word, [self.items[pos] for pos in fuzzy_positions], n=1, cutoff=DIFFLIB_CUTOFF)
+        if close_matches:
+            return close_matches[0], "difflib"
+
+        # 5. Word part matching for multi-word items
+        parts = user_word.split()
+        if not parts:
+            return (self.items[0], "word_part") if self.items else (None, "none")
+
+        part_positions = None
+        for part in set(parts):
+            posting = self.token_index.get(part)
+            if not posting:
+                part_positions = set()
+                break
+            part_positions = set(posting) if part_positions is None else part_positions & set(posting)
+
+        positions = part_positions.union(self._substring_positions(user_word))
+        if positions:
+            return self.items[min(positions)], "word_part"
+        return None, "none"
+
+
+def closest_choice(query, choices, score_cutoff, scorer=None):
+    """The choice with the highest ratio to query, if it reaches score_cutoff.
+
+    Uses RapidFuzz's extractOne when available; otherwise scores the choices
+    one at a time with scorer. Ties go to the earlier choice either way.
+    """
+    if rapidfuzz_available:
+        result = rapid_process.extractOne(query, choices, scorer=rapid_fuzz.ratio, score_cutoff=score_cutoff)
+        return result[0] if result else None
+    if scorer is None:
+        return None
+    best, best_score = None, None
+    for choice in choices:
+        score = scorer(query, choice)
+        if score >= score_cutoff and (best is None or score > best_score):
+            best, best_score = choice, score
+    return best
+
+
+def build_match_indexes(menus, synonyms=None, scorer=None, semantic_indexes=None):
+    """Build a MenuMatchIndex for every restaurant"""
+    semantic_indexes = semantic_indexes or {}
+    return {restaurant: MenuMatchIndex(items, synonyms, scorer, semantic_indexes.get(restaurant))
+            for restaurant, items in (menus or {}).items()}
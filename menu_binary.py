@@ -0,0 +1,252 @@
+# menu_binary.py - Compact, memory-mapped binary menus compiled from menus.txt
+#
+# Usage: python menu_binary.py menus.txt -o menus.bin
+#
+# menus.txt stays the source format; point MENU_FILE at the compiled file to
+# serve from it. Workers map the file read-only, so every process shares the
+# same page-cache copy, and a restaurant's items are only decoded into a dict
+# when a request asks for them.
+#
+# Layout (native byte order, recorded in the header; sections 4-byte aligned):
+#   header       magic, format version, byte order, counts, section offsets
+#   name_offsets u32[n_names + 1] offsets into name_blob
+#   name_blob    UTF-8 of every distinct restaurant and item name, interned
+#   restaurants  u32[n_restaurants] name id of each restaurant, in file order
+#   first_item   u32[n_restaurants + 1] index of each restaurant's first item
+#   by_name      u32[n_restaurants] restaurant numbers sorted by name
+#   item_names   u32[n_items] name id of each item
+#   item_prices  i32[n_items] price of each item
+import argparse
+import logging
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+from collections.abc import ItemsView, Mapping, ValuesView
+
+from cache import LRUCache
+from catalog import load_menu_from_file
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b"FBMENU\x00\x01"
+FORMAT_VERSION = 1
+SECTIONS = ("name_offsets", "name_blob", "restaurants", "first_item",
+            "by_name", "item_names", "item_prices")
+# magic, format version, byte order, n_names, n_restaurants, n_items, then
+# (offset, length) in bytes of every section
+HEADER = struct.Struct("<8sIIIII" + "QQ" * len(SECTIONS))
+BYTE_ORDERS = {"little": 1, "big": 2}
+
+
+def compile_menus(menus, path):
+    """Write menus ({restaurant: {item: price}}) to path in the binary format.
+
+    The file is written next to path and renamed over it, so a server that
+    has the old file mapped keeps a consistent view until it reloads.
+    """
+    name_ids = {}
+
+    def intern(name):
+        return name_ids.setdefault(name, len(name_ids))
+
+    restaurants = array("I")
+    first_item = array("I", [0])
+    item_names = array("I")
+    item_prices = array("i")
+    for restaurant, items in menus.items():
+        restaurants.append(intern(restaurant))
+        for item, price in items.items():
+            item_names.append(intern(item))
+            item_prices.append(price)
+        first_item.append(len(item_names))
+
+    names = list(name_ids)
+    by_name = array("I", sorted(range(len(restaurants)), key=lambda i: names[restaurants[i]]))
+
+    name_offsets = array("I", [0])
+    name_blob = bytearray()
+    for name in names:
+        name_blob += name.encode("utf-8")
+        name_offsets.append(len(name_blob))
+
+    sections = [name_offsets.tobytes(), bytes(name_blob), restaurants.tobytes(),
+                first_item.tobytes(), by_name.tobytes(), item_names.tobytes(),
+                item_prices.tobytes()]
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".menus-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            layout = []
+            offset = HEADER.size
+            for data in sections:
+                offset += -offset % 4
+                layout.extend((offset, len(data)))
+                offset += len(data)
+            f.write(HEADER.pack(MAGIC, FORMAT_VERSION, BYTE_ORDERS[sys.byteorder],
+                                len(names), len(restaurants), len(item_names), *layout))
+            for (start, _), data in zip(zip(layout[::2], layout[1::2]), sections):
+                f.write(b"\x00" * (start - f.tell()))
+                f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class MappedItems(ItemsView):
+    """items() of MappedMenus, decoded in file order without going through the cache"""
+
+    def __iter__(self):
+        for number in range(len(self._mapping)):
+            yield self._mapping.restaurant(number), self._mapping._decode(number)
+
+
+class MappedValues(ValuesView):
+    """values() of MappedMenus, decoded in file order without going through the cache"""
+
+    def __iter__(self):
+        for number in range(len(self._mapping)):
+            yield self._mapping._decode(number)
+
+
+class MappedMenus(Mapping):
+    """Read-only {restaurant: {item: price}} view of a compiled menu file.
+
+    Restaurants are found by binary search over the name-sorted index, and
+    their items are decoded on first access into a bounded per-process cache.
+    items() and values() walk the whole catalog (building a snapshot does),
+    so they decode each restaurant afresh instead of cycling it through the
+    cache and evicting the menus requests are actually using.
+    """
+
+    def __init__(self, path, cache_size=1024):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        view = memoryview(self._mmap)
+        if len(view) < HEADER.size:
+            raise ValueError(f"{path} is not a compiled menu file")
+        magic, version, byte_order, n_names, n_restaurants, n_items, *layout = \
+            HEADER.unpack_from(view)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            raise ValueError(f"{path} is not a version {FORMAT_VERSION} compiled menu file")
+        if byte_order != BYTE_ORDERS[sys.byteorder]:
+            raise ValueError(f"{path} was compiled on a machine with another byte order; recompile it")
+
+        sections = {}
+        for name, start, length in zip(SECTIONS, layout[::2], layout[1::2]):
+            sections[name] = view[start:start + length]
+        self._name_offsets = sections["name_offsets"].cast("I")
+        self._name_blob = sections["name_blob"]
+        self._restaurants = sections["restaurants"].cast("I")
+        self._first_item = sections["first_item"].cast("I")
+        self._by_name = sections["by_name"].cast("I")
+        self._item_names = sections["item_names"].cast("I")
+        self._item_prices = sections["item_prices"].cast("i")
+        self._decoded = LRUCache(max_size=cache_size)
+        self._names = [None] * n_names
+        self.path = path
+        self.n_names = n_names
+        self.n_items = n_items
+
+    def name(self, name_id):
+        """Decode one entry of the name table"""
+        name = self._names[name_id]
+        if name is None:
+            start = self._name_offsets[name_id]
+            name = str(self._name_blob[start:self._name_offsets[name_id + 1]], "utf-8")
+            # Names are interned, so each distinct name is decoded once per process
+            self._names[name_id] = name
+        return name
+
+    def restaurant(self, number):
+        """Name of the restaurant at a position in file order"""
+        return self.name(self._restaurants[number])
+
+    def _find(self, restaurant):
+        """Restaurant number for a name, or None"""
+        lo, hi = 0, len(self._by_name)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            number = self._by_name[mid]
+            name = self.restaurant(number)
+            if name == restaurant:
+                return number
+            if name < restaurant:
+                lo = mid + 1
+            else:
+                hi = mid
+        return None
+
+    def _decode(self, number):
+        start, end = self._first_item[number], self._first_item[number + 1]
+        return {self.name(self._item_names[i]): self._item_prices[i] for i in range(start, end)}
+
+    def __getitem__(self, restaurant):
+        number = self._find(restaurant) if isinstance(restaurant, str) else None
+        if number is None:
+            raise KeyError(restaurant)
+        items = self._decoded.get(number)
+        if items is None:
+            items = self._decode(number)
+            self._decoded.set(number, items)
+        return items
+
+    def __contains__(self, restaurant):
+        return isinstance(restaurant, str) and self._find(restaurant) is not None
+
+    def __iter__(self):
+        for number in range(len(self._restaurants)):
+            yield self.restaurant(number)
+
+    def __len__(self):
+        return len(self._restaurants)
+
+    def items(self):
+        return MappedItems(self)
+
+    def values(self):
+        return MappedValues(self)
+
+
+def is_compiled(path):
+    """Whether path starts with the compiled menu magic"""
+    try:
+        with open(path, "rb") as f:
+            return f.read(len(MAGIC)) == MAGIC
+    except OSError:
+        return False
+
+
+def load_menus(path):
+    """Load a compiled menu file, or fall back to the menus.txt text format"""
+    if not is_compiled(path):
+        return load_menu_from_file(path)
+    try:
+        menus = MappedMenus(path)
+    except (OSError, ValueError) as e:
+        logger.error(f"Error loading compiled menu: {str(e)}")
+        return None
+    logger.info(f"Mapped {len(menus)} restaurants and {menus.n_items} items from {path}")
+    return menus
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile menus.txt into the binary menu format")
+    parser.add_argument("input", help="menu file in the menus.txt text format")
+    parser.add_argument("-o", "--output", default="menus.bin")
+    args = parser.parse_args()
+
+    menus = load_menu_from_file(args.input)
+    if not menus:
+        sys.exit(f"No menus could be loaded from {args.input}")
+    compile_menus(menus, args.output)
+    print(f"Compiled {len(menus)} restaurants to {args.output} "
+          f"({os.path.getsize(args.output)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
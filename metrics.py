@@ -0,0 +1,215 @@
+# metrics.py - Low-overhead latency histograms and counters, exported as Prometheus text
+#
+# Metrics live in the process that records them. Under gunicorn each worker
+# serves its own numbers on /metrics; under asgi.py the NLP pool workers send
+# their updates back with every turn (see drain/merge) so the front process
+# reports them all.
+import bisect
+import os
+import threading
+import time
+
+METRICS_ENABLED = os.environ.get("METRICS_ENABLED", "true").lower() == "true"
+
+# Seconds; spans cached lookups (sub-millisecond) to cold spaCy parses
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def format_labels(names, values):
+    if not names:
+        return ""
+    pairs = ",".join(f'{name}="{value}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+class Counter:
+    """Monotonic counter with optional labels"""
+
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        if not METRICS_ENABLED:
+            return
+        with self._lock:
+            self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self.values)
+        for label_values, value in sorted(values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+    def drain(self):
+        with self._lock:
+            values, self.values = self.values, {}
+        return values
+
+    def merge(self, values):
+        with self._lock:
+            for label_values, value in values.items():
+                self.values[label_values] = self.values.get(label_values, 0) + value
+
+
+class _Timer:
+    __slots__ = ("histogram", "label_values", "start")
+
+    def __init__(self, histogram, label_values):
+        self.histogram = histogram
+        self.label_values = label_values
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.histogram.observe(time.perf_counter() - self.start, *self.label_values)
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and a few list updates"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # label values -> [per-bucket counts (last one is +Inf), sum]
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        if not METRICS_ENABLED:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(label_values)
+            if series is None:
+                series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    def time(self, *label_values):
+        """Context manager that observes the duration of its block"""
+        return _Timer(self, label_values)
+
+    def samples(self):
+        with self._lock:
+            series = {labels: (list(counts), total) for labels, (counts, total) in self.series.items()}
+        for label_values, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ("le",), label_values + (bound,))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+    def drain(self):
+        with self._lock:
+            series, self.series = self.series, {}
+        return series
+
+    def merge(self, series):
+        with self._lock:
+            for label_values, (counts, total) in series.items():
+                mine = self.series.get(label_values)
+                if mine is None:
+                    self.series[label_values] = [list(counts), total]
+                else:
+                    mine[0] = [a + b for a, b in zip(mine[0], counts)]
+                    mine[1] += total
+
+
+class Gauge:
+    """Value read from a callback at scrape time"""
+
+    kind = "gauge"
+
+    def __init__(self, name, help, func):
+        self.name = name
+        self.help = help
+        self.func = func
+
+    def samples(self):
+        yield f"{self.name} {self.func()}"
+
+    def drain(self):
+        return None
+
+    def merge(self, values):
+        pass
+
+
+class Registry:
+    """The set of metrics rendered by /metrics"""
+
+    def __init__(self):
+        self.metrics = {}
+
+    def register(self, metric):
+        self.metrics[metric.name] = metric
+        return metric
+
+    def render(self):
+        """Prometheus text exposition format"""
+        lines = []
+        for metric in self.metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+    def drain(self):
+        """Take and reset this process's counts, e.g. to ship them to another process"""
+        return {name: metric.drain() for name, metric in self.metrics.items()
+                if metric.kind != "gauge"}
+
+    def merge(self, drained):
+        """Add counts taken with drain() in another process"""
+        for name, values in (drained or {}).items():
+            if name in self.metrics and values:
+                self.metrics[name].merge(values)
+
+
+REGISTRY = Registry()
+
+
+def counter(name, help, labels=()):
+    return REGISTRY.register(Counter(name, help, labels))
+
+
+def histogram(name, help, labels=(), buckets=DEFAULT_BUCKETS):
+    return REGISTRY.register(Histogram(name, help, labels, buckets))
+
+
+def gauge(name, help, func):
+    return REGISTRY.register(Gauge(name, help, func))
+
+
+def render():
+    return REGISTRY.render()
+
+
+def drain():
+    return REGISTRY.drain()
+
+
+def merge(drained):
+    REGISTRY.merge(drained)
+
+
+# Pipeline metrics shared by app.py and matcher.py
+STAGE_SECONDS = histogram("foodbot_stage_seconds", "Time spent in each NLP pipeline stage", ["stage"])
+TURN_SECONDS = histogram("foodbot_turn_seconds", "Conversation turn latency by state-machine branch", ["state"])
+MATCH_STAGE_TOTAL = counter("foodbot_match_stage_total",
+                            "Menu matches by the matcher stage that resolved them", ["stage"])
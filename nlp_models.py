@@ -0,0 +1,135 @@
+# nlp_models.py - Startup checks and (optionally lazy) loading of the NLP models
+import os
+import threading
+import logging
+import multiprocessing
+
+import nltk
+
+logger = logging.getLogger(__name__)
+
+try:
+    import spacy
+    spacy_available = True
+except ImportError:
+    spacy = None
+    spacy_available = False
+    print("spaCy not available. Using NLTK for NLP processing.")
+
+# spaCy components we never use are excluded at load time; NER and the
+# sentence recognizer are not needed for lemmas, POS tags or noun chunks
+SPACY_MODEL = os.environ.get("SPACY_MODEL", "en_core_web_sm")
+SPACY_EXCLUDE = ["ner", "senter"]
+
+# NLTK data every deployment needs, and what the no-spaCy fallback adds
+NLTK_REQUIRED = {"stopwords": "corpora/stopwords"}
+NLTK_FALLBACK = {"wordnet": "corpora/wordnet", "punkt_tab": "tokenizers/punkt_tab"}
+
+_lock = threading.Lock()
+_nlp = None
+_lemmatizer = None
+_stop_words = None
+
+
+class MissingModelError(RuntimeError):
+    """Raised at startup when a required model or corpus is not installed"""
+
+
+def missing_models():
+    """List the models and corpora that are not installed, without touching the network"""
+    missing = []
+    if spacy_available:
+        if not (spacy.util.is_package(SPACY_MODEL) or os.path.isdir(SPACY_MODEL)):
+            missing.append(("spacy", SPACY_MODEL))
+        resources = NLTK_REQUIRED
+    else:
+        resources = dict(NLTK_REQUIRED, **NLTK_FALLBACK)
+
+    for name, path in resources.items():
+        try:
+            nltk.data.find(path)
+        except LookupError:
+            missing.append(("nltk", name))
+    return missing
+
+
+def check_models():
+    """Fail fast with install instructions if anything is missing"""
+    missing = missing_models()
+    if not missing:
+        return
+    commands = []
+    for kind, name in missing:
+        if kind == "spacy":
+            commands.append(f"python -m spacy download {name}")
+        else:
+            commands.append(f"python -m nltk.downloader {name}")
+    raise MissingModelError(
+        "Missing NLP models: " + ", ".join(name for _, name in missing) +
+        ". Install them before starting the server:\n  " + "\n  ".join(commands))
+
+
+def get_nlp():
+    """The shared spaCy pipeline, loaded on first use"""
+    global _nlp
+    if _nlp is None and spacy_available:
+        with _lock:
+            if _nlp is None:
+                _nlp = spacy.load(SPACY_MODEL, exclude=SPACY_EXCLUDE)
+                logger.info(f"Loaded spaCy model {SPACY_MODEL} with pipes {_nlp.pipe_names}")
+    return _nlp
+
+
+def get_lemmatizer():
+    """WordNet lemmatizer for the no-spaCy fallback, loaded on first use"""
+    global _lemmatizer
+    if _lemmatizer is None:
+        with _lock:
+            if _lemmatizer is None:
+                from nltk.stem import WordNetLemmatizer
+                lemmatizer = WordNetLemmatizer()
+                # WordNet is itself a lazy corpus; touch it so it is read now
+                lemmatizer.lemmatize("warmup")
+                _lemmatizer = lemmatizer
+    return _lemmatizer
+
+
+def get_stop_words():
+    """English stopword set, loaded on first use"""
+    global _stop_words
+    if _stop_words is None:
+        with _lock:
+            if _stop_words is None:
+                from nltk.corpus import stopwords
+                _stop_words = frozenset(stopwords.words('english'))
+    return _stop_words
+
+
+def load_models():
+    """Verify and eagerly load every model this deployment uses.
+
+    Called at import time unless LAZY_MODELS is set, so that under
+    gunicorn --preload everything is loaded once in the master and shared
+    with the forked workers.
+    """
+    check_models()
+    get_stop_words()
+    if spacy_available:
+        get_nlp()
+    else:
+        get_lemmatizer()
+
+
+def worker_context():
+    """multiprocessing context for NLP worker pools.
+
+    Workers are forked from a forkserver that has already imported app.py,
+    so the models load once instead of once per worker, and no worker is
+    forked from a threaded web-server process.
+    """
+    try:
+        context = multiprocessing.get_context("forkserver")
+        context.set_forkserver_preload(["app"])
+    except ValueError:
+        context = multiprocessing.get_context("spawn")
+    return context
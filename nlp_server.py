@@ -0,0 +1,218 @@
+# nlp_server.py - Shared NLP sidecar for the web workers, reached over a Unix socket
+#
+# Usage: python nlp_server.py [--socket /tmp/foodbot-nlp.sock] [--processes 1]
+#
+# Loads the NLP models once and answers TextBlob correct_spelling,
+# extract_food_entities and get_food_type requests from every web worker.
+# Start the web server with NLP_SOCKET pointing at the same path and its
+# workers become thin clients that never load spaCy, WordNet or TextBlob.
+#
+# Requests that arrive within NLP_BATCH_WINDOW seconds of each other, from
+# any number of connections, are run together, so spaCy parses them in one
+# nlp.pipe call. With --processes N the listening socket is shared by N
+# forked processes that inherit the loaded models copy-on-write.
+#
+# Wire format, both ways: a 4-byte big-endian length, then a JSON object.
+# Request {"op": ..., "texts": [...]}; response {"results": [...]} or {"error": ...}.
+import argparse
+import asyncio
+import json
+import logging
+import os
+import socket
+import struct
+import threading
+
+logger = logging.getLogger(__name__)
+
+NLP_SOCKET = os.environ.get("NLP_SOCKET", "/tmp/foodbot-nlp.sock")
+NLP_BATCH_WINDOW = float(os.environ.get("NLP_BATCH_WINDOW", 0.002))
+NLP_MAX_BATCH = int(os.environ.get("NLP_MAX_BATCH", 256))
+NLP_TIMEOUT = float(os.environ.get("NLP_TIMEOUT", 10))
+
+HEADER = struct.Struct(">I")
+OPS = ("correct_spelling", "extract_food_entities", "get_food_type")
+
+
+class NLPServerError(RuntimeError):
+    """Raised by NLPClient when the sidecar reports an error or cannot be reached"""
+
+
+def recv_exactly(sock, size):
+    chunks = []
+    while size:
+        chunk = sock.recv(size)
+        if not chunk:
+            raise ConnectionError("NLP sidecar closed the connection")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class NLPClient:
+    """Blocking client used by app.py; one connection per thread, reopened after a fork"""
+
+    def __init__(self, path, timeout=NLP_TIMEOUT):
+        self.path = path
+        self.timeout = timeout
+        self._local = threading.local()
+
+    def _connection(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is None or self._local.pid != os.getpid():
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.path)
+            self._local.sock, self._local.pid = sock, os.getpid()
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, 'sock', None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def call(self, op, texts):
+        """Run op on every text in the sidecar; returns one result per text"""
+        body = json.dumps({'op': op, 'texts': list(texts)}).encode('utf-8')
+        try:
+            sock = self._connection()
+            sock.sendall(HEADER.pack(len(body)) + body)
+            size, = HEADER.unpack(recv_exactly(sock, HEADER.size))
+            reply = json.loads(recv_exactly(sock, size))
+        except (OSError, ValueError) as e:
+            # The stream may be out of step now; start over on the next call
+            self._close()
+            raise NLPServerError(f"NLP sidecar at {self.path} failed: {e}") from e
+        if 'error' in reply:
+            raise NLPServerError(reply['error'])
+        return reply['results']
+
+
+def run_batch(food_app, op, texts):
+    """Results for one op over many texts, parsing them together where the op uses spaCy"""
+    if op == "extract_food_entities":
+        return [list(result) for result in food_app.extract_food_entities_batch(texts)]
+    if op == "get_food_type":
+        if food_app.spacy_available:
+            docs = food_app.parse_texts([text.lower() for text in texts], with_parser=False)
+            return [food_app.get_food_type(text, doc) for text, doc in zip(texts, docs)]
+        return [food_app.get_food_type(text) for text in texts]
+    # Only TextBlob correction is sent here; the menu corrector is cheap and stays in the workers
+    return [food_app.correct_spelling_textblob(text) for text in texts]
+
+
+class Batcher:
+    """Collects requests for up to NLP_BATCH_WINDOW seconds and runs each op once per batch"""
+
+    def __init__(self, food_app, window=NLP_BATCH_WINDOW, max_batch=NLP_MAX_BATCH):
+        self.food_app = food_app
+        self.window = window
+        self.max_batch = max_batch
+        self.queue = asyncio.Queue()
+        self.batches = 0
+        self.texts = 0
+
+    async def submit(self, op, texts):
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((op, texts, future))
+        return await future
+
+    async def run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            pending = [await self.queue.get()]
+            size = len(pending[0][1])
+            deadline = loop.time() + self.window
+            while size < self.max_batch:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    request = await asyncio.wait_for(self.queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                pending.append(request)
+                size += len(request[1])
+
+            by_op = {}
+            for request in pending:
+                by_op.setdefault(request[0], []).append(request)
+            for op, requests in by_op.items():
+                texts = [text for _, request_texts, _ in requests for text in request_texts]
+                try:
+                    # Off the event loop, so new requests keep queueing while the models run
+                    results = await loop.run_in_executor(None, run_batch, self.food_app, op, texts)
+                except Exception as e:
+                    logger.error(f"NLP batch {op} failed: {str(e)}")
+                    for _, _, future in requests:
+                        future.set_exception(e)
+                    continue
+                self.batches += 1
+                self.texts += len(texts)
+                start = 0
+                for _, request_texts, future in requests:
+                    future.set_result(results[start:start + len(request_texts)])
+                    start += len(request_texts)
+
+
+async def handle_connection(batcher, reader, writer):
+    try:
+        while True:
+            try:
+                size, = HEADER.unpack(await reader.readexactly(HEADER.size))
+                request = json.loads(await reader.readexactly(size))
+            except asyncio.IncompleteReadError:
+                return
+            if request.get('op') not in OPS or not isinstance(request.get('texts'), list):
+                reply = {'error': f"bad request, expected op in {OPS} and a list of texts"}
+            else:
+                try:
+                    reply = {'results': await batcher.submit(request['op'], request['texts'])}
+                except Exception as e:
+                    reply = {'error': str(e)}
+            body = json.dumps(reply).encode('utf-8')
+            writer.write(HEADER.pack(len(body)) + body)
+            await writer.drain()
+    finally:
+        writer.close()
+
+
+async def serve(sock, food_app):
+    batcher = Batcher(food_app)
+    server = await asyncio.start_unix_server(
+        lambda reader, writer: handle_connection(batcher, reader, writer), sock=sock)
+    logger.info(f"NLP sidecar {os.getpid()} serving on {sock.getsockname()}")
+    async with server:
+        await asyncio.gather(server.serve_forever(), batcher.run())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Shared NLP sidecar for the web workers")
+    parser.add_argument("--socket", default=NLP_SOCKET)
+    parser.add_argument("--processes", type=int, default=1)
+    args = parser.parse_args()
+
+    # This process does the NLP itself: never become a client of another sidecar,
+    # and load every model before forking so the processes share them
+    os.environ.pop("NLP_SOCKET", None)
+    os.environ["LAZY_MODELS"] = "false"
+    import app as food_app
+
+    if os.path.exists(args.socket):
+        os.unlink(args.socket)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.bind(args.socket)
+    sock.listen(1024)
+
+    for _ in range(args.processes - 1):
+        if os.fork() == 0:
+            break
+    try:
+        asyncio.run(serve(sock, food_app))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
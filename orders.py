@@ -0,0 +1,163 @@
+# orders.py - Durable, append-only log of placed orders
+import json
+import os
+import queue
+import secrets
+import sqlite3
+import threading
+import time
+
+# Crockford's base32: no I, L, O or U, so IDs are easy to read out over the phone
+ID_ALPHABET = "0123456789ABCDEFGHJKMNPQRSTVWXYZ"
+ID_RANDOM_BITS = 80
+
+_id_lock = threading.Lock()
+_last_id = (0, 0)
+
+
+def new_order_id():
+    """Unique, time-ordered order ID (a ULID: 48-bit millisecond time + 80 random bits).
+
+    IDs sort by creation time as strings. Within one millisecond a process
+    increments the random part instead of drawing a new one, so its IDs
+    stay strictly increasing; across processes the random bits make a
+    collision practically impossible.
+    """
+    global _last_id
+    with _id_lock:
+        millis = time.time_ns() // 1_000_000
+        last_millis, last_random = _last_id
+        if millis <= last_millis:
+            millis, random_part = last_millis, last_random + 1
+            if random_part >> ID_RANDOM_BITS:
+                millis, random_part = last_millis + 1, secrets.randbits(ID_RANDOM_BITS)
+        else:
+            random_part = secrets.randbits(ID_RANDOM_BITS)
+        _last_id = (millis, random_part)
+
+    value = (millis << ID_RANDOM_BITS) | random_part
+    chars = []
+    for _ in range(26):
+        chars.append(ID_ALPHABET[value & 31])
+        value >>= 5
+    return "".join(reversed(chars))
+
+
+class PendingOrder:
+    """An order waiting for the writer thread's next commit"""
+
+    __slots__ = ("row", "done", "error")
+
+    def __init__(self, row):
+        self.row = row
+        self.done = threading.Event()
+        self.error = None
+
+
+class OrderLog:
+    """Placed orders in a SQLite file in WAL mode, written with group commit.
+
+    append() hands the order to a single writer thread and waits until it
+    is durable. The writer takes everything queued up while the previous
+    commit was syncing and writes it in one transaction, so concurrent
+    checkouts share one fsync instead of queueing behind each other's.
+    Rows are only ever inserted.
+    """
+
+    # Upper bound on orders written in one transaction
+    MAX_BATCH = 512
+
+    def __init__(self, path, synchronous="FULL"):
+        if synchronous not in ("OFF", "NORMAL", "FULL", "EXTRA"):
+            raise ValueError(f"Unknown synchronous mode '{synchronous}'")
+        self.path = path
+        self.synchronous = synchronous
+        self._local = threading.local()
+        self._queue = None
+        self._writer = None
+        self._pid = None
+        self._start_lock = threading.Lock()
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS orders ("
+                         "id TEXT PRIMARY KEY, created REAL NOT NULL, restaurant TEXT NOT NULL, "
+                         "total INTEGER NOT NULL, record TEXT NOT NULL)")
+        # Not kept open: gunicorn may fork the workers right after this
+        conn.close()
+        self.commits = 0
+        self.appended = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute(f"PRAGMA synchronous={self.synchronous}")
+        return conn
+
+    def _reader(self):
+        # sqlite3 connections must not be shared across threads
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def _ensure_writer(self):
+        # Started on first use, and again in a forked worker, which does not inherit the thread
+        if self._pid == os.getpid():
+            return
+        with self._start_lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue()
+                self._writer = threading.Thread(target=self._write_loop, args=(self._queue,),
+                                                name="order-log-writer", daemon=True)
+                self._writer.start()
+                self._pid = os.getpid()
+
+    def _write_loop(self, pending):
+        conn = self._connect()
+        while True:
+            batch = [pending.get()]
+            while len(batch) < self.MAX_BATCH:
+                try:
+                    batch.append(pending.get_nowait())
+                except queue.Empty:
+                    break
+            error = None
+            try:
+                with conn:
+                    conn.executemany("INSERT INTO orders (id, created, restaurant, total, record) "
+                                     "VALUES (?, ?, ?, ?, ?)", [order.row for order in batch])
+                self.commits += 1
+                self.appended += len(batch)
+            except sqlite3.Error as e:
+                error = e
+            for order in batch:
+                order.error = error
+                order.done.set()
+
+    def append(self, restaurant, items, total, **details):
+        """Durably record a placed order and return its new ID"""
+        self._ensure_writer()
+        order_id = new_order_id()
+        created = time.time()
+        record = dict(details, id=order_id, created=created, restaurant=restaurant, items=items, total=total)
+        order = PendingOrder((order_id, created, restaurant, total, json.dumps(record, separators=(',', ':'))))
+        self._queue.put(order)
+        order.done.wait()
+        if order.error is not None:
+            raise order.error
+        return order_id
+
+    def get(self, order_id):
+        """The recorded order, or None"""
+        row = self._reader().execute("SELECT record FROM orders WHERE id = ?", (order_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def __len__(self):
+        return self._reader().execute("SELECT COUNT(*) FROM orders").fetchone()[0]
+
+
+def create_order_log(path=None):
+    """The order log at ORDER_DB (default orders.db)"""
+    return OrderLog(path or os.environ.get("ORDER_DB", "orders.db"),
+                    synchronous=os.environ.get("ORDER_DB_SYNCHRONOUS", "FULL").upper())
@@ -0,0 +1,72 @@
+# profiling.py - Sampling profiler for a single request
+#
+# A background thread looks at the profiled thread's stack every few
+# milliseconds via sys._current_frames(), so the request itself runs
+# unmodified (no sys.setprofile hooks) and the overhead is bounded by the
+# sampling interval. Stacks are reported in the collapsed "a;b;c count"
+# format that flamegraph.pl and speedscope read.
+import os
+import sys
+import threading
+from collections import Counter
+
+PROFILE_INTERVAL = float(os.environ.get("PROFILE_INTERVAL", 0.002))
+
+
+def frame_label(frame):
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}"
+
+
+class SamplingProfiler:
+    """Samples the calling thread's stack until stopped; use as a context manager"""
+
+    def __init__(self, interval=PROFILE_INTERVAL, max_depth=64):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks = Counter()
+        self.samples = 0
+        self._target = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        self._target = threading.get_ident()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self._target)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None and len(stack) < self.max_depth:
+                stack.append(frame_label(frame))
+                frame = frame.f_back
+            self.stacks[";".join(reversed(stack))] += 1
+            self.samples += 1
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def collapsed(self, limit=None):
+        """["a;b;c count", ...], most frequent stacks first"""
+        return [f"{stack} {count}" for stack, count in self.stacks.most_common(limit)]
+
+    def report(self, limit=20):
+        return {
+            'interval_ms': self.interval * 1000,
+            'samples': self.samples,
+            'stacks': self.collapsed(limit),
+        }
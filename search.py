@@ -0,0 +1,120 @@
+# search.py - BM25 index of every restaurant's items for the welcome state
+import heapq
+import math
+import re
+
+WORD_PATTERN = re.compile(r"[a-z]+")
+
+# Standard BM25 parameters: term-frequency saturation and length normalization
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+
+def words(text):
+    return WORD_PATTERN.findall(text.lower())
+
+
+class RestaurantSearchIndex:
+    """Inverted index from menu words to the restaurants that serve them.
+
+    Each restaurant is one document made of its name and item names. The
+    BM25 weight of a (word, restaurant) pair does not depend on the query,
+    so it is computed once here and every posting list is kept sorted by
+    it. search() walks the posting lists of the query words in that order
+    and stops as soon as no restaurant it has not seen yet could still make
+    the top results (Fagin's threshold algorithm), so a lookup touches the
+    head of a few posting lists rather than the whole catalog.
+    """
+
+    def __init__(self, menus, synonyms=None, stop_words=()):
+        self.restaurants = []
+        self.synonyms = synonyms or {}
+        self.stop_words = frozenset(stop_words)
+
+        counts = {}
+        lengths = []
+        for doc, (restaurant, items) in enumerate(menus.items()):
+            self.restaurants.append(restaurant)
+            tokens = words(restaurant)
+            for item in items:
+                tokens.extend(words(item))
+            lengths.append(len(tokens))
+            for word in tokens:
+                if word in self.stop_words:
+                    continue
+                postings = counts.setdefault(word, {})
+                postings[doc] = postings.get(doc, 0) + 1
+
+        documents = len(self.restaurants)
+        average_length = sum(lengths) / documents if documents else 0.0
+        # word -> {doc: weight} for random access, and [(weight, doc)] best first
+        self.weights = {}
+        self.postings = {}
+        for word, postings in counts.items():
+            idf = math.log(1 + (documents - len(postings) + 0.5) / (len(postings) + 0.5))
+            weights = {}
+            for doc, tf in postings.items():
+                norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[doc] / average_length)
+                weights[doc] = idf * tf * (BM25_K1 + 1) / (tf + norm)
+            self.weights[word] = weights
+            self.postings[word] = sorted(((weight, doc) for doc, weight in weights.items()),
+                                         key=lambda posting: (-posting[0], posting[1]))
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    def query_words(self, text):
+        """Indexed words of a message, with synonyms and plurals resolved"""
+        found = []
+        for word in words(text):
+            if word in self.stop_words:
+                continue
+            if word in self.weights:
+                candidates = [word]
+            elif word in self.synonyms:
+                candidates = words(self.synonyms[word])
+            elif word.endswith("es") and word[:-2] in self.weights:
+                candidates = [word[:-2]]
+            elif word.endswith("s") and word[:-1] in self.weights:
+                candidates = [word[:-1]]
+            else:
+                continue
+            for candidate in candidates:
+                if candidate in self.weights and candidate not in found:
+                    found.append(candidate)
+        return found
+
+    def search(self, text, limit=10):
+        """Up to limit restaurants ranked by BM25 score for text, best first"""
+        terms = self.query_words(text)
+        if not terms or limit <= 0:
+            return []
+        postings = [self.postings[term] for term in terms]
+        weights = [self.weights[term] for term in terms]
+
+        top = []  # min-heap of (score, -doc)
+        seen = set()
+        depth = 0
+        while True:
+            threshold = 0.0
+            exhausted = True
+            for posting in postings:
+                if depth >= len(posting):
+                    continue
+                exhausted = False
+                weight, doc = posting[depth]
+                threshold += weight
+                if doc in seen:
+                    continue
+                seen.add(doc)
+                entry = (sum(w.get(doc, 0.0) for w in weights), -doc)
+                if len(top) < limit:
+                    heapq.heappush(top, entry)
+                elif entry > top[0]:
+                    heapq.heapreplace(top, entry)
+            depth += 1
+            # Nothing unseen can beat the current top results any more
+            if exhausted or (len(top) == limit and top[0][0] >= threshold):
+                break
+
+        return [self.restaurants[-doc] for score, doc in sorted(top, reverse=True)]
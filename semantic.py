@@ -0,0 +1,166 @@
+# semantic.py - Optional embedding-based matching of paraphrased order items
+#
+# Every menu item is embedded once, as the normalized mean of its word
+# vectors from a spaCy model with static vectors (en_core_web_md by default,
+# or a model directory on disk), into one shared NumPy matrix. A lookup is a
+# single matrix product between the message's phrases and one restaurant's
+# rows. MenuMatchIndex only consults it for words that every cheaper stage
+# missed, so the common case never pays for it.
+import os
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+try:
+    import numpy as np
+    numpy_available = True
+except ImportError:
+    numpy_available = False
+
+SEMANTIC_MATCHING = os.environ.get("SEMANTIC_MATCHING", "false").lower() == "true"
+SEMANTIC_MODEL = os.environ.get("SEMANTIC_MODEL", "en_core_web_md")
+# Cosine similarity a phrase needs with its nearest item to be accepted
+SEMANTIC_THRESHOLD = float(os.environ.get("SEMANTIC_THRESHOLD", 0.7))
+
+# Only the tokenizer and the vectors are used
+SEMANTIC_EXCLUDE = ["tok2vec", "tagger", "parser", "attribute_ruler", "lemmatizer", "ner", "senter"]
+
+_lock = threading.Lock()
+_encoder = None
+_unavailable = False
+
+
+class ItemEncoder:
+    """Embeds item names as unit vectors and keeps every distinct name in one matrix.
+
+    update() embeds only the names it has not seen, so a menu reload costs
+    as many embeddings as there are new items. SemanticIndex objects hold
+    their own reference to the matrix they were built from, which is never
+    modified in place, so older catalog snapshots stay valid.
+    """
+
+    def __init__(self, nlp):
+        self.nlp = nlp
+        self.dim = nlp.vocab.vectors_length
+        self.matrix = np.zeros((0, self.dim), dtype=np.float32)
+        self.rows = {}
+        self._lock = threading.Lock()
+
+    def embed(self, texts):
+        """One unit vector per text; all zeros for a text with no known word"""
+        vectors = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for i, doc in enumerate(self.nlp.tokenizer.pipe(texts)):
+            words = [token.vector for token in doc if token.has_vector and not token.is_stop]
+            if not words:
+                continue
+            vector = np.mean(words, axis=0)
+            norm = np.linalg.norm(vector)
+            if norm:
+                vectors[i] = vector / norm
+        return vectors
+
+    def update(self, items):
+        """Make sure every item has a row; returns (matrix, {item: row}).
+
+        Names that are no longer on any menu are dropped once they make up
+        half the matrix.
+        """
+        items = list(dict.fromkeys(items))
+        with self._lock:
+            matrix, rows = self.matrix, self.rows
+            if len(rows) > 2 * len(items):
+                kept = [item for item in items if item in rows]
+                matrix = matrix[[rows[item] for item in kept]] if kept else matrix[:0]
+                rows = {item: row for row, item in enumerate(kept)}
+
+            new = [item for item in items if item not in rows]
+            if new:
+                matrix = np.vstack([matrix, self.embed(new)])
+                rows = dict(rows)
+                for row, item in enumerate(new, len(rows)):
+                    rows[item] = row
+            self.matrix, self.rows = matrix, rows
+            return matrix, rows
+
+
+class SemanticIndex:
+    """Nearest menu items to a phrase, for one restaurant's menu"""
+
+    def __init__(self, encoder, items, matrix, rows):
+        self.encoder = encoder
+        self.items = list(items)
+        # This menu's item vectors, gathered out of the shared matrix once rather than per query
+        self.vectors = np.ascontiguousarray(matrix[[rows[item] for item in self.items]].T)
+
+    def __len__(self):
+        return len(self.items)
+
+    def scores(self, texts):
+        """Cosine similarity of every text with every item, as a (texts, items) array"""
+        return self.encoder.embed(texts) @ self.vectors
+
+    def top_k(self, text, k=5):
+        """The k most similar items to text as [(item, score)], best first"""
+        if not self.items:
+            return []
+        scores = self.scores([text])[0]
+        best = np.argsort(-scores, kind="stable")[:k]
+        return [(self.items[pos], float(scores[pos])) for pos in best]
+
+    def best_many(self, texts, threshold=SEMANTIC_THRESHOLD):
+        """{text: item} for the texts whose nearest item reaches threshold"""
+        if not texts or not self.items:
+            return {}
+        scores = self.scores(texts)
+        best = scores.argmax(axis=1)
+        return {text: self.items[best[row]] for row, text in enumerate(texts)
+                if scores[row, best[row]] >= threshold}
+
+
+def build_semantic_indexes(encoder, menus):
+    """A SemanticIndex for every restaurant, embedding all new item names in one pass"""
+    matrix, rows = encoder.update(item for items in menus.values() for item in items)
+    return {restaurant: SemanticIndex(encoder, items, matrix, rows)
+            for restaurant, items in menus.items()}
+
+
+def load_vectors():
+    """The spaCy pipeline that provides word vectors, or None if there is none"""
+    if not numpy_available:
+        logger.warning("Semantic matching needs NumPy; it is disabled.")
+        return None
+    import nlp_models
+    if not nlp_models.spacy_available:
+        logger.warning("Semantic matching needs spaCy; it is disabled.")
+        return None
+
+    if SEMANTIC_MODEL == nlp_models.SPACY_MODEL:
+        nlp = nlp_models.get_nlp()
+    else:
+        try:
+            nlp = nlp_models.spacy.load(SEMANTIC_MODEL, exclude=SEMANTIC_EXCLUDE)
+        except (OSError, ImportError) as e:
+            logger.warning(f"Semantic model {SEMANTIC_MODEL} could not be loaded ({e}); "
+                           f"install it with: python -m spacy download {SEMANTIC_MODEL}")
+            return None
+
+    if not nlp.vocab.vectors_length:
+        logger.warning(f"Semantic model {SEMANTIC_MODEL} has no word vectors; semantic matching is disabled.")
+        return None
+    return nlp
+
+
+def get_encoder():
+    """The shared ItemEncoder, or None when semantic matching is off or unavailable"""
+    global _encoder, _unavailable
+    if _encoder is None and SEMANTIC_MATCHING and not _unavailable:
+        with _lock:
+            if _encoder is None and not _unavailable:
+                nlp = load_vectors()
+                if nlp is None:
+                    _unavailable = True
+                else:
+                    _encoder = ItemEncoder(nlp)
+                    logger.info(f"Semantic matching with {SEMANTIC_MODEL} ({_encoder.dim}-d vectors)")
+    return _encoder
@@ -0,0 +1,106 @@
+# sessions.py - Server-side conversation state keyed by session ID
+import json
+import os
+import secrets
+import sqlite3
+import threading
+import time
+
+from cache import LRUCache
+
+
+def new_session_id():
+    """Random, URL-safe session identifier"""
+    return secrets.token_urlsafe(16)
+
+
+class MemorySessionStore:
+    """Per-process LRU of session contexts with TTL eviction.
+
+    Only suitable for a single worker process; use SQLiteSessionStore when
+    several gunicorn workers must see the same sessions.
+    """
+
+    def __init__(self, max_sessions=10000, ttl=1800):
+        self._sessions = LRUCache(max_size=max_sessions, ttl=ttl)
+
+    def get(self, session_id):
+        payload = self._sessions.get(session_id)
+        # Stored serialized so callers can never mutate the saved state in place
+        return json.loads(payload) if payload is not None else None
+
+    def save(self, session_id, context):
+        self._sessions.set(session_id, json.dumps(context, separators=(',', ':')))
+
+    def delete(self, session_id):
+        self._sessions.pop(session_id)
+
+    def __len__(self):
+        return len(self._sessions)
+
+
+class SQLiteSessionStore:
+    """Session contexts in a local SQLite file shared by all worker processes"""
+
+    # Expired rows are purged on every Nth save rather than on every request
+    PURGE_EVERY = 500
+
+    def __init__(self, path, ttl=1800):
+        self.path = path
+        self.ttl = ttl
+        self._local = threading.local()
+        self._saves = 0
+        conn = self._connect()
+        with conn:
+            conn.execute("CREATE TABLE IF NOT EXISTS sessions ("
+                         "id TEXT PRIMARY KEY, context TEXT NOT NULL, expires REAL NOT NULL)")
+            conn.execute("CREATE INDEX IF NOT EXISTS sessions_expires ON sessions (expires)")
+        # Not kept open: gunicorn may fork the workers right after this
+        conn.close()
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=5)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self):
+        # sqlite3 connections must not be shared across threads or processes
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or getattr(self._local, 'pid', None) != os.getpid():
+            conn = self._local.conn = self._connect()
+            self._local.pid = os.getpid()
+        return conn
+
+    def get(self, session_id):
+        row = self._connection().execute(
+            "SELECT context FROM sessions WHERE id = ? AND expires >= ?",
+            (session_id, time.time())).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save(self, session_id, context):
+        payload = json.dumps(context, separators=(',', ':'))
+        with self._connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (id, context, expires) VALUES (?, ?, ?)",
+                         (session_id, payload, time.time() + self.ttl))
+            self._saves += 1
+            if self._saves % self.PURGE_EVERY == 0:
+                conn.execute("DELETE FROM sessions WHERE expires < ?", (time.time(),))
+
+    def delete(self, session_id):
+        with self._connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+
+def create_session_store(kind=None):
+    """Build the session store selected by SESSION_STORE (sqlite or memory)"""
+    kind = (kind or os.environ.get("SESSION_STORE", "sqlite")).lower()
+    ttl = int(os.environ.get("SESSION_TTL", 1800))
+    if kind == "memory":
+        return MemorySessionStore(max_sessions=int(os.environ.get("SESSION_MAX", 10000)), ttl=ttl)
+    if kind == "sqlite":
+        return SQLiteSessionStore(os.environ.get("SESSION_DB", "sessions.db"), ttl=ttl)
+    raise ValueError(f"Unknown SESSION_STORE '{kind}', expected 'sqlite' or 'memory'")
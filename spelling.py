@@ -0,0 +1,194 @@
+# spelling.py - Menu-vocabulary spelling correction for order messages
+import os
+import re
+from functools import lru_cache
+
+try:
+    import textblob
+    textblob_available = True
+except ImportError:
+    textblob_available = False
+
+WORD_PATTERN = re.compile(r"[A-Za-z]+")
+
+# Number words users type in place of digits, plus the usual filler quantities
+QUANTITY_WORDS = (
+    "one", "two", "three", "four", "five", "six", "seven", "eight", "nine", "ten",
+    "eleven", "twelve", "thirteen", "fourteen", "fifteen", "sixteen", "seventeen",
+    "eighteen", "nineteen", "twenty", "dozen", "couple", "half"
+)
+
+# Ordinary English words are never corrected: "give" is not a misspelling of
+# "five", nor "cake" of "coke". Words seen only once in TextBlob's frequency
+# list are mostly rare forms that double as common typos ("nan", "tow").
+DICTIONARY_MIN_COUNT = 2
+
+
+@lru_cache(maxsize=4)
+def english_words(min_count=DICTIONARY_MIN_COUNT):
+    """Common English words from TextBlob's spelling model (empty without TextBlob)"""
+    if not textblob_available:
+        return frozenset()
+    path = os.path.join(os.path.dirname(textblob.__file__), "en", "en-spelling.txt")
+    words = set()
+    try:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 2 and not line.startswith(";") and int(parts[1]) >= min_count:
+                    words.add(parts[0].lower())
+    except (OSError, ValueError):
+        return frozenset()
+    return frozenset(words)
+
+
+def edit_distance(a, b, max_distance):
+    """Damerau-Levenshtein (optimal string alignment) distance, capped at max_distance + 1"""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                value = min(value, previous_previous[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        # Every later row can only grow, so stop once the whole row is too far
+        if row_min > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class MenuSpellCorrector:
+    """SymSpell-style corrector that only knows the words of the loaded menus.
+
+    Every vocabulary word is indexed under all of its deletes up to
+    ``max_distance``, so a lookup only has to generate the deletes of the
+    misspelled word and verify the few words that share one of them.
+    """
+
+    def __init__(self, words, protected=(), max_distance=2, cache_size=4096, quantity_words=()):
+        self.max_distance = max_distance
+        self.protected = frozenset(protected)
+        # Only ever reached by a single edit, since a wrong one changes how many items are ordered
+        self.quantity_words = frozenset(quantity_words)
+        self.frequencies = {}
+        self.deletes = {}
+
+        for word in words:
+            word = word.lower()
+            if not word.isalpha():
+                continue
+            self.frequencies[word] = self.frequencies.get(word, 0) + 1
+
+        for word in self.frequencies:
+            for variant in self._deletes(word, max_distance):
+                self.deletes.setdefault(variant, []).append(word)
+
+        self.correct_word = lru_cache(maxsize=cache_size)(self._correct_word)
+
+    @staticmethod
+    def _deletes(word, distance):
+        """All strings reachable from word by removing up to distance characters"""
+        results = {word}
+        frontier = {word}
+        for _ in range(distance):
+            next_frontier = set()
+            for candidate in frontier:
+                if len(candidate) <= 1:
+                    continue
+                for i in range(len(candidate)):
+                    next_frontier.add(candidate[:i] + candidate[i + 1:])
+            results |= next_frontier
+            frontier = next_frontier
+        return results
+
+    @staticmethod
+    def short_word_typo(word, candidate):
+        """A missing letter or two swapped neighbours; a changed letter is often another word ("tea"/"ten")"""
+        if len(candidate) == len(word) + 1:
+            return True
+        return len(candidate) == len(word) and sorted(candidate) == sorted(word)
+
+    def allowed_distance(self, word):
+        """Short words tolerate fewer edits so that e.g. 'and' never becomes 'naan'"""
+        if len(word) < 3:
+            return 0
+        if len(word) <= 4:
+            return min(1, self.max_distance)
+        return self.max_distance
+
+    def lookup(self, word):
+        """Return (suggestion, distance) for a lowercase word, or (None, None)"""
+        if word in self.frequencies:
+            return word, 0
+
+        max_distance = self.allowed_distance(word)
+        if max_distance == 0:
+            return None, None
+
+        best = None
+        best_key = None
+        seen = set()
+        for variant in self._deletes(word, max_distance):
+            for candidate in self.deletes.get(variant, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = edit_distance(word, candidate, max_distance)
+                if distance > max_distance:
+                    continue
+                if distance > 1 and candidate in self.quantity_words:
+                    continue
+                if len(word) <= 4 and not self.short_word_typo(word, candidate):
+                    continue
+                # Closest first, then the most common word, then alphabetical for stability
+                key = (distance, -self.frequencies[candidate], candidate)
+                if best_key is None or key < best_key:
+                    best_key = key
+                    best = candidate
+
+        if best is None:
+            return None, None
+        return best, best_key[0]
+
+    def _correct_word(self, word):
+        lowered = word.lower()
+        if lowered in self.protected or lowered in self.frequencies:
+            return word
+        suggestion, _ = self.lookup(lowered)
+        return suggestion or word
+
+    def correct(self, text):
+        """Correct every alphabetic word of text against the menu vocabulary"""
+        return WORD_PATTERN.sub(lambda m: self.correct_word(m.group(0)), text)
+
+
+def menu_vocabulary(menus, synonyms=None):
+    """Collect the words of restaurant names, menu items, synonyms and quantities"""
+    words = list(QUANTITY_WORDS)
+    for restaurant, items in (menus or {}).items():
+        words.extend(WORD_PATTERN.findall(restaurant.lower()))
+        for item in items:
+            words.extend(WORD_PATTERN.findall(item.lower()))
+    for key, value in (synonyms or {}).items():
+        words.extend(WORD_PATTERN.findall(key.lower()))
+        words.extend(WORD_PATTERN.findall(value.lower()))
+    return words
+
+
+def build_menu_corrector(menus, synonyms=None, protected=(), max_distance=2):
+    """Build a MenuSpellCorrector for the loaded menus; protected and English words are kept as typed"""
+    return MenuSpellCorrector(menu_vocabulary(menus, synonyms),
+                              protected=english_words() | frozenset(protected),
+                              max_distance=max_distance, quantity_words=QUANTITY_WORDS)
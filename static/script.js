@@ -1,5 +1,6 @@
 // Initialize global variables
-let context = {}; // Stores the conversation context
+let sessionId = null; // Server-side session holding the conversation context
+let context = {}; // Latest conversation state reported by the server
 const userInput = document.getElementById('user-input');
 const sendButton = document.getElementById('send-btn');
 const chatMessages = document.getElementById('chat-messages');
@@ -221,35 +222,132 @@ function updateOrderSummaryDisplay(orderSummary) {
 }
 
 // Function to send API requests to the backend
+// The streaming endpoint answers with one JSON event per line: an 'ack' as
+// soon as the message is received, an 'item' for every order line as it is
+// matched, and a 'final' event carrying the usual response.
 function sendApiRequest(message) {
-    return fetch('/api/process', {
+    return fetch('/api/process/stream', {
         method: 'POST',
         headers: {
             'Content-Type': 'application/json',
         },
         body: JSON.stringify({
             message: message,
-            context: context
+            session_id: sessionId,
+            by_ref: true // menus and the restaurant list come from menu_ref / options_ref
         }),
     })
-    .then(response => response.json())
-    .then(data => {
-        handleResponse(data);
-    })
+    .then(response => readEvents(response, handleEvent))
     .catch(error => {
         console.error('Error:', error);
         removeTypingIndicator();
+        removePendingItems();
         addMessageToChat("Sorry, there was an error processing your request. Please try again.", 'bot');
     });
 }
 
+// Call onEvent for every newline-delimited JSON event in a response body
+async function readEvents(response, onEvent) {
+    if (!response.body || !window.TextDecoder) {
+        (await response.text()).split('\n').filter(line => line.trim()).forEach(line => onEvent(JSON.parse(line)));
+        return;
+    }
+    
+    const reader = response.body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = '';
+    while (true) {
+        const { done, value } = await reader.read();
+        buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+        
+        let newline;
+        while ((newline = buffer.indexOf('\n')) >= 0) {
+            const line = buffer.slice(0, newline).trim();
+            buffer = buffer.slice(newline + 1);
+            if (line) onEvent(JSON.parse(line));
+        }
+        if (done) break;
+    }
+    if (buffer.trim()) onEvent(JSON.parse(buffer));
+}
+
+// Dispatch one streamed event
+function handleEvent(event) {
+    if (event.event === 'ack') {
+        sessionId = event.session_id || sessionId;
+    } else if (event.event === 'item') {
+        addPendingItem(event);
+    } else {
+        removePendingItems();
+        handleResponse(event);
+    }
+}
+
+// Show a matched item under the typing indicator until the full reply arrives
+function addPendingItem(item) {
+    let pendingDiv = document.getElementById('pending-items');
+    if (!pendingDiv) {
+        pendingDiv = document.createElement('div');
+        pendingDiv.className = 'message bot';
+        pendingDiv.id = 'pending-items';
+        
+        const contentDiv = document.createElement('div');
+        contentDiv.className = 'message-content';
+        pendingDiv.appendChild(contentDiv);
+        
+        const typingIndicator = document.getElementById('typing-indicator');
+        chatMessages.insertBefore(pendingDiv, typingIndicator);
+    }
+    
+    const itemDiv = document.createElement('div');
+    itemDiv.textContent = `Adding ${item.quantity} x ${item.item.charAt(0).toUpperCase() + item.item.slice(1)}...`;
+    pendingDiv.firstChild.appendChild(itemDiv);
+    
+    // Scroll to the bottom
+    chatMessages.scrollTop = chatMessages.scrollHeight;
+}
+
+// Remove the provisional item list
+function removePendingItems() {
+    const pendingDiv = document.getElementById('pending-items');
+    if (pendingDiv) {
+        pendingDiv.remove();
+    }
+}
+
 // Function to handle API responses
 function handleResponse(data) {
-    // Update context with the new state
+    // Remember the session and the new state
+    sessionId = data.session_id || sessionId;
     context = data.context;
     
-    // Add bot message to chat
-    addMessageToChat(data.message, 'bot', data.options, data.menu, data.order_summary);
+    // Add bot message to chat once any referenced menu or restaurant list is loaded
+    Promise.all([resolveRef(data.options_ref, data.options), resolveRef(data.menu_ref, data.menu)])
+        .then(([options, menu]) => addMessageToChat(data.message, 'bot', options, menu, data.order_summary));
+}
+
+// Payloads fetched by reference, keyed by their versioned URL
+const payloadCache = new Map();
+
+// The payload a ref points at, fetched at most once per version; falls back to the inline value
+function resolveRef(ref, inline) {
+    if (!ref) return Promise.resolve(inline);
+    if (!payloadCache.has(ref.url)) {
+        const request = fetch(ref.url)
+            .then(response => {
+                if (!response.ok) throw new Error(`HTTP ${response.status}`);
+                return response.json();
+            })
+            .catch(error => {
+                payloadCache.delete(ref.url);
+                throw error;
+            });
+        payloadCache.set(ref.url, request);
+    }
+    return payloadCache.get(ref.url).catch(error => {
+        console.error('Error:', error);
+        return inline;
+    });
 }
 
 // Setup Speech Recognition for voice input
@@ -309,99 +407,6 @@ function setupSpeechRecognition() {
     }
 }
 
-// Enhanced NLP order processing for client-side item recognition
-// This function can provide immediate feedback while waiting for server response
-function simulateOrderProcessing(message, restaurant) {
-    const results = [];
-    const lowerMessage = message.toLowerCase();
-    
-    // Define menu items based on restaurant
-    let menuItems = {};
-    if (restaurant === 'tasty bites') {
-        menuItems = {
-            'burger': 120,
-            'pizza': 200,
-            'french fries': 80,
-            'fries': 80,
-            'cheese burger': 150,
-            'chicken wrap': 160,
-            'chocolate shake': 90,
-            'mango mojito': 70
-        };
-    } else if (restaurant === 'desi delight') {
-        menuItems = {
-            'chicken biryani': 180,
-            'paneer tikka': 160,
-            'butter naan': 40,
-            'dal makhani': 120,
-            'jeera rice': 90,
-            'paneer butter masala': 150,
-            'roti': 20
-        };
-    }
-    
-    // Extract quantities and items from user message
-    const words = lowerMessage.split(/\s+/);
-    let i = 0;
-    
-    while (i < words.length) {
-        let quantity = 1;
-        let itemFound = null;
-        
-        // Check if current word is a number (potential quantity)
-        if (!isNaN(words[i]) && parseInt(words[i]) > 0) {
-            quantity = parseInt(words[i]);
-            i++;
-        }
-        
-        // Try to find matching menu items (could be single or multi-word)
-        for (let len = 3; len > 0; len--) {
-            if (i + len <= words.length) {
-                const potentialItem = words.slice(i, i + len).join(' ');
-                if (menuItems.hasOwnProperty(potentialItem)) {
-                    itemFound = potentialItem;
-                    i += len;
-                    break;
-                }
-            }
-        }
-        
-        // Check single word items with basic synonym handling
-        if (!itemFound && menuItems.hasOwnProperty(words[i])) {
-            itemFound = words[i];
-            i++;
-        } else if (!itemFound) {
-            // Handle some common synonyms
-            const synonyms = {
-                'soda': 'chocolate shake',
-                'cola': 'chocolate shake',
-                'chips': 'fries',
-                'naan': 'butter naan',
-                'paneer': 'paneer tikka',
-                'biryani': 'chicken biryani',
-                'mojito': 'mango mojito',
-            };
-            
-            if (synonyms.hasOwnProperty(words[i]) && menuItems.hasOwnProperty(synonyms[words[i]])) {
-                itemFound = synonyms[words[i]];
-                i++;
-            } else {
-                i++;
-            }
-        }
-        
-        if (itemFound) {
-            results.push({
-                item: itemFound.charAt(0).toUpperCase() + itemFound.slice(1),
-                price: menuItems[itemFound],
-                quantity: quantity
-            });
-        }
-    }
-    
-    return results;
-}
-
 // Add common food suggestions
 function addCommonSuggestions() {
     const suggestions = [
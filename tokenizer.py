@@ -0,0 +1,226 @@
+# tokenizer.py - Single-pass quantity and menu-item tokenizer for order messages
+import re
+
+TOKEN_PATTERN = re.compile(r"[a-z]+|\d+|[,&+]")
+
+NUMBER_WORDS = {
+    "one": 1, "two": 2, "three": 3, "four": 4, "five": 5, "six": 6, "seven": 7,
+    "eight": 8, "nine": 9, "ten": 10, "eleven": 11, "twelve": 12, "thirteen": 13,
+    "fourteen": 14, "fifteen": 15, "sixteen": 16, "seventeen": 17, "eighteen": 18,
+    "nineteen": 19, "twenty": 20,
+}
+NUMBER_WORD_PATTERN = re.compile(r"\b(" + "|".join(NUMBER_WORDS) + r")\b")
+ARTICLES = {"a", "an"}
+SEPARATORS = {",", "&", "+", "and", "with"}
+# Words between a quantity and its item: "a couple of fries", "2 x burger"
+QUANTITY_FILLERS = {"of", "x"}
+# Words that can start a quantity, besides digits
+QUANTITY_STARTS = set(NUMBER_WORDS) | ARTICLES | {"couple", "dozen", "half"}
+
+
+def number_words_to_digits(text):
+    """Lowercase text and replace whole number words with digits ("someone" stays)"""
+    return NUMBER_WORD_PATTERN.sub(lambda m: str(NUMBER_WORDS[m.group(1)]), text.lower())
+
+
+# Commands that change an order line instead of adding one: "remove the fries",
+# "take off 1 coke", "make it 3", "change the naan to 2"
+MODIFY_PATTERNS = [
+    ("remove", re.compile(r"^(?:please )?(?:remove|delete|cancel|drop|take off|take out|no more)"
+                          r"(?: (?P<quantity>\d+))? (?P<item>.+?)(?: please)?$")),
+    ("remove", re.compile(r"^(?:i )?(?:dont|don't|do not) want(?: (?P<quantity>\d+))? (?P<item>.+?)"
+                          r"(?: anymore| any more)?$")),
+    ("set", re.compile(r"^(?:please )?(?:make|change|set|update) (?P<item>.+?) (?:to |into )?"
+                       r"(?P<quantity>\d+)(?: (?!please$)(?P<rest>[a-z ]+?))?(?: please)?$")),
+]
+# "it" in "make it 3" is the item the user last ordered or changed
+PRONOUNS = {"it", "that", "this", "them", "those", "these"}
+DETERMINERS = {"the", "my", "a", "an", "that", "those", "these", "this"}
+
+
+def parse_modification(text):
+    """(action, item phrase, quantity) for a remove/set command, or None.
+
+    action is "remove" or "set". The item phrase is None when the command
+    refers back to the last item ("make it 3"); quantity is None for
+    "remove the fries" (the whole line).
+    """
+    text = " ".join(number_words_to_digits(text).replace("?", " ").replace(".", " ").split())
+    for action, pattern in MODIFY_PATTERNS:
+        match = pattern.match(text)
+        if not match:
+            continue
+        words = match.group("item").split()
+        if words and words[0] in DETERMINERS and len(words) > 1:
+            words = words[1:]
+        phrase = " ".join(words)
+        if action == "set" and match.group("rest") and (phrase in PRONOUNS or not phrase):
+            phrase = match.group("rest")
+        elif action == "set" and match.group("rest"):
+            # "make the coke 3 more" names the item twice; leave it to the order parser
+            continue
+        quantity = match.group("quantity")
+        return action, (None if phrase in PRONOUNS else phrase), (int(quantity) if quantity else None)
+    return None
+
+
+def read_quantity(words, i):
+    """(quantity, index after it) for a quantity starting at words[i], or (None, i)"""
+    n = len(words)
+    word = words[i]
+    if word == "half":
+        # "half dozen", "half a dozen"
+        j = i + 1
+        if j < n and words[j] in ARTICLES:
+            j += 1
+        if j < n and words[j] == "dozen":
+            return 6, skip_fillers(words, j + 1)
+        return None, i
+    if word.isdigit():
+        quantity = int(word)
+    elif word in NUMBER_WORDS:
+        quantity = NUMBER_WORDS[word]
+    elif word in ARTICLES:
+        quantity = 1
+    elif word == "couple":
+        quantity = 2
+    elif word == "dozen":
+        quantity = 12
+    else:
+        return None, i
+
+    j = i + 1
+    if j < n and words[j] == "couple" and word in ARTICLES:
+        quantity = 2
+        j += 1
+    elif j < n and words[j] == "dozen" and word != "dozen":
+        quantity *= 12
+        j += 1
+    return quantity, skip_fillers(words, j)
+
+
+def skip_fillers(words, j):
+    while j < len(words) and words[j] in QUANTITY_FILLERS:
+        j += 1
+    return j
+
+
+class PhraseTrie:
+    """Word-level trie of menu and synonym phrases for longest-match lookup"""
+
+    def __init__(self, phrases=()):
+        self.root = {}
+        for phrase in phrases:
+            self.add(phrase)
+
+    def add(self, phrase):
+        words = TOKEN_PATTERN.findall(phrase.lower())
+        if not words:
+            return
+        canonical = " ".join(words)
+        self._insert(words, canonical)
+        # Plural of the last word ("2 burgers", "3 sandwiches") resolves to the same phrase
+        last = words[-1]
+        if last.endswith(("s", "x", "z", "ch", "sh")):
+            plural = last if last.endswith("es") else last + "es"
+        else:
+            plural = last + "s"
+        if plural != last:
+            self._insert(words[:-1] + [plural], canonical)
+
+    def _insert(self, words, canonical):
+        node = self.root
+        for word in words:
+            node = node.setdefault(word, {})
+        node.setdefault(None, canonical)
+
+    def longest(self, words, start):
+        """(phrase, end) of the longest phrase starting at words[start], or (None, start)"""
+        node = self.root
+        match, end = None, start
+        for i in range(start, len(words)):
+            node = node.get(words[i])
+            if node is None:
+                break
+            if None in node:
+                match, end = node[None], i + 1
+        return match, end
+
+
+class OrderTokenizer:
+    """Split an order message into (food_entities, quantities) in one left-to-right pass.
+
+    The message is cut into segments at separators (comma, "and", "&",
+    "with") and at each new quantity. Known menu or synonym phrases are
+    taken from a segment by longest match; a segment with a quantity but no
+    known phrase keeps its words as a free-text entity for the fuzzy
+    matcher. Words with neither a quantity nor a known phrase are dropped,
+    and a message that yields nothing is left to the NLP fallback.
+    """
+
+    def __init__(self, phrases=()):
+        self.trie = PhraseTrie(phrases)
+
+    def extract(self, text):
+        words = TOKEN_PATTERN.findall(text.lower())
+        phrase_starts = self.trie.root
+        food_entities = []
+        quantities = {}
+        quantity = None
+        matched = []
+        loose = []
+        i = 0
+        while i < len(words):
+            word = words[i]
+            if word in phrase_starts:
+                phrase, end = self.trie.longest(words, i)
+                if phrase is not None:
+                    matched.append(phrase)
+                    i = end
+                    continue
+            if word in SEPARATORS:
+                self._emit(food_entities, quantities, quantity, matched, loose)
+                quantity, matched, loose = None, [], []
+                i += 1
+                continue
+            value = None
+            if word in QUANTITY_STARTS or word.isdigit():
+                value, end = read_quantity(words, i)
+            if value is not None:
+                if matched or loose:
+                    self._emit(food_entities, quantities, quantity, matched, loose)
+                    matched, loose = [], []
+                quantity = value
+                i = end
+                continue
+            loose.append(word)
+            i += 1
+        self._emit(food_entities, quantities, quantity, matched, loose)
+        return food_entities, quantities
+
+    def _emit(self, food_entities, quantities, quantity, matched, loose):
+        """Add one segment's entities; its quantity goes to the first of them"""
+        if matched:
+            for k, phrase in enumerate(matched):
+                food_entities.append(phrase)
+                quantities[phrase] = quantity if k == 0 and quantity is not None else 1
+        elif quantity is not None and loose:
+            entity = " ".join(loose)
+            food_entities.append(entity)
+            quantities[entity] = quantity
+
+
+def menu_phrases(menus, synonyms=None):
+    """Every menu item name plus both sides of every synonym"""
+    phrases = set()
+    for items in (menus or {}).values():
+        phrases.update(items)
+    for key, value in (synonyms or {}).items():
+        phrases.add(key)
+        phrases.add(value)
+    return phrases
+
+
+def build_order_tokenizer(menus, synonyms=None):
+    """Build an OrderTokenizer for the loaded menus"""
+    return OrderTokenizer(menu_phrases(menus, synonyms))